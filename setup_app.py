@@ -29,6 +29,7 @@ OPTIONS = {
         'tkinter.filedialog',
         '_tkinter',
         'json',
+        'sqlite3',
         'subprocess',
         'os',
         'sys',
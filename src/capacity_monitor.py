@@ -0,0 +1,200 @@
+# File: src/capacity_monitor.py
+import os
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future, wait
+
+from src.reconciler import read_mount_table
+
+logger = logging.getLogger('SMBManager')
+
+SAMPLE_INTERVAL = 60
+# statvfs on a dead SMB mount can block for minutes; stop waiting after this
+STATVFS_TIMEOUT = 5
+# statvfs calls in flight at once; hung mounts hold a worker until they return
+MAX_WORKERS = 4
+ALERT_PERCENT = 90
+# An alerted volume must drop this far below the threshold before it can alert again
+ALERT_HYSTERESIS = 5
+
+
+class CapacitySample:
+    """Space and inode usage of one mount at a point in time"""
+
+    __slots__ = ("time", "total", "free", "files", "files_free")
+
+    def __init__(self, time, total, free, files, files_free):
+        self.time = time
+        self.total = total
+        # Available to unprivileged users (f_bavail), which is what a copy can use
+        self.free = free
+        self.files = files
+        self.files_free = files_free
+
+    @classmethod
+    def from_statvfs(cls, st, now):
+        return cls(now, st.f_blocks * st.f_frsize, st.f_bavail * st.f_frsize, st.f_files, st.f_favail)
+
+    @property
+    def used_percent(self):
+        return 100.0 * (self.total - self.free) / self.total if self.total else 0.0
+
+    @property
+    def inodes_used_percent(self):
+        # SMB servers often report 0 or a fake inode count
+        return 100.0 * (self.files - self.files_free) / self.files if self.files else 0.0
+
+
+class CapacityMonitor:
+    """Samples free space and inodes of every SMB mount in the background
+
+    Results are cached with the time they were taken, so the UI only ever
+    reads the cache. statvfs runs on a fixed pool of daemon workers (a hung
+    call can't block exit); a mount whose statvfs hangs keeps its last good
+    sample (which ages) and isn't queried again until the stuck call returns.
+    on_alert(mount_point, sample, kind) is called once when a volume crosses
+    alert_percent of space ("space") or inodes ("inodes").
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, timeout=STATVFS_TIMEOUT, alert_percent=ALERT_PERCENT,
+                 on_alert=None, mount_table=read_mount_table, statvfs=os.statvfs, max_workers=MAX_WORKERS):
+        self.interval = interval
+        self.timeout = timeout
+        self.alert_percent = alert_percent
+        self.on_alert = on_alert
+        self.mount_table = mount_table
+        self.statvfs = statvfs
+        self.max_workers = max_workers
+        self.jobs = queue.Queue()
+        self.workers = []
+        self.cache = {}
+        self.errors = {}
+        self.in_flight = {}
+        self.alerted = set()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread and self.thread.is_alive() and not self.stop_event.is_set():
+            return
+        # A fresh event, so a stopped thread still finishing its sample stays stopped
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(self.stop_event,), name="CapacityMonitor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self, stop_event):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Capacity sample failed: {str(e)}")
+            if stop_event.wait(self.interval):
+                return
+
+    def _work(self):
+        while True:
+            mount_point, future = self.jobs.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.statvfs(mount_point))
+            except OSError as e:
+                future.set_exception(e)
+
+    def submit(self, mount_point):
+        """Queue a statvfs for the workers; returns its Future"""
+        if len(self.workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, name="statvfs", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+        future = Future()
+        self.jobs.put((mount_point, future))
+        return future
+
+    def sample(self):
+        """Query every mounted share, in parallel so one hung mount doesn't delay the rest"""
+        table = self.mount_table()
+        results = {}
+        futures = {}
+        for mount_point in table:
+            pending = self.in_flight.get(mount_point)
+            if pending is not None and not pending.done():
+                results[mount_point] = (None, "previous statvfs still hung")
+                continue
+            futures[mount_point] = self.submit(mount_point)
+        wait(futures.values(), timeout=self.timeout)
+        for mount_point, future in futures.items():
+            if not future.done():
+                self.in_flight[mount_point] = future
+                results[mount_point] = (None, f"no answer within {self.timeout:.0f}s")
+                continue
+            self.in_flight.pop(mount_point, None)
+            try:
+                results[mount_point] = (future.result(), None)
+            except OSError as e:
+                results[mount_point] = (None, e.strerror or str(e))
+
+        now = time.time()
+        for mount_point, (st, error) in results.items():
+            if st is None:
+                if self.errors.get(mount_point) is None:
+                    logger.warning(f"Capacity of {mount_point} unavailable: {error}")
+                with self.lock:
+                    self.errors[mount_point] = error
+                continue
+            sample = CapacitySample.from_statvfs(st, now)
+            with self.lock:
+                self.cache[mount_point] = sample
+                self.errors.pop(mount_point, None)
+            self.check_alerts(mount_point, sample)
+        with self.lock:
+            # Errors and stuck calls count too, or a mount that only ever failed is never forgotten
+            for mount_point in (set(self.cache) | set(self.errors) | set(self.in_flight)) - set(table):
+                self.cache.pop(mount_point, None)
+                self.errors.pop(mount_point, None)
+                future = self.in_flight.pop(mount_point, None)
+                if future is not None:
+                    # Drops it if no worker has picked it up yet
+                    future.cancel()
+                self.alerted.difference_update({(mount_point, "space"), (mount_point, "inodes")})
+
+    def check_alerts(self, mount_point, sample):
+        for kind, percent in (("space", sample.used_percent), ("inodes", sample.inodes_used_percent)):
+            key = (mount_point, kind)
+            if percent >= self.alert_percent:
+                if key not in self.alerted:
+                    self.alerted.add(key)
+                    logger.warning(f"{mount_point} is {percent:.0f}% full ({kind})")
+                    if self.on_alert:
+                        self.on_alert(mount_point, sample, kind)
+            elif percent < self.alert_percent - ALERT_HYSTERESIS:
+                self.alerted.discard(key)
+
+    def get(self, mount_point):
+        """Return (sample or None, error or None) from the cache; never touches the mount"""
+        with self.lock:
+            return self.cache.get(mount_point), self.errors.get(mount_point)
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def format_capacity(sample, error=None, max_age=SAMPLE_INTERVAL * 3):
+    """"1.2 TB free (87% used)"; marked with "?" when the cached sample is stale"""
+    if sample is None:
+        return "?" if error else "–"
+    text = f"{format_size(sample.free)} free ({sample.used_percent:.0f}% used)"
+    if error or time.time() - sample.time > max_age:
+        text += " ?"
+    return text
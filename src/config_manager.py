@@ -1,31 +1,37 @@
-import json
-import os
 import keyring
+from src.state_store import StateStore
 
 class ConfigManager:
     def __init__(self):
-        self.config_file = os.path.expanduser("~/.smb_manager_config.json")
+        # Settings, shares and mount history live in SQLite; the old JSON
+        # config is migrated into it on first use
+        self.store = StateStore()
+        self.config_file = self.store.legacy_config_file
 
     def load_config(self):
-        if os.path.exists(self.config_file):
-            with open(self.config_file, 'r') as f:
-                return json.load(f)
-        return {
-            "hostname": "", 
-            "port": "8445", 
-            "shares": [], 
-            "autostart": False,
-            "use_tunnel": True
-        }
+        return self.store.load_config()
 
     def save_config(self, config):
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f, indent=2)
+        self.store.save_config(config)
 
     @staticmethod
     def store_share_password(username, share, password):
         keyring.set_password("SMBManager", f"{username}:{share}", password)
 
+    @staticmethod
+    def store_share_passwords(passwords):
+        """Store many (username, share) -> password entries in one pass
+
+        Returns a list of error messages for entries that failed.
+        """
+        errors = []
+        for (username, share), password in passwords.items():
+            try:
+                keyring.set_password("SMBManager", f"{username}:{share}", password)
+            except Exception as e:
+                errors.append(f"Failed to store password for {share}: {e}")
+        return errors
+
     @staticmethod
     def get_share_password(username, share):
         return keyring.get_password("SMBManager", f"{username}:{share}")
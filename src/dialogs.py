@@ -1,13 +1,18 @@
 import tkinter as tk
 from tkinter import ttk
 import os
+import queue
+import subprocess
+import threading
+from src.mount_profiles import DEFAULT_PROFILE, profile_names, profile_label, profile_from_label
+from src.idle_monitor import idle_timeout
 
 class EditShareDialog:
     def __init__(self, parent, username="", share_path="", existing_mount=None):
         self.result = None
         self.top = tk.Toplevel(parent)
         self.top.title("Edit Share")
-        self.top.geometry("500x300")
+        self.top.geometry("500x420")
         
         self.top.transient(parent)
         self.top.grab_set()
@@ -48,6 +53,23 @@ class EditShareDialog:
         ttk.Checkbutton(options_frame, text="Mount as read-only", 
                        variable=self.readonly_var).grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=5)
         
+        # Performance profile, mapped to client mount options
+        ttk.Label(options_frame, text="Profile:").grid(row=3, column=0, padx=5, pady=5, sticky=tk.W)
+        self.profile_var = tk.StringVar(value=profile_label(DEFAULT_PROFILE))
+        ttk.Combobox(options_frame, textvariable=self.profile_var, state="readonly", width=37,
+                     values=[profile_label(name) for name in profile_names()]).grid(row=3, column=1, padx=5, pady=5)
+        
+        # Folders kept available offline
+        ttk.Label(options_frame, text="Offline folders:").grid(row=4, column=0, padx=5, pady=5, sticky=tk.W)
+        self.mirror_folders_var = tk.StringVar()
+        ttk.Entry(options_frame, textvariable=self.mirror_folders_var, width=40).grid(row=4, column=1, padx=5, pady=5)
+        
+        # Unmount after this many idle minutes (0 keeps it mounted)
+        ttk.Label(options_frame, text="Idle unmount (min):").grid(row=5, column=0, padx=5, pady=5, sticky=tk.W)
+        self.idle_timeout_var = tk.IntVar(value=0)
+        ttk.Spinbox(options_frame, textvariable=self.idle_timeout_var, from_=0, to=1440, increment=5,
+                    width=8).grid(row=5, column=1, padx=5, pady=5, sticky=tk.W)
+        
         # Password
         ttk.Label(main_frame, text="New Password:").grid(row=3, column=0, padx=5, pady=5, sticky=tk.W)
         self.password_var = tk.StringVar()
@@ -71,7 +93,7 @@ class EditShareDialog:
         parent_height = parent.winfo_height()
         
         dialog_width = 500
-        dialog_height = 300
+        dialog_height = 420
         
         x = parent_x + (parent_width - dialog_width) // 2
         y = parent_y + (parent_height - dialog_height) // 2
@@ -85,17 +107,150 @@ class EditShareDialog:
             self.auto_mount_var.set(mount_data['auto_mount'])
         if 'readonly' in mount_data:
             self.readonly_var.set(mount_data['readonly'])
+        self.profile_var.set(profile_label(mount_data.get('profile')))
+        if mount_data.get('mirror'):
+            self.mirror_folders_var.set(", ".join(mount_data['mirror'].get('folders', [])))
+        self.idle_timeout_var.set(idle_timeout(mount_data))
 
     def save(self):
+        try:
+            idle_minutes = max(0, self.idle_timeout_var.get())
+        except tk.TclError:
+            idle_minutes = 0
         self.result = {
             'username': self.username_var.get(),
             'share': self.share_var.get(),
             'password': self.password_var.get(),
             'mount_point': self.mount_point_var.get(),
             'auto_mount': self.auto_mount_var.get(),
-            'readonly': self.readonly_var.get()
+            'readonly': self.readonly_var.get(),
+            'profile': profile_from_label(self.profile_var.get()),
+            'mirror_folders': [f.strip() for f in self.mirror_folders_var.get().split(",") if f.strip()],
+            'idle_timeout': idle_minutes
         }
         self.top.destroy()
 
     def cancel(self):
-        self.top.destroy()
\ No newline at end of file
+        self.top.destroy()
+
+class ImportPreviewDialog:
+    """Shows a dry-run summary of an import and asks for confirmation"""
+
+    def __init__(self, parent, summary, errors=None):
+        self.result = False
+        self.top = tk.Toplevel(parent)
+        self.top.title("Import Shares")
+        self.top.geometry("600x400")
+
+        self.top.transient(parent)
+        self.top.grab_set()
+
+        self.setup_ui(summary, errors or [])
+
+    def setup_ui(self, summary, errors):
+        main_frame = ttk.Frame(self.top, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        heading = "Import cannot be applied:" if errors else "The following changes will be applied:"
+        ttk.Label(main_frame, text=heading).pack(anchor=tk.W, pady=(0, 5))
+
+        text = tk.Text(main_frame, height=15, wrap=tk.NONE)
+        text.insert(tk.END, "\n".join(errors) if errors else summary)
+        text.configure(state=tk.DISABLED)
+        text.pack(fill=tk.BOTH, expand=True)
+
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(pady=10)
+
+        if not errors:
+            ttk.Button(button_frame, text="Apply", command=self.apply).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=self.cancel).pack(side=tk.LEFT, padx=5)
+
+    def apply(self):
+        self.result = True
+        self.top.destroy()
+
+    def cancel(self):
+        self.top.destroy()
+
+class SearchDialog:
+    """Searches the cached filename indexes of all shares"""
+
+    # Wait for a pause in typing before searching
+    SEARCH_DELAY_MS = 200
+    POLL_MS = 50
+
+    def __init__(self, parent, search_func):
+        self.search_func = search_func
+        self.pending_search = None
+        self.search_generation = 0
+        self.search_results = queue.Queue()
+        self.top = tk.Toplevel(parent)
+        self.top.title("Search Shares")
+        self.top.geometry("700x450")
+        self.top.transient(parent)
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        main_frame = ttk.Frame(self.top, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.query_var = tk.StringVar()
+        entry = ttk.Entry(main_frame, textvariable=self.query_var)
+        entry.pack(fill=tk.X, pady=(0, 5))
+        entry.focus_set()
+        self.query_var.trace_add("write", lambda *_: self.schedule_search())
+
+        self.results = tk.Listbox(main_frame)
+        self.results.pack(fill=tk.BOTH, expand=True)
+        self.results.bind("<Double-Button-1>", self.reveal)
+
+        self.status_var = tk.StringVar(value="Type to search indexed shares")
+        ttk.Label(main_frame, textvariable=self.status_var).pack(anchor=tk.W, pady=(5, 0))
+
+    def schedule_search(self):
+        if self.pending_search:
+            self.top.after_cancel(self.pending_search)
+        self.pending_search = self.top.after(self.SEARCH_DELAY_MS, self.search)
+
+    def search(self):
+        """Scan the indexes off the Tk thread; only the latest query's results are shown"""
+        self.pending_search = None
+        self.search_generation += 1
+        generation, query = self.search_generation, self.query_var.get()
+        self.status_var.set("Searching…")
+
+        def run():
+            try:
+                matches = self.search_func(query)
+            except Exception as e:
+                matches = e
+            self.search_results.put((generation, matches))
+
+        threading.Thread(target=run, daemon=True).start()
+        self.top.after(self.POLL_MS, self.poll_search)
+
+    def poll_search(self):
+        try:
+            generation, matches = self.search_results.get_nowait()
+        except queue.Empty:
+            self.top.after(self.POLL_MS, self.poll_search)
+            return
+        if generation == self.search_generation:
+            self.show_matches(matches)
+
+    def show_matches(self, matches):
+        if isinstance(matches, Exception):
+            self.status_var.set(f"Search failed: {str(matches)}")
+            return
+        self.results.delete(0, tk.END)
+        for path in matches:
+            self.results.insert(tk.END, path)
+        self.status_var.set(f"{len(matches)} match{'es' if len(matches) != 1 else ''}")
+
+    def reveal(self, event=None):
+        selection = self.results.curselection()
+        if selection:
+            # Don't wait for Finder on the Tk thread
+            subprocess.Popen(['open', '-R', self.results.get(selection[0])])
@@ -0,0 +1,214 @@
+# File: src/file_indexer.py
+import marshal
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('SMBManager')
+
+INDEX_VERSION = 1
+DEFAULT_INDEX_ROOT = "~/Library/Caches/SMBManager/Index"
+DEFAULT_WORKERS = 8
+# Levels walked first so the first Finder browse after a mount is fast
+WARM_DEPTH = 2
+# Don't re-walk a share more often than this after mounts
+MIN_REINDEX_MINUTES = 15
+
+
+class ShareIndex:
+    """Persistent filename index of one mounted share
+
+    Stores {rel_dir: (mtime_ns, files, subdirs)}. A refresh re-lists only
+    directories whose mtime changed and reuses the cached listing for the
+    rest, so repeated walks cost one stat per directory.
+    """
+
+    def __init__(self, root, index_file, workers=DEFAULT_WORKERS):
+        self.root = root
+        self.index_file = os.path.expanduser(index_file)
+        self.workers = workers
+        self.dirs = {}
+        self.paths = []
+        self.lowered = []
+        self.built_at = None
+        self.loaded_mtime = None
+        self.load()
+
+    def file_mtime(self):
+        try:
+            return os.stat(self.index_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def load(self):
+        mtime_ns = self.file_mtime()
+        try:
+            with open(self.index_file, 'rb') as f:
+                data = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return
+        self.loaded_mtime = mtime_ns
+        if data.get("version") == INDEX_VERSION:
+            self.dirs = data["dirs"]
+            self.built_at = data.get("built_at")
+            self.rebuild_paths()
+
+    def reload_if_changed(self):
+        """Reload when another process (e.g. the GUI or menubar) rewrote the index file"""
+        mtime_ns = self.file_mtime()
+        if mtime_ns is not None and mtime_ns != self.loaded_mtime:
+            self.load()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        tmp_path = f"{self.index_file}.tmp"
+        with open(tmp_path, 'wb') as f:
+            marshal.dump({"version": INDEX_VERSION, "built_at": self.built_at, "dirs": self.dirs}, f)
+        os.replace(tmp_path, self.index_file)
+        self.loaded_mtime = self.file_mtime()
+
+    def rebuild_paths(self):
+        paths = []
+        for rel_dir, (_, files, subdirs) in self.dirs.items():
+            prefix = f"{rel_dir}/" if rel_dir else ""
+            paths.extend(prefix + name for name in subdirs)
+            paths.extend(prefix + name for name in files)
+        paths.sort()
+        self.paths = paths
+        self.lowered = [path.lower() for path in paths]
+
+    def list_dir(self, rel_dir):
+        """Return (rel_dir, entry) reusing the cached listing when mtime is unchanged
+
+        A directory that is gone returns None; one that can't be listed right
+        now keeps its cached entry so a transient error doesn't drop its subtree.
+        """
+        path = os.path.join(self.root, rel_dir)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            cached = self.dirs.get(rel_dir)
+            if cached and cached[0] == mtime_ns:
+                return rel_dir, cached
+            files, subdirs = [], []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    else:
+                        files.append(entry.name)
+            return rel_dir, (mtime_ns, files, subdirs)
+        except (FileNotFoundError, NotADirectoryError):
+            return rel_dir, None
+        except OSError as e:
+            logger.warning(f"Index keeping cached listing of {path}: {str(e)}")
+            return rel_dir, self.dirs.get(rel_dir)
+
+    def refresh(self, on_warm=None):
+        """Walk the share level by level; returns (directories, changed)"""
+        start = time.monotonic()
+        dirs = {}
+        changed = 0
+        level = [""]
+        depth = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="Index") as executor:
+            while level:
+                next_level = []
+                for rel_dir, entry in executor.map(self.list_dir, level):
+                    if entry is None:
+                        continue
+                    if self.dirs.get(rel_dir) is not entry:
+                        changed += 1
+                    dirs[rel_dir] = entry
+                    prefix = f"{rel_dir}/" if rel_dir else ""
+                    next_level.extend(prefix + name for name in entry[2])
+                level = next_level
+                depth += 1
+                if depth == WARM_DEPTH and on_warm:
+                    on_warm()
+        self.dirs = dirs
+        self.built_at = time.time()
+        self.rebuild_paths()
+        self.save()
+        logger.info(f"Indexed {len(self.paths)} entries in {len(dirs)} directories of {self.root} "
+                    f"({changed} re-listed) in {time.monotonic() - start:.1f}s")
+        return len(dirs), changed
+
+    def warm(self, depth=WARM_DEPTH):
+        """List the top levels of the share so the client caches them"""
+        def subdirs(path):
+            try:
+                with os.scandir(path) as entries:
+                    return [e.path for e in entries if e.is_dir(follow_symlinks=False)]
+            except OSError:
+                return []
+
+        level = [self.root]
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="Warm") as executor:
+            for _ in range(depth):
+                level = [sub for found in executor.map(subdirs, level) for sub in found]
+
+    def search(self, query, limit=200):
+        """Case-insensitive search; every word of the query must appear in the path"""
+        words = query.lower().split()
+        if not words:
+            return []
+        results = []
+        for path, lowered in zip(self.paths, self.lowered):
+            if all(word in lowered for word in words):
+                results.append(os.path.join(self.root, path))
+                if len(results) >= limit:
+                    break
+        return results
+
+
+class IndexManager:
+    """Owns the filename indexes of all configured shares"""
+
+    def __init__(self, mount_manager, index_root=DEFAULT_INDEX_ROOT):
+        self.mount_manager = mount_manager
+        self.index_root = index_root
+        self.indexes = {}
+        self.lock = threading.Lock()
+        self.running = set()
+
+    def get_index(self, share):
+        key = (share["username"], share["share"])
+        with self.lock:
+            if key not in self.indexes:
+                mount_point = share.get("mount_point") or self.mount_manager.get_mount_point(share["share"])
+                index_file = os.path.join(self.index_root, f"{share['username']}{share['share'].replace('/', '_')}.idx")
+                self.indexes[key] = ShareIndex(mount_point, index_file)
+            elif key not in self.running:
+                self.indexes[key].reload_if_changed()
+            return self.indexes[key]
+
+    def refresh_share(self, share, force=False):
+        """Walk a mounted share in the calling thread; returns True if it ran"""
+        index = self.get_index(share)
+        if not self.mount_manager.is_mounted(index.root):
+            return False
+        if not force and index.built_at and time.time() - index.built_at < MIN_REINDEX_MINUTES * 60:
+            # Still warm the top levels so browsing right after a mount is quick
+            index.warm()
+            return False
+        key = (share["username"], share["share"])
+        with self.lock:
+            if key in self.running:
+                return False
+            self.running.add(key)
+        try:
+            index.refresh()
+            return True
+        finally:
+            with self.lock:
+                self.running.discard(key)
+
+    def search(self, shares, query, limit=200):
+        results = []
+        for share in shares:
+            results.extend(self.get_index(share).search(query, limit - len(results)))
+            if len(results) >= limit:
+                break
+        return results
@@ -0,0 +1,208 @@
+# File: src/fs_utils.py
+import errno
+import fcntl
+import hashlib
+import os
+import shutil
+import sys
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+logger = logging.getLogger('SMBManager')
+
+DEFAULT_WORKERS = 8
+DEFAULT_BUFFER_SIZE = 8 * 1024 * 1024
+PARTIAL_SUFFIX = ".smbmanager-partial"
+# fcntl command that turns off the macOS unified buffer cache for a file descriptor
+F_NOCACHE = 48
+
+# Errors meaning "this fast path isn't supported here", not a real I/O failure
+FALLBACK_ERRNOS = {
+    errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+    getattr(errno, "ENOTSUP", errno.EOPNOTSUPP), errno.ENOTSOCK, errno.EBADF
+}
+
+
+def scan_tree(root, rel_dirs, workers=DEFAULT_WORKERS):
+    """Walk rel_dirs under root with parallel os.scandir calls
+
+    Returns ({relative_path: (size, mtime_ns)} for every regular file,
+    [relative directories that could not be read]). Unreadable
+    directories are skipped and logged; callers must not treat files
+    under them as gone.
+    """
+    files = {}
+    failed = []
+
+    def scan_dir(rel_dir):
+        found, subdirs = [], []
+        try:
+            with os.scandir(os.path.join(root, rel_dir)) as entries:
+                for entry in entries:
+                    rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(rel_path)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        found.append((rel_path, stat.st_size, stat.st_mtime_ns))
+        except OSError as e:
+            logger.warning(f"Skipping {rel_dir or root}: {str(e)}")
+            return None, []
+        return found, subdirs
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Scan") as executor:
+        rel_dirs_of = {}
+
+        def submit(rel_dir):
+            future = executor.submit(scan_dir, rel_dir)
+            rel_dirs_of[future] = rel_dir
+            return future
+
+        pending = {submit(rel_dir) for rel_dir in rel_dirs}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                found, subdirs = future.result()
+                if found is None:
+                    failed.append(rel_dirs_of[future])
+                    continue
+                for rel_path, size, mtime_ns in found:
+                    files[rel_path] = (size, mtime_ns)
+                pending.update(submit(subdir) for subdir in subdirs)
+    return files, failed
+
+
+def drop_cache(f):
+    """Keep reads of f from being answered by the local page cache
+
+    Verifying a file right after writing it would otherwise compare the
+    source with our own cached copy. This only covers the client: the
+    server may still answer from its cache rather than from disk.
+    """
+    if sys.platform == "darwin":
+        fcntl.fcntl(f.fileno(), F_NOCACHE, 1)
+    elif hasattr(os, "posix_fadvise"):
+        # Dirty pages can't be dropped, so write them out first
+        os.fsync(f.fileno())
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def file_hash(path, buffer_size=DEFAULT_BUFFER_SIZE, uncached=False):
+    digest = hashlib.sha256()
+    with open(path, 'rb', buffering=0) as f:
+        if uncached:
+            try:
+                drop_cache(f)
+            except OSError as e:
+                logger.warning(f"Could not bypass the cache for {path}: {str(e)}")
+        for chunk in iter(lambda: f.read(buffer_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _copy_file_range(src, dst, offset, count, buffer_size, progress):
+    copied = 0
+    while copied < count:
+        n = os.copy_file_range(src.fileno(), dst.fileno(), min(buffer_size, count - copied),
+                               offset + copied, offset + copied)
+        if n == 0:
+            break
+        copied += n
+        progress(n)
+    return copied
+
+
+def _sendfile(src, dst, offset, count, buffer_size, progress):
+    copied = 0
+    dst.seek(offset)
+    while copied < count:
+        n = os.sendfile(dst.fileno(), src.fileno(), offset + copied, min(buffer_size, count - copied))
+        if n == 0:
+            break
+        copied += n
+        progress(n)
+    return copied
+
+
+def _read_write(src, dst, offset, count, buffer_size, progress):
+    copied = 0
+    src.seek(offset)
+    dst.seek(offset)
+    view = memoryview(bytearray(buffer_size))
+    while copied < count:
+        n = src.readinto(view[:min(buffer_size, count - copied)])
+        if not n:
+            break
+        written = 0
+        while written < n:
+            written += dst.write(view[written:n])
+        copied += n
+        progress(n)
+    return copied
+
+
+def copy_file(source, target, buffer_size=DEFAULT_BUFFER_SIZE, resume=True, progress=None):
+    """Copy one file using the fastest available kernel path
+
+    Data goes to target + PARTIAL_SUFFIX first and is renamed into place
+    when complete, so an interrupted copy is resumed from where it
+    stopped. The source's size and mtime are recorded next to the partial
+    file; if the source changed since, the copy starts over instead of
+    splicing old and new data. Returns the number of bytes transferred
+    by this call.
+    """
+    progress = progress or (lambda n: None)
+    source_stat = os.stat(source)
+    size = source_stat.st_size
+    stamp = f"{size} {source_stat.st_mtime_ns}"
+    partial = target + PARTIAL_SUFFIX
+    # Ends in PARTIAL_SUFFIX too, so scans skip it along with the partial file
+    stamp_path = f"{target}.source{PARTIAL_SUFFIX}"
+    offset = 0
+    if resume and os.path.exists(partial):
+        offset = os.path.getsize(partial)
+        if offset > size or _read_stamp(stamp_path) != stamp:
+            offset = 0
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    with open(stamp_path, 'w') as f:
+        f.write(stamp)
+
+    with open(source, 'rb', buffering=0) as src, open(partial, 'r+b' if offset else 'wb', buffering=0) as dst:
+        dst.truncate(offset)
+        copied = 0
+        methods = []
+        if hasattr(os, "copy_file_range"):
+            methods.append(_copy_file_range)
+        if hasattr(os, "sendfile"):
+            methods.append(_sendfile)
+        methods.append(_read_write)
+        for method in methods:
+            try:
+                copied += method(src, dst, offset + copied, size - offset - copied, buffer_size, progress)
+                break
+            except OSError as e:
+                # Only fall back if the fast path refused outright
+                if e.errno not in FALLBACK_ERRNOS or method is _read_write:
+                    raise
+        dst.truncate(offset + copied)
+
+    if offset + copied != size:
+        raise OSError(errno.EIO, f"Short copy of {source}: {offset + copied} of {size} bytes")
+    after = os.stat(source)
+    if (after.st_size, after.st_mtime_ns) != (size, source_stat.st_mtime_ns):
+        # Written to while we copied; don't stamp a mix of versions with the new mtime
+        for path in (partial, stamp_path):
+            os.remove(path)
+        raise OSError(errno.EAGAIN, f"{source} changed during the copy")
+    shutil.copystat(source, partial)
+    os.replace(partial, target)
+    os.remove(stamp_path)
+    return copied
+
+
+def _read_stamp(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
@@ -0,0 +1,85 @@
+# File: src/gui_helper.py
+import subprocess
+import sys
+import os
+import threading
+import logging
+
+logger = logging.getLogger('SMBManager')
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def app_command(*args):
+    """Command line that re-launches this app (bundle executable or src.main) with args"""
+    if getattr(sys, 'frozen', False):
+        # sys.executable is SMB Manager.app/Contents/MacOS/python; the launcher sits next to it
+        return [os.path.join(os.path.dirname(sys.executable), 'SMB Manager')] + list(args)
+    return [sys.executable, '-m', 'src.main'] + list(args)
+
+
+def app_cwd():
+    """Working directory for app subprocesses; PROJECT_ROOT is inside the zip when frozen"""
+    return None if getattr(sys, 'frozen', False) else PROJECT_ROOT
+
+
+class GUIHelper:
+    """Keeps a hidden, pre-loaded GUI process around for the menubar
+
+    The helper reads one command per line on stdin ("show", "quit") and
+    reloads the shared config before showing itself, so opening the
+    manager only costs a pipe write.
+    """
+
+    def __init__(self):
+        self.process = None
+        self.lock = threading.Lock()
+
+    def get_command(self):
+        return app_command('--gui', '--helper')
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Start the hidden GUI process if it is not already running"""
+        with self.lock:
+            if self.is_running():
+                return
+            cmd = self.get_command()
+            logger.info(f"Pre-warming GUI helper: {cmd}")
+            self.process = subprocess.Popen(
+                cmd,
+                cwd=app_cwd(),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                text=True
+            )
+
+    def send(self, command):
+        with self.lock:
+            self.process.stdin.write(f"{command}\n")
+            self.process.stdin.flush()
+
+    def show(self):
+        """Ask the helper to show the manager window, starting it if needed"""
+        self.start()
+        try:
+            self.send("show")
+        except (BrokenPipeError, OSError):
+            # The helper died between the check and the write; start a fresh one
+            logger.warning("GUI helper went away, restarting it")
+            self.process = None
+            self.start()
+            self.send("show")
+
+    def stop(self):
+        if not self.is_running():
+            return
+        try:
+            self.send("quit")
+            self.process.wait(timeout=2)
+        except Exception:
+            self.process.terminate()
+        self.process = None
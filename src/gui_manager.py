@@ -1,36 +1,70 @@
 # File: src/gui_manager.py
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import os
 import logging
 import sys
 import subprocess
+import queue
+import threading
 
 from src.config_manager import ConfigManager
 from src.mount_manager import MountManager
-from src.dialogs import EditShareDialog
+from src.dialogs import EditShareDialog, ImportPreviewDialog, SearchDialog
+from src.file_indexer import IndexManager
+from src.reconciler import Reconciler
+from src.io_stats import IOStatsCollector, format_throughput, format_latency
+from src.capacity_monitor import CapacityMonitor, format_capacity
+from src.mount_profiles import mount_options, profile_label
+from src.share_model import ShareModel, default_mount_point
+from src import share_io
+from src.speed_test import SpeedTest, format_results, compare_results
 
 logger = logging.getLogger('SMBManager')
 
 class GUIManager(tk.Tk):
-    def __init__(self):
+    def __init__(self, helper_mode=False):
         logger.info("Starting GUI Manager initialization")
+        self.helper_mode = helper_mode
         try:
             super().__init__()
+            if helper_mode:
+                # Stay hidden until the menubar asks for the window
+                self.withdraw()
             
             logger.info("Setting up window properties")
             self.title("SMB Connection Manager")
-            self.geometry("900x700")
+            self.geometry("1000x700")
             
             # Initialize managers
             logger.info("Initializing ConfigManager")
             self.config_manager = ConfigManager()
             logger.info("Initializing MountManager")
             self.mount_manager = MountManager()
+            self.index_manager = IndexManager(self.mount_manager)
+            self.reconciler = Reconciler(self.mount_manager)
             
             # Load configuration
             logger.info("Loading configuration")
             self.config = self.config_manager.load_config()
+            # Source of truth for shares; the Treeview only displays it
+            self.shares = ShareModel.from_config(self.config)
+
+            # Per-mount throughput/latency for the share list, sampled off the Tk thread
+            self.io_stats = IOStatsCollector()
+            # statvfs runs in the monitor's workers; the Treeview only reads its cache
+            self.capacity = CapacityMonitor(alert_percent=self.config.get('capacity_alert_percent', 90))
+            # Mount point each row's I/O columns are read from
+            self.row_mount_points = {}
+            # {share key: mount point} from the last mount table read; None until the first
+            self.actual_mounts = None
+            self.mount_read_running = False
+            self.mount_read_again = False
+            # The monitors only run while the window is visible
+            self.live_refresh = None
+            
+            # Results of worker threads, handed back to the Tk thread
+            self.background_results = queue.Queue()
             
             # Initialize variables
             logger.info("Initializing variables")
@@ -50,6 +84,10 @@ class GUIManager(tk.Tk):
             logger.info("Centering window")
             self.center_window()
             
+            self.after(100, self.poll_background_results)
+            if not helper_mode:
+                self.start_monitors()
+            
             logger.info("GUI Manager initialization complete")
             
         except Exception as e:
@@ -57,28 +95,98 @@ class GUIManager(tk.Tk):
             if not isinstance(e, tk.TclError):  # Only show message box if it's not a Tcl error
                 messagebox.showerror("Initialization Error", f"Failed to initialize application: {str(e)}")
             sys.exit(1)
-        self.title("SMB Connection Manager")
-        self.geometry("900x700")
-        
-        # Initialize managers
-        self.config_manager = ConfigManager()
-        self.mount_manager = MountManager()
-        
-        # Load configuration
+
+        if self.helper_mode:
+            self.setup_helper_mode()
+
+    def run_in_background(self, func, on_done, *args):
+        """Run func in a worker thread and call on_done(result, error) on the Tk thread"""
+        def worker():
+            try:
+                result, error = func(*args), None
+            except Exception as e:
+                logger.error(f"Background task failed: {str(e)}", exc_info=True)
+                result, error = None, e
+            self.background_results.put((on_done, result, error))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def poll_background_results(self):
+        while True:
+            try:
+                on_done, result, error = self.background_results.get_nowait()
+            except queue.Empty:
+                break
+            on_done(result, error)
+        self.after(100, self.poll_background_results)
+
+    def setup_helper_mode(self):
+        """Listen for menubar commands on stdin while running as a pre-warmed helper"""
+        self.helper_commands = queue.Queue()
+        self.protocol("WM_DELETE_WINDOW", self.hide_window)
+        threading.Thread(target=self.read_helper_commands, daemon=True).start()
+        self.after(100, self.poll_helper_commands)
+
+    def read_helper_commands(self):
+        for line in sys.stdin:
+            self.helper_commands.put(line.strip())
+        # The menubar went away, so should we
+        self.helper_commands.put("quit")
+
+    def poll_helper_commands(self):
+        """Handle queued helper commands on the Tk thread"""
+        while True:
+            try:
+                command = self.helper_commands.get_nowait()
+            except queue.Empty:
+                break
+            if command == "show":
+                self.show_window()
+            elif command == "quit":
+                logger.info("GUI helper exiting")
+                self.destroy()
+                return
+        self.after(100, self.poll_helper_commands)
+
+    def show_window(self):
+        """Reload shared state and bring the window to the front"""
+        self.reload_config()
+        self.deiconify()
+        self.lift()
+        self.focus_force()
+        self.start_monitors()
+
+    def hide_window(self):
+        """Hide the helper's window; the menubar keeps its own monitors running"""
+        self.withdraw()
+        self.stop_monitors()
+
+    def start_monitors(self):
+        if self.live_refresh is not None:
+            return
+        self.io_stats.start()
+        self.capacity.start()
+        self.live_refresh = self.after(self.io_stats.interval * 1000, self.refresh_live_columns)
+
+    def stop_monitors(self):
+        if self.live_refresh is None:
+            return
+        self.after_cancel(self.live_refresh)
+        self.live_refresh = None
+        self.io_stats.stop()
+        self.capacity.stop()
+
+    def reload_config(self):
+        """Pick up changes made by the menubar since the window was last shown"""
         self.config = self.config_manager.load_config()
-        
-        # Initialize variables
-        self.init_variables()
-        
-        # Setup UI
-        self.setup_ui()
-        self.setup_bindings()
-        
-        # Load initial shares
+        self.shares = ShareModel.from_config(self.config)
+        self.mount_manager.reload_config()
+        self.hostname_var.set(self.config.get("hostname", ""))
+        self.port_var.set(self.config.get("port", "8445"))
+        self.autostart_var.set(self.config.get("autostart", False))
+        self.use_tunnel_var.set(self.config.get("use_tunnel", True))
+        self.auto_route_var.set(self.config.get("auto_route", False))
         self.refresh_shares_list()
-        
-        # Center window
-        self.center_window()
 
     def init_variables(self):
         """Initialize all tkinter variables"""
@@ -86,6 +194,7 @@ class GUIManager(tk.Tk):
         self.port_var = tk.StringVar(value=self.config.get("port", "8445"))
         self.autostart_var = tk.BooleanVar(value=self.config.get("autostart", False))
         self.use_tunnel_var = tk.BooleanVar(value=self.config.get("use_tunnel", True))
+        self.auto_route_var = tk.BooleanVar(value=self.config.get("auto_route", False))
         self.username_var = tk.StringVar()
         self.password_var = tk.StringVar()
         self.share_var = tk.StringVar()
@@ -157,6 +266,11 @@ class GUIManager(tk.Tk):
         ttk.Checkbutton(checkbox_frame, text="Use Cloudflared tunnel", 
                         variable=self.use_tunnel_var,
                         command=self.toggle_tunnel).grid(row=0, column=1, sticky=tk.W, padx=5)
+        
+        # Pick direct or tunnel per network by probing both
+        ttk.Checkbutton(checkbox_frame, text="Auto-select fastest route", 
+                        variable=self.auto_route_var,
+                        command=self.toggle_auto_route).grid(row=0, column=2, sticky=tk.W, padx=5)
     def toggle_tunnel(self):
         """Toggle cloudflared tunnel usage"""
         try:
@@ -169,6 +283,11 @@ class GUIManager(tk.Tk):
             messagebox.showerror("Error", f"Failed to toggle tunnel: {str(e)}")
             self.use_tunnel_var.set(not self.use_tunnel_var.get())  # Revert the checkbox
         
+    def toggle_auto_route(self):
+        """Toggle automatic direct/tunnel route selection"""
+        self.mount_manager.path_selector.invalidate()
+        self.save_config()
+        
     def setup_shares_list(self):
         """Setup the shares list frame"""
         shares_frame = ttk.LabelFrame(self.main_frame, text="Configured Shares", padding="5")
@@ -178,16 +297,21 @@ class GUIManager(tk.Tk):
         
         # Create Treeview
         self.shares_tree = ttk.Treeview(shares_frame, 
-                                      columns=("username", "share", "mount_point", "status"),
+                                      columns=("username", "share", "mount_point", "profile", "status",
+                                               "throughput", "latency", "capacity"),
                                       show="headings", 
                                       selectmode="extended")
         
         # Configure columns
         columns = {
-            "username": ("Username", 150),
-            "share": ("Share Path", 250),
-            "mount_point": ("Mount Point", 250),
-            "status": ("Status", 100)
+            "username": ("Username", 110),
+            "share": ("Share Path", 170),
+            "mount_point": ("Mount Point", 140),
+            "profile": ("Profile", 90),
+            "status": ("Status", 80),
+            "throughput": ("Read / Write", 140),
+            "latency": ("Latency", 80),
+            "capacity": ("Free Space", 150)
         }
         
         for col, (heading, width) in columns.items():
@@ -232,7 +356,9 @@ class GUIManager(tk.Tk):
         buttons = [
             ("Add Share", self.add_share),
             ("Edit", self.edit_share),
-            ("Delete", self.remove_share)
+            ("Delete", self.remove_share),
+            ("Import...", self.import_shares),
+            ("Export...", self.export_shares)
         ]
         
         for text, command in buttons:
@@ -243,6 +369,7 @@ class GUIManager(tk.Tk):
         
         # Action buttons
         ttk.Button(button_frame, text="Connect All", command=self.connect_all).pack(side=tk.LEFT, padx=2)
+        ttk.Button(button_frame, text="Search...", command=self.show_search).pack(side=tk.LEFT, padx=2)
         ttk.Button(button_frame, text="Save", command=self.save_changes).pack(side=tk.LEFT, padx=2)
 
     def setup_context_menu(self):
@@ -253,7 +380,9 @@ class GUIManager(tk.Tk):
             ("Delete", self.remove_share),
             (None, None),  # Separator
             ("Mount", self.mount_selected),
-            ("Unmount", self.unmount_selected)
+            ("Unmount", self.unmount_selected),
+            (None, None),  # Separator
+            ("Speed Test", self.speed_test_selected)
         ]
         
         for label, command in menu_items:
@@ -309,24 +438,22 @@ class GUIManager(tk.Tk):
             messagebox.showerror("Error", "Please fill in all fields")
             return
         
+        try:
+            self.shares.add({"username": username, "share": share, "mount_point": default_mount_point(share)})
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
         # Store password in keyring
         self.config_manager.store_share_password(username, share, password)
         
-        # Add to treeview
-        mount_point = f"/Volumes/{os.path.basename(share)}"
-        self.shares_tree.insert("", tk.END, values=(
-            username,
-            share,
-            mount_point,
-            "Not Mounted"
-        ))
-        
         # Clear entry fields
         self.username_var.set("")
         self.password_var.set("")
         self.share_var.set("")
         
         self.save_config()
+        self.refresh_shares_list()
         messagebox.showinfo("Success", "Share added successfully")
 
     def edit_share(self):
@@ -336,26 +463,18 @@ class GUIManager(tk.Tk):
             messagebox.showwarning("No Selection", "Please select a share to edit.")
             return
         
-        item = selected[0]
-        values = self.shares_tree.item(item)["values"]
-        if not values:
+        share = self.shares.get(selected[0])
+        if not share:
             return
         
-        username = values[0]
-        share_path = values[1]
-        
-        # Get existing mount options
-        existing_mount = None
-        for share in self.config.get("shares", []):
-            if share["username"] == username and share["share"] == share_path:
-                existing_mount = share
-                break
-        
-        dialog = EditShareDialog(self, username, share_path, existing_mount)
+        dialog = EditShareDialog(self, share.username, share.share, share.to_dict())
         self.wait_window(dialog.top)
         
         if dialog.result:
-            self.update_share(item, dialog.result)
+            try:
+                self.update_share(share.id, dialog.result)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
             self.refresh_shares_list()
 
     def remove_share(self):
@@ -369,38 +488,99 @@ class GUIManager(tk.Tk):
         if messagebox.askyesno("Confirm Delete", 
                              f"Are you sure you want to delete the selected share{'s' if share_count > 1 else ''}?"):
             for item in selected:
-                values = self.shares_tree.item(item)["values"]
+                share = self.shares.remove(item)
+                if not share:
+                    continue
                 try:
-                    self.config_manager.delete_share_password(values[0], values[1])
+                    self.config_manager.delete_share_password(share.username, share.share)
                 except Exception as e:
                     print(f"Failed to delete keyring entry: {e}")
-                
-                self.shares_tree.delete(item)
             
             self.save_config()
+            self.refresh_shares_list()
             messagebox.showinfo("Success", f"Successfully deleted {share_count} share{'s' if share_count > 1 else ''}.")
 
+    def import_shares(self):
+        """Import share definitions from a CSV or JSON file"""
+        path = filedialog.askopenfilename(
+            title="Import Shares",
+            filetypes=[("Share files", "*.csv *.json"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+
+        def prepare():
+            shares, passwords, errors = share_io.validate_shares(share_io.read_share_file(path))
+            diff = share_io.diff_shares(self.shares.to_list(), shares)
+            return diff, passwords, errors
+
+        self.run_in_background(prepare, self.on_import_prepared)
+
+    def on_import_prepared(self, result, error):
+        if error:
+            messagebox.showerror("Import Error", f"Failed to read import file: {str(error)}")
+            return
+        diff, passwords, errors = result
+        dialog = ImportPreviewDialog(self, share_io.format_diff(diff, passwords), errors)
+        self.wait_window(dialog.top)
+        if not dialog.result:
+            return
+        self.run_in_background(
+            self.config_manager.store_share_passwords,
+            lambda password_errors, error: self.on_import_passwords_stored(diff, password_errors, error),
+            passwords
+        )
+
+    def on_import_passwords_stored(self, diff, password_errors, error):
+        if error:
+            messagebox.showerror("Import Error", f"Failed to store passwords: {str(error)}")
+            return
+        self.config = share_io.apply_diff({**self.config, "shares": self.shares.to_list()}, diff)
+        self.shares = ShareModel.from_config(self.config)
+        self.config.update({
+            "hostname": self.hostname_var.get(),
+            "port": self.port_var.get(),
+            "autostart": self.autostart_var.get(),
+            "use_tunnel": self.use_tunnel_var.get(),
+            "auto_route": self.auto_route_var.get()
+        })
+        self.config_manager.save_config(self.config)
+        self.refresh_shares_list()
+        message = f"Imported {len(diff['added'])} new and updated {len(diff['changed'])} share(s)."
+        if password_errors:
+            message += "\n\nErrors occurred:\n" + "\n".join(password_errors[:10])
+        messagebox.showinfo("Import Complete", message)
+
+    def export_shares(self):
+        """Export share definitions (without passwords) to a CSV or JSON file"""
+        path = filedialog.asksaveasfilename(
+            title="Export Shares",
+            defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON", "*.json")]
+        )
+        if not path:
+            return
+
+        def on_done(count, error):
+            if error:
+                messagebox.showerror("Export Error", f"Failed to export shares: {str(error)}")
+            else:
+                messagebox.showinfo("Export Complete", f"Exported {count} share(s) to {path}")
+
+        self.run_in_background(share_io.export_shares, on_done, self.shares.to_list(), path)
+
     def save_config(self):
         """Save current configuration"""
+        # Start from the loaded config so settings this window doesn't edit survive
         config = {
+            **self.config,
             "hostname": self.hostname_var.get(),
             "port": self.port_var.get(),
             "autostart": self.autostart_var.get(),
             "use_tunnel": self.use_tunnel_var.get(),
-            "shares": []
+            "auto_route": self.auto_route_var.get(),
+            "shares": self.shares.to_list()
         }
-        
-        for item in self.shares_tree.get_children():
-            values = self.shares_tree.item(item)["values"]
-            share_data = {
-                "username": values[0],
-                "share": values[1],
-                "mount_point": values[2],
-                "auto_mount": True,
-                "readonly": False
-            }
-            config["shares"].append(share_data)
-        
         self.config = config
         self.config_manager.save_config(config)
 
@@ -413,11 +593,13 @@ class GUIManager(tk.Tk):
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save settings: {str(e)}")
 
-    def update_share(self, item, new_data):
-        """Update a share with new data"""
-        old_values = self.shares_tree.item(item)["values"]
-        old_username = old_values[0]
-        old_share = old_values[1]
+    def update_share(self, share_id, new_data):
+        """Update a share with new data; raises ValueError if it would duplicate another"""
+        share = self.shares.get(share_id)
+        old_username = share.username
+        old_share = share.share
+        if (new_data['username'], new_data['share']) != share.key and self.shares.find(new_data['username'], new_data['share']):
+            raise ValueError(f"{new_data['share']} is already configured for {new_data['username']}")
         
         # Handle password update
         if new_data['password']:
@@ -441,32 +623,89 @@ class GUIManager(tk.Tk):
             except:
                 pass
         
-        # Update treeview
-        self.shares_tree.item(item, values=(
-            new_data['username'],
-            new_data['share'],
-            new_data['mount_point'],
-            "Not Mounted"
-        ))
+        # Same record, so per-share settings carry over to a renamed share
+        mirror = None
+        if new_data.get('mirror_folders'):
+            mirror = {**share.get("mirror", {}), "folders": new_data['mirror_folders']}
+        self.shares.update(
+            share_id,
+            username=new_data['username'],
+            share=new_data['share'],
+            mount_point=new_data['mount_point'],
+            auto_mount=new_data['auto_mount'],
+            readonly=new_data['readonly'],
+            profile=new_data['profile'],
+            mirror=mirror,
+            idle_timeout=new_data.get('idle_timeout') or None
+        )
         
         self.save_config()
     def refresh_shares_list(self):
-        """Refresh the shares list display"""
-        for item in self.shares_tree.get_children():
-            self.shares_tree.delete(item)
-        
-        for share in self.config.get("shares", []):
-            share_path = share["share"]
-            # Use the default mount point from the share config if available
-            mount_point = share.get("mount_point", self.mount_manager.get_mount_point(share_path))
-            status = "Mounted" if self.mount_manager.is_mounted(share_path) else "Not Mounted"
-            
-            self.shares_tree.insert("", tk.END, values=(
-                share["username"],
-                share_path,
-                mount_point,
-                status
+        """Render the share list now and again once the mount table has been read
+
+        Reading the mount table runs `mount` on macOS, so it happens in a
+        worker; until it answers the rows show the last known state.
+        """
+        self.render_shares_list()
+        if self.mount_read_running:
+            self.mount_read_again = True
+            return
+        self.mount_read_running = True
+        shares = list(self.shares)
+        self.run_in_background(self.reconciler.actual_state, self.on_mount_state_read, shares)
+
+    def on_mount_state_read(self, actual, error):
+        self.mount_read_running = False
+        if error is None:
+            self.actual_mounts = actual
+        if self.mount_read_again:
+            self.mount_read_again = False
+            self.refresh_shares_list()
+        else:
+            self.render_shares_list()
+
+    def mounted_at(self, share):
+        """Where the share was mounted at the last mount table read, or None"""
+        return (self.actual_mounts or {}).get(share.key)
+
+    def render_shares_list(self):
+        """Render the share model into the Treeview (row iid = share id)"""
+        selection = self.shares_tree.selection()
+        self.shares_tree.delete(*self.shares_tree.get_children())
+        
+        self.row_mount_points = {}
+        for share in self.shares:
+            mount_point = self.mounted_at(share)
+            if self.actual_mounts is None:
+                status = "Checking…"
+            else:
+                status = "Mounted" if mount_point else "Not Mounted"
+            sample = self.io_stats.latest(mount_point) if mount_point else None
+            if mount_point:
+                self.row_mount_points[share.id] = mount_point
+            self.shares_tree.insert("", tk.END, iid=share.id, values=(
+                share.username,
+                share.share,
+                share.mount_point,
+                profile_label(share.profile),
+                status,
+                format_throughput(sample),
+                format_latency(sample),
+                format_capacity(*self.capacity.get(mount_point)) if mount_point else "–"
             ))
+        self.shares_tree.selection_set([iid for iid in selection if self.shares.get(iid)])
+
+    def refresh_live_columns(self):
+        """Update the I/O and Free Space cells from the collectors' caches"""
+        for share_id, mount_point in self.row_mount_points.items():
+            if not self.shares_tree.exists(share_id):
+                continue
+            sample = self.io_stats.latest(mount_point)
+            self.shares_tree.set(share_id, "throughput", format_throughput(sample))
+            self.shares_tree.set(share_id, "latency", format_latency(sample))
+            self.shares_tree.set(share_id, "capacity", format_capacity(*self.capacity.get(mount_point)))
+        self.live_refresh = self.after(self.io_stats.interval * 1000, self.refresh_live_columns)
+
     def mount_selected(self):
         """Mount selected shares"""
         selected = self.shares_tree.selection()
@@ -477,26 +716,44 @@ class GUIManager(tk.Tk):
         hostname = self.hostname_var.get()
         port = self.port_var.get()
         
+        jobs = []
         for item in selected:
-            values = self.shares_tree.item(item)["values"]
-            username = values[0]
-            share_path = values[1]
-            
-            password = self.config_manager.get_share_password(username, share_path)
-            
-            if not password:
-                messagebox.showerror("Error", f"No password found for {share_path}")
+            share = self.shares.get(item)
+            try:
+                options = mount_options(share, defaults=self.config.get("cifs_default_options"))
+            except ValueError as e:
+                messagebox.showerror("Error", f"Failed to mount {share.share}: {str(e)}")
                 continue
-            
-            success, error = self.mount_manager.mount_share(
-                hostname, port, share_path, None, username, password
-            )
-            
+            jobs.append((share.username, share.share, share.mount_point, options))
+        if not jobs:
+            return
+
+        def mount():
+            # Keychain lookups, the route probe and the mount itself all block
+            results = []
+            for username, share_path, mount_point, options in jobs:
+                password = self.config_manager.get_share_password(username, share_path)
+                if not password:
+                    results.append((share_path, False, "No password found"))
+                    continue
+                success, error = self.mount_manager.mount_share(
+                    hostname, port, share_path, mount_point, username, password, options=options
+                )
+                results.append((share_path, success, error))
+            return results
+
+        self.run_in_background(mount, self.on_mount_selected_done)
+
+    def on_mount_selected_done(self, results, error):
+        if error:
+            messagebox.showerror("Error", f"Mount failed: {str(error)}")
+        for share_path, success, message in results or ():
             if success:
                 messagebox.showinfo("Success", f"Successfully mounted {share_path}")
+            elif message == "No password found":
+                messagebox.showerror("Error", f"No password found for {share_path}")
             else:
-                messagebox.showerror("Error", f"Failed to mount {share_path}: {error}")
-        
+                messagebox.showerror("Error", f"Failed to mount {share_path}: {message}")
         self.refresh_shares_list()
 
 
@@ -507,17 +764,67 @@ class GUIManager(tk.Tk):
             messagebox.showwarning("No Selection", "Please select shares to unmount.")
             return
         
-        for item in selected:
-            values = self.shares_tree.item(item)["values"]
-            share_path = values[1]
-            
-            success, error = self.mount_manager.unmount_share(share_path)
-            
+        jobs = [(share.share, self.mounted_at(share) or share.mount_point)
+                for share in map(self.shares.get, selected)]
+
+        def unmount():
+            return [(share_path, *self.mount_manager.unmount_share(share_path, mount_point=mount_point))
+                    for share_path, mount_point in jobs]
+
+        self.run_in_background(unmount, self.on_unmount_selected_done)
+
+    def on_unmount_selected_done(self, results, error):
+        if error:
+            messagebox.showerror("Error", f"Unmount failed: {str(error)}")
+        for share_path, success, message in results or ():
             if success:
                 messagebox.showinfo("Success", f"Successfully unmounted {share_path}")
             else:
-                messagebox.showerror("Error", f"Failed to unmount {share_path}: {error}")
+                messagebox.showerror("Error", f"Failed to unmount {share_path}: {message}")
+        self.refresh_shares_list()
+
+    def show_search(self):
+        """Open the filename search window"""
+        shares = list(self.shares)
+        SearchDialog(self, lambda query: self.index_manager.search(shares, query))
+
+    def speed_test_selected(self):
+        """Run a speed test against the selected share's mount point"""
+        selected = self.shares_tree.selection()
+        if not selected:
+            messagebox.showwarning("No Selection", "Please select a share to test.")
+            return
+        if getattr(self, "speed_test_running", False):
+            messagebox.showinfo("Speed Test", "A speed test is already running.")
+            return
         
+        share = self.shares.get(selected[0])
+        username, share_path = share.username, share.share
+        mount_point = self.mounted_at(share) or share.mount_point
+        store = self.config_manager.store
+
+        def run():
+            # ismount() can hang on a dead server, so it is checked here too
+            if not self.mount_manager.is_mounted(mount_point):
+                raise OSError(f"{share_path} is not mounted at {mount_point}")
+            results = SpeedTest(mount_point).run()
+            previous = store.speed_tests(username, share_path, limit=1)
+            store.record_speed_test(results, username, share_path)
+            return results, previous
+
+        def on_done(result, error):
+            self.speed_test_running = False
+            if error:
+                messagebox.showerror("Speed Test", f"Speed test failed: {str(error)}")
+                return
+            results, previous = result
+            message = format_results(results)
+            if previous:
+                message += "\n\n" + compare_results(results, previous[0])
+            messagebox.showinfo("Speed Test", message)
+
+        self.speed_test_running = True
+        self.run_in_background(run, on_done)
 
     def toggle_autostart(self):
         """Toggle autostart functionality"""
@@ -579,7 +886,7 @@ class GUIManager(tk.Tk):
         
 
     def connect_all(self):
-        """Connect all configured shares with delay between each"""
+        """Mount the auto_mount shares that aren't mounted yet, in the background"""
         hostname = self.hostname_var.get()
         port = self.port_var.get()
         
@@ -587,38 +894,20 @@ class GUIManager(tk.Tk):
             messagebox.showerror("Error", "Please configure hostname and port first.")
             return
         
-        success_count = 0
-        error_messages = []
-        
-        # Get all shares
-        shares = self.config.get("shares", [])
-        total_shares = len(shares)
-        
-        # Show progress
-        for i, share in enumerate(shares, 1):
-            username = share["username"]
-            share_path = share["share"]
-            mount_point = share.get("mount_point", f"/Volumes/{os.path.basename(share_path)}")
-            
-            password = self.config_manager.get_share_password(username, share_path)
-            
-            if not password:
-                error_messages.append(f"No password found for {share_path}")
-                continue
-            
-            success, error = self.mount_manager.mount_share(
-                hostname, port, share_path, mount_point, username, password
-            )
-            
-            if success:
-                success_count += 1
-                messagebox.showinfo("Progress", f"Mounted {i}/{total_shares}: {share_path}")
-            else:
-                error_messages.append(f"Failed to mount {share_path}: {error}")
-            
-            # Add 5 second delay between mounts, but not after the last one
-            if i < total_shares:
-                self.after(2000)  # 5000 milliseconds = 5 seconds
+        shares = list(self.shares)
+
+        def reconcile():
+            mounted, _, errors = self.reconciler.apply(self.reconciler.plan(shares), hostname, port)
+            return mounted, errors
+
+        self.run_in_background(reconcile, self.on_connect_all_done)
+
+    def on_connect_all_done(self, result, error):
+        if error:
+            messagebox.showerror("Mount Status", f"Connect All failed: {str(error)}")
+            return
+        mounted, error_messages = result
+        success_count = len(mounted)
         
         self.refresh_shares_list()
         
@@ -629,4 +918,5 @@ class GUIManager(tk.Tk):
             messagebox.showinfo("Mount Status", message)
         elif error_messages:
             messagebox.showerror("Mount Status", "\n".join(error_messages))
-        
+        else:
+            messagebox.showinfo("Mount Status", "All shares are already mounted")
@@ -0,0 +1,176 @@
+# File: src/idle_monitor.py
+import socket
+import subprocess
+import sys
+import time
+import logging
+
+from src.io_stats import read_cifs_stats, share_key
+from src.reconciler import read_mount_table
+
+logger = logging.getLogger('SMBManager')
+
+CHECK_INTERVAL = 60
+LSOF_TIMEOUT = 10
+NETTOP_TIMEOUT = 10
+
+
+def idle_timeout(share):
+    """Minutes of inactivity after which the share is unmounted; 0 means never"""
+    try:
+        return max(0, int(share.get("idle_timeout") or 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def open_files(mount_point):
+    """True if any process has a file (or its cwd) open on the mount
+
+    Given a mount point, lsof lists every open file on that file system.
+    Errors and timeouts count as "in use" so a slow lsof never unmounts
+    a share someone is working in.
+    """
+    try:
+        result = subprocess.run(['lsof', '-w', '-t', '--', mount_point],
+                                capture_output=True, text=True, timeout=LSOF_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"lsof failed for {mount_point}: {str(e)}")
+        return True
+    # lsof exits 1 with no output when nothing is open
+    if result.returncode not in (0, 1):
+        return True
+    return bool(result.stdout.strip())
+
+
+def parse_nettop(text):
+    """Parse `nettop -m tcp -L 1 -n -x -J bytes_in,bytes_out` CSV
+
+    Returns {remote address: bytes in + out} over the connections of
+    kernel_task, which owns the sockets of the kernel smbfs client.
+    """
+    traffic = {}
+    process = None
+    for line in text.splitlines():
+        fields = [field.strip() for field in line.split(",")]
+        name = next((field for field in fields if "<->" in field), None)
+        if name is None:
+            process = next((field for field in fields if field and not field[0].isdigit()), process)
+            continue
+        if not (process or "").startswith("kernel_task"):
+            continue
+        numbers = [int(field) for field in fields if field.isdigit()]
+        if len(numbers) < 2:
+            continue
+        # "tcp4 10.0.0.2:49320<->10.0.0.5:445", IPv6 as "fe80::2%en0.445"
+        remote = name.partition("<->")[2]
+        address = remote.rpartition("." if remote.count(":") > 1 else ":")[0].partition("%")[0]
+        traffic[address] = traffic.get(address, 0) + numbers[-2] + numbers[-1]
+    return traffic
+
+
+def kernel_connection_traffic():
+    """{remote address: bytes} of kernel TCP connections (macOS); None if nettop fails"""
+    try:
+        result = subprocess.run(['nettop', '-m', 'tcp', '-L', '1', '-n', '-x', '-J', 'bytes_in,bytes_out'],
+                                capture_output=True, text=True, timeout=NETTOP_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"nettop failed: {str(e)}")
+        return None
+    if result.returncode != 0:
+        return None
+    return parse_nettop(result.stdout)
+
+
+def host_addresses(host):
+    try:
+        return {info[4][0].partition("%")[0] for info in socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)}
+    except (socket.gaierror, UnicodeError):
+        return {host}
+
+
+def io_signature(counters):
+    """Single number that changes whenever the share sees traffic"""
+    if counters is None:
+        return None
+    return (counters["bytes_read"] + counters["bytes_written"]
+            + sum(total for total, _ in counters["ops"].values()))
+
+
+class IdleMonitor:
+    """Decides which mounted shares have been idle for their idle_timeout
+
+    A share counts as active while its I/O counters move or any process
+    has files open on it. Linux has per-share cifs counters; macOS only
+    has the byte counters of the kernel's connection to the server, so
+    there traffic to any share on a server keeps all of them mounted.
+    Without any counter a share is never considered idle. Only shares
+    with an idle_timeout are tracked; the caller does the unmounting.
+    """
+
+    def __init__(self, mount_table=read_mount_table, stats_reader=read_cifs_stats,
+                 open_files=open_files, clock=time.monotonic, connection_traffic=None):
+        self.mount_table = mount_table
+        self.stats_reader = stats_reader
+        self.open_files = open_files
+        self.clock = clock
+        if connection_traffic is None and sys.platform == "darwin":
+            connection_traffic = kernel_connection_traffic
+        self.connection_traffic = connection_traffic
+        # share id -> (mount point, last io signature, last activity time)
+        self.activity = {}
+        # Shares this monitor unmounted, for quick remount from the menu
+        self.idle_unmounted = {}
+
+    def idle_shares(self, shares):
+        """Return [(share, mount_point, idle_minutes)] due for unmounting"""
+        now = self.clock()
+        table = self.mount_table()
+        by_path = {}
+        for mount_point, device in table.items():
+            by_path.setdefault(share_key(device)[1], []).append(mount_point)
+        counters = None
+        traffic = None
+        due = []
+        seen = set()
+        for share in shares:
+            timeout = idle_timeout(share)
+            if not timeout:
+                continue
+            mount_point = share.mount_point if share.mount_point in table else None
+            if mount_point is None:
+                candidates = by_path.get(share.share.lower(), [])
+                mount_point = candidates[0] if len(candidates) == 1 else None
+            if mount_point is None:
+                continue
+            seen.add(share.id)
+            self.idle_unmounted.pop(share.id, None)
+            if counters is None:
+                counters = self.stats_reader()
+            host, path = share_key(table[mount_point])
+            signature = io_signature(counters.get((host, path)))
+            if signature is None and self.connection_traffic:
+                if traffic is None:
+                    traffic = self.connection_traffic() or {}
+                signature = sum(traffic.get(address, 0) for address in host_addresses(host)) or None
+            previous = self.activity.get(share.id)
+            if signature is None or previous is None or previous[0] != mount_point or previous[1] != signature:
+                # No counter to go by, newly mounted, or traffic since the last check
+                self.activity[share.id] = (mount_point, signature, now)
+                continue
+            idle = now - previous[2]
+            if idle < timeout * 60:
+                continue
+            if self.open_files(mount_point):
+                self.activity[share.id] = (mount_point, signature, now)
+                continue
+            due.append((share, mount_point, idle / 60))
+        for share_id in set(self.activity) - seen:
+            del self.activity[share_id]
+        return due
+
+    def mark_unmounted(self, share):
+        self.activity.pop(share.id, None)
+        self.idle_unmounted[share.id] = self.clock()
+
+    def forget(self, share_id):
+        self.idle_unmounted.pop(share_id, None)
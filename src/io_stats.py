@@ -0,0 +1,314 @@
+# File: src/io_stats.py
+import os
+import re
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from src.reconciler import read_mount_table
+
+logger = logging.getLogger('SMBManager')
+
+CIFS_STATS = "/proc/fs/cifs/Stats"
+SAMPLE_INTERVAL = 5
+# Ten minutes of samples at the default interval
+HISTORY = 120
+# A stat() of the mount point slower than this counts as a stalled probe
+PROBE_TIMEOUT = 2.0
+
+# Command numbers of the CONFIG_CIFS_STATS2 timing table (MS-SMB2 2.2.1)
+SMB2_COMMANDS = ("NEGOTIATE", "SESSION_SETUP", "LOGOFF", "TREE_CONNECT", "TREE_DISCONNECT",
+                 "CREATE", "CLOSE", "FLUSH", "READ", "WRITE", "LOCK", "IOCTL", "CANCEL", "ECHO",
+                 "QUERY_DIRECTORY", "CHANGE_NOTIFY", "QUERY_INFO", "SET_INFO", "OPLOCK_BREAK")
+# Operations whose latency is kept in the history
+LATENCY_OPS = ("READ", "WRITE", "CREATE", "QUERY_INFO", "QUERY_DIRECTORY")
+
+# Share names may contain spaces; a share waiting to reconnect is flagged after a tab
+SHARE_HEADER = re.compile(r'^\d+\) (?P<unc>\\\\.+?)(?P<disconnected>\s+DISCONNECTED)?\s*$')
+OP_COUNTER = re.compile(r'^(?P<name>\w+): (?P<total>\d+) total (?P<failed>\d+) failed')
+BYTES_LINE = re.compile(r'^Bytes read: (?P<read>\d+)\s+Bytes written: (?P<written>\d+)')
+# SMB1 mounts report bytes on the Reads/Writes lines instead
+SMB1_BYTES = re.compile(r'^(?P<name>Reads|Writes):\s+(?P<total>\d+) Bytes: (?P<bytes>\d+)')
+TIMING_HEADER = re.compile(r'Time units are jiffies \((?P<hz>\d+) per second\)')
+TIMING_ROW = re.compile(r'^\s*(?P<cmd>\d+)\s+(?P<count>\d+)\s+(?P<total>\d+)\s+\d+\s+\d+\s*$')
+
+
+def share_key(unc_or_device):
+    """"\\\\host\\Share" or "//user@host:port/Share" -> ("host", "/share")"""
+    value = unc_or_device.replace("\\", "/").lstrip("/")
+    host, _, path = value.partition("/")
+    host = host.rpartition("@")[2]
+    if host.startswith("["):
+        host = host[1:].partition("]")[0]
+    elif host.count(":") == 1:
+        host = host.partition(":")[0]
+    return host.lower(), "/" + path.strip("/").lower()
+
+
+def parse_cifs_stats(text):
+    """Parse /proc/fs/cifs/Stats into {(host, share_path): counters}
+
+    counters has bytes_read, bytes_written, ops ({name: (total, failed)}),
+    latency ({command: (count, total_ms)}) and disconnected. The latency
+    table only exists with CONFIG_CIFS_STATS2 and is per server, so every
+    share on that server gets the same table.
+    """
+    shares = {}
+    current = None
+    hz = 1000
+    timing = {}
+    in_timing = False
+    for line in text.splitlines():
+        header = TIMING_HEADER.search(line)
+        if header:
+            hz = int(header.group("hz"))
+            timing = {}
+            in_timing = True
+            continue
+        match = SHARE_HEADER.match(line)
+        if match:
+            in_timing = False
+            current = {"bytes_read": 0, "bytes_written": 0, "ops": {}, "latency": timing,
+                       "disconnected": bool(match.group("disconnected"))}
+            shares[share_key(match.group("unc"))] = current
+            continue
+        if in_timing:
+            row = TIMING_ROW.match(line)
+            if row and int(row.group("cmd")) < len(SMB2_COMMANDS):
+                timing[SMB2_COMMANDS[int(row.group("cmd"))]] = (
+                    int(row.group("count")), int(row.group("total")) * 1000.0 / hz)
+            continue
+        if current is None:
+            continue
+        line = line.strip()
+        match = BYTES_LINE.match(line)
+        if match:
+            current["bytes_read"] = int(match.group("read"))
+            current["bytes_written"] = int(match.group("written"))
+            continue
+        match = SMB1_BYTES.match(line)
+        if match:
+            current["ops"][match.group("name")] = (int(match.group("total")), 0)
+            current["bytes_read" if match.group("name") == "Reads" else "bytes_written"] = int(match.group("bytes"))
+            continue
+        match = OP_COUNTER.match(line)
+        if match:
+            current["ops"][match.group("name")] = (int(match.group("total")), int(match.group("failed")))
+    return shares
+
+
+def read_cifs_stats(path=CIFS_STATS):
+    """Counters of the kernel cifs client; empty where there is none (macOS)"""
+    try:
+        with open(path, 'r') as f:
+            return parse_cifs_stats(f.read())
+    except OSError:
+        return {}
+
+
+class IOSample:
+    """Rates over one sampling interval; None where the platform has no counter"""
+
+    __slots__ = ("time", "read_bps", "write_bps", "ops_per_sec", "latency", "probe_ms")
+
+    def __init__(self, time, read_bps=None, write_bps=None, ops_per_sec=None, latency=None, probe_ms=None):
+        self.time = time
+        self.read_bps = read_bps
+        self.write_bps = write_bps
+        self.ops_per_sec = ops_per_sec
+        # Average ms per operation, aligned with LATENCY_OPS
+        self.latency = latency
+        self.probe_ms = probe_ms
+
+    def op_latency(self, name):
+        if self.latency is None:
+            return None
+        return self.latency[LATENCY_OPS.index(name)]
+
+
+def compute_sample(previous, current, elapsed, now, probe_ms=None):
+    """Turn two raw counter snapshots into an IOSample"""
+    if previous is None or current is None or elapsed <= 0:
+        return IOSample(now, probe_ms=probe_ms)
+    ops_delta = (sum(total for total, _ in current["ops"].values())
+                 - sum(total for total, _ in previous["ops"].values()))
+    latency = None
+    if current["latency"]:
+        latency = []
+        for name in LATENCY_OPS:
+            count, total_ms = current["latency"].get(name, (0, 0.0))
+            old_count, old_ms = previous["latency"].get(name, (0, 0.0))
+            latency.append((total_ms - old_ms) / (count - old_count) if count > old_count else None)
+        latency = tuple(latency)
+    return IOSample(
+        now,
+        max(0, current["bytes_read"] - previous["bytes_read"]) / elapsed,
+        max(0, current["bytes_written"] - previous["bytes_written"]) / elapsed,
+        max(0, ops_delta) / elapsed,
+        latency,
+        probe_ms
+    )
+
+
+class IOStatsCollector:
+    """Samples per-mount I/O counters on a schedule into per-mount ring buffers
+
+    Throughput and per-command latency come from the kernel cifs client
+    (Linux). Everywhere, each sample also times a stat() of the mount
+    point, which is the only latency signal macOS exposes per mount.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, history=HISTORY,
+                 mount_table=read_mount_table, stats_reader=read_cifs_stats):
+        self.interval = interval
+        self.history = history
+        self.mount_table = mount_table
+        self.stats_reader = stats_reader
+        self.samples = {}
+        self.previous = {}
+        self.previous_time = None
+        self.probes = {}
+        self.probe_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="IOProbe")
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread and self.thread.is_alive() and not self.stop_event.is_set():
+            return
+        # A fresh event, so a stopped thread still finishing its sample stays stopped
+        self.stop_event = threading.Event()
+        # The first sample after a pause has nothing recent to compare against
+        self.previous_time = None
+        self.thread = threading.Thread(target=self._run, args=(self.stop_event,), name="IOStats", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self, stop_event):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"I/O stats sample failed: {str(e)}")
+            if stop_event.wait(self.interval):
+                return
+
+    def probe(self, mount_point):
+        """Time a stat() of the mount point; None if it stalls
+
+        A stalled probe is left running and the mount isn't probed again
+        until it returns, so a hung server never ties up more than one worker.
+        """
+        future = self.probes.get(mount_point)
+        if future is None or future.done():
+            future = self.probe_executor.submit(self._timed_stat, mount_point)
+            self.probes[mount_point] = future
+        else:
+            return None
+        try:
+            return future.result(timeout=PROBE_TIMEOUT)
+        except (TimeoutError, OSError):
+            return None
+
+    @staticmethod
+    def _timed_stat(mount_point):
+        start = time.monotonic()
+        os.stat(mount_point)
+        return (time.monotonic() - start) * 1000
+
+    def sample(self, probe=True):
+        table = self.mount_table()
+        counters = self.stats_reader()
+        now = time.time()
+        elapsed = now - self.previous_time if self.previous_time else 0
+        current = {}
+        for mount_point, device in table.items():
+            raw = counters.get(share_key(device))
+            current[mount_point] = raw
+            sample = compute_sample(self.previous.get(mount_point), raw, elapsed, now,
+                                    self.probe(mount_point) if probe else None)
+            with self.lock:
+                history = self.samples.get(mount_point)
+                if history is None:
+                    history = self.samples[mount_point] = deque(maxlen=self.history)
+                history.append(sample)
+        with self.lock:
+            for mount_point in set(self.samples) - set(table):
+                del self.samples[mount_point]
+        self.previous = current
+        self.previous_time = now
+
+    def latest(self, mount_point):
+        with self.lock:
+            history = self.samples.get(mount_point)
+            return history[-1] if history else None
+
+    def history_for(self, mount_point):
+        with self.lock:
+            return list(self.samples.get(mount_point, ()))
+
+
+def format_rate(bps):
+    if bps is None:
+        return "–"
+    for unit in ("B/s", "KB/s", "MB/s"):
+        if bps < 1024:
+            return f"{bps:.0f} {unit}"
+        bps /= 1024
+    return f"{bps:.1f} GB/s"
+
+
+def format_latency(sample):
+    """Read/write latency when the kernel reports it, else the stat() probe"""
+    if sample is None:
+        return "–"
+    if sample.latency is not None:
+        parts = [f"{label} {value:.1f}" for label, value in
+                 (("r", sample.op_latency("READ")), ("w", sample.op_latency("WRITE"))) if value is not None]
+        if parts:
+            return " / ".join(parts) + " ms"
+    if sample.probe_ms is not None:
+        return f"{sample.probe_ms:.0f} ms"
+    return "–"
+
+
+def format_throughput(sample):
+    if sample is None or sample.read_bps is None:
+        return "–"
+    return f"↓{format_rate(sample.read_bps)} ↑{format_rate(sample.write_bps)}"
+
+
+def format_stats(collector, mount_points):
+    """Table of the latest sample per mount point, for --stats"""
+    lines = [f"{'Mount point':<30} {'Read':>11} {'Write':>11} {'Ops/s':>7} {'Probe':>7}  Latency (ms)"]
+    for mount_point in mount_points:
+        sample = collector.latest(mount_point)
+        if sample is None:
+            continue
+        ops = "–" if sample.ops_per_sec is None else f"{sample.ops_per_sec:.1f}"
+        probe = "–" if sample.probe_ms is None else f"{sample.probe_ms:.0f}"
+        latency = ""
+        if sample.latency is not None:
+            latency = "  ".join(f"{name.lower()} {value:.1f}" for name, value in zip(LATENCY_OPS, sample.latency)
+                                if value is not None)
+        lines.append(f"{mount_point:<30} {format_rate(sample.read_bps):>11} {format_rate(sample.write_bps):>11} "
+                     f"{ops:>7} {probe:>7}  {latency or '–'}")
+    return "\n".join(lines)
+
+
+def format_counters(counters):
+    """Raw counters of a parsed Stats file, for --stats --cifs-stats FILE"""
+    lines = []
+    for (host, path), data in sorted(counters.items()):
+        lines.append(f"//{host}{path}: read {data['bytes_read']} B, written {data['bytes_written']} B"
+                     + (" (disconnected)" if data["disconnected"] else ""))
+        for name, (total, failed) in data["ops"].items():
+            lines.append(f"  {name}: {total} ({failed} failed)")
+        for name, (count, total_ms) in data["latency"].items():
+            if count:
+                lines.append(f"  {name}: {count} in {total_ms:.0f} ms (avg {total_ms / count:.2f} ms)")
+    return "\n".join(lines) or "No SMB shares in the stats file"
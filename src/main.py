@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 import sys
 import os
+import signal
+import time
 import logging
 from datetime import datetime
 
@@ -29,12 +31,203 @@ def check_tk():
         logger.error(f"Tk initialization failed: {str(e)}", exc_info=True)
         return False
 
+def run_share_io(args):
+    """Handle --import/--export from the command line"""
+    from src.config_manager import ConfigManager
+    from src import share_io
+
+    config_manager = ConfigManager()
+    if args.export_file:
+        count = share_io.export_shares(config_manager.load_config().get("shares", []), args.export_file)
+        print(f"Exported {count} shares to {args.export_file}")
+        return 0
+
+    diff, passwords, errors = share_io.import_shares(config_manager, args.import_file, dry_run=args.dry_run)
+    print(share_io.format_diff(diff, passwords))
+    if errors:
+        print("\n".join(errors), file=sys.stderr)
+        return 1
+    if args.dry_run:
+        print("Dry run, nothing was changed")
+    return 0
+
+def run_speed_test(args):
+    """Handle --speedtest from the command line"""
+    from src.config_manager import ConfigManager
+    from src.speed_test import (SpeedTest, DEFAULT_BLOCK_SIZES, parse_size,
+                                format_results, compare_results)
+
+    path = os.path.abspath(args.speedtest)
+    block_sizes = [parse_size(size) for size in args.block_size] if args.block_size else DEFAULT_BLOCK_SIZES
+    test = SpeedTest(path, block_sizes=block_sizes, file_size=parse_size(args.file_size),
+                     progress=lambda message: print(f"... {message}"))
+    results = test.run()
+
+    # Store the result against the share mounted at this path, if any
+    config_manager = ConfigManager()
+    share = next((s for s in config_manager.load_config().get("shares", [])
+                  if (s.get("mount_point") or f"/Volumes/{os.path.basename(s['share'])}") == path), None)
+    store = config_manager.store
+    # With --compare, compare against the newest run with that label (e.g. before tuning)
+    limit = 100 if args.compare else 1
+    if share:
+        previous = store.speed_tests(share["username"], share["share"], limit=limit)
+        store.record_speed_test(results, share["username"], share["share"], label=args.label)
+    else:
+        previous = store.speed_tests(path=path, limit=limit)
+        store.record_speed_test(results, label=args.label)
+    if args.compare:
+        previous = [run for run in previous if run["label"] == args.compare][:1]
+        if not previous:
+            print(f"No earlier run labelled {args.compare}", file=sys.stderr)
+
+    print(format_results(results))
+    if previous:
+        print(compare_results(results, previous[0]))
+    return 0
+
+def run_tuning(args):
+    """Handle --tune/--tune-restore from the command line"""
+    from src.config_manager import ConfigManager
+    from src.smb_tuning import PRESETS, get_tuner
+
+    tuner = get_tuner(ConfigManager())
+    if args.tune_restore:
+        success, error = tuner.restore()
+        print("Previous settings restored" if success else error)
+        return 0 if success else 1
+    if args.tune == "list":
+        for name, preset in PRESETS.items():
+            print(f"{name:18} {preset['description']}")
+        return 0
+    try:
+        _, _, diff = tuner.plan(args.tune)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    print(diff or "Settings already match this preset")
+    if args.dry_run or not diff:
+        return 0
+    _, backup = tuner.apply(args.tune)
+    print(f"Applied {args.tune}; previous settings saved to {backup}. "
+          "Remount shares for the change to take effect.")
+    return 0
+
+def run_mirror(args):
+    """Handle --mirror from the command line"""
+    from src.config_manager import ConfigManager
+    from src.mount_manager import MountManager
+    from src.mirror import MirrorManager
+
+    config = ConfigManager().load_config()
+    shares = [s for s in config.get("shares", []) if s["share"] == args.mirror]
+    if not shares:
+        print(f"No configured share {args.mirror}", file=sys.stderr)
+        return 1
+    mirror_manager = MirrorManager(MountManager())
+    for share in shares:
+        summary = mirror_manager.sync_share(share)
+        if summary is None:
+            print(f"{share['share']} has no offline folders or is not mounted", file=sys.stderr)
+            return 1
+        print(f"{share['share']}: {summary['copied']} copied, {summary['skipped']} unchanged, "
+              f"{summary['deleted']} deleted, {summary['files']} files in {summary['seconds']:.1f}s")
+        for error in summary["errors"]:
+            print(f"  {error}", file=sys.stderr)
+    return 0
+
+def run_copy(args):
+    """Handle --copy from the command line"""
+    from src.transfer import BulkCopier, format_rate
+
+    def show_progress(stats):
+        print(f"\r{stats['files_done']}/{stats['files_total']} files, "
+              f"{stats['bytes_done'] / 1e6:.0f}/{stats['bytes_total'] / 1e6:.0f} MB, "
+              f"{format_rate(stats['rate'])}   ", end="", flush=True)
+
+    source, destination = args.copy
+    copier = BulkCopier(source, destination, workers=args.workers, verify=args.verify,
+                        progress=show_progress)
+    summary = copier.run()
+    print(f"\rCopied {summary['files_done']} of {summary['files_total']} files "
+          f"({summary['skipped']} already up to date) at {format_rate(summary['average_rate'])}")
+    for error in summary["errors"]:
+        print(f"  {error}", file=sys.stderr)
+    return 1 if summary["errors"] else 0
+
+def run_index(args):
+    """Handle --index/--search from the command line"""
+    from src.config_manager import ConfigManager
+    from src.mount_manager import MountManager
+    from src.file_indexer import IndexManager
+
+    shares = ConfigManager().load_config().get("shares", [])
+    index_manager = IndexManager(MountManager())
+    if args.index:
+        matching = [s for s in shares if s["share"] == args.index]
+        if not matching:
+            print(f"No configured share {args.index}", file=sys.stderr)
+            return 1
+        for share in matching:
+            if not index_manager.refresh_share(share, force=True):
+                print(f"{share['share']} is not mounted", file=sys.stderr)
+                return 1
+            print(f"Indexed {len(index_manager.get_index(share).paths)} entries in {share['share']}")
+    if args.search:
+        for path in index_manager.search(shares, args.search):
+            print(path)
+    return 0
+
+def run_reconcile(args):
+    """Handle --reconcile from the command line"""
+    from src.config_manager import ConfigManager
+    from src.mount_manager import MountManager
+    from src.reconciler import Reconciler, format_plan
+
+    config = ConfigManager().load_config()
+    mount_manager = MountManager()
+    reconciler = Reconciler(mount_manager)
+    actions = reconciler.plan(config.get("shares", []),
+                              target="unmounted" if args.reconcile == "unmounted" else "config")
+    print(format_plan(actions))
+    if args.dry_run or not actions:
+        return 0
+    mounted, unmounted, errors = reconciler.apply(actions, config.get("hostname", ""), config.get("port", "8445"))
+    print(f"Mounted {len(mounted)}, unmounted {len(unmounted)}")
+    for error in errors:
+        print(f"  {error}", file=sys.stderr)
+    return 1 if errors else 0
+
+def run_stats(args):
+    """Handle --stats: sample the mounted shares twice and print their rates"""
+    from src.io_stats import IOStatsCollector, format_stats, format_counters, read_cifs_stats
+
+    if args.cifs_stats:
+        print(format_counters(read_cifs_stats(args.cifs_stats)))
+        return 0
+    collector = IOStatsCollector()
+    collector.sample(probe=False)
+    time.sleep(args.stats)
+    collector.sample()
+    mount_points = sorted(collector.samples)
+    if not mount_points:
+        print("No SMB shares mounted")
+        return 0
+    print(format_stats(collector, mount_points))
+    return 0
+
 def main():
     try:
         # Add version check
         if sys.version_info < (3, 6):
             raise RuntimeError("Python 3.6 or higher is required")
             
+        if sys.argv[1:2] == ['--mount-helper']:
+            # Long-lived helper started by MountHelperClient; stdout is its protocol channel.
+            # It only needs the standard library, so it starts before rumps and keyring.
+            from src.mount_helper import main as mount_helper_main
+            sys.exit(mount_helper_main(sys.argv[2:]))
+
         # Import dependencies with error handling
         try:
             import rumps
@@ -48,8 +241,110 @@ def main():
         parser = argparse.ArgumentParser(description='SMB Connection Manager')
         parser.add_argument('--gui', action='store_true', help='Launch GUI')
         parser.add_argument('--menubar', action='store_true', help='Launch menubar app')
+        parser.add_argument('--helper', action='store_true', help=argparse.SUPPRESS)
+        parser.add_argument('--import', dest='import_file', metavar='FILE',
+                            help='Import share definitions from a CSV or JSON file')
+        parser.add_argument('--export', dest='export_file', metavar='FILE',
+                            help='Export share definitions to a CSV or JSON file')
+        parser.add_argument('--dry-run', action='store_true', help='Show what an import, reconcile or tune would change')
+        parser.add_argument('--simulate-schedule', action='store_true',
+                            help='Compare list-order mounting with the adaptive scheduler in simulation')
+        parser.add_argument('--speedtest', metavar='PATH',
+                            help='Measure throughput and latency of a mounted share (or any directory)')
+        parser.add_argument('--block-size', action='append', metavar='SIZE',
+                            help='Block size for --speedtest, e.g. 64K or 1M (repeatable)')
+        parser.add_argument('--file-size', default='64M', metavar='SIZE',
+                            help='Size of the sequential test file for --speedtest')
+        parser.add_argument('--label', help='Label stored with the --speedtest result')
+        parser.add_argument('--compare', metavar='LABEL',
+                            help='Compare --speedtest with the last run stored under LABEL')
+        parser.add_argument('--tune', metavar='PRESET',
+                            help='Apply an SMB client tuning preset (nsmb.conf / cifs defaults); "list" shows them')
+        parser.add_argument('--tune-restore', action='store_true',
+                            help='Restore the SMB client settings saved before the last --tune')
+        parser.add_argument('--mirror', metavar='SHARE',
+                            help='Sync the offline folders of a configured share now')
+        parser.add_argument('--copy', nargs=2, metavar=('SOURCE', 'DEST'),
+                            help='Copy a file or folder to or from a mounted share in parallel')
+        parser.add_argument('--workers', type=int, default=8, help='Parallel copies for --copy')
+        parser.add_argument('--verify', action='store_true', help='Verify --copy with SHA-256 checksums')
+        parser.add_argument('--search', metavar='QUERY', help='Search the filename index of all shares')
+        parser.add_argument('--index', metavar='SHARE', help='Rebuild the filename index of a mounted share')
+        parser.add_argument('--memory-soak', type=int, nargs='?', const=1000, metavar='CYCLES',
+                            help='Run mount/unmount cycles against a fake backend and check memory growth')
+        parser.add_argument('--memory-report', action='store_true',
+                            help='Ask the running menubar app to write a memory report')
+        parser.add_argument('--reconcile', nargs='?', const='config', choices=['config', 'unmounted'],
+                            help='Mount/unmount shares to match the config (or unmount all)')
+        parser.add_argument('--stats', type=float, nargs='?', const=5, metavar='SECONDS',
+                            help='Show throughput and latency of mounted shares over SECONDS (default 5)')
+        parser.add_argument('--cifs-stats', metavar='FILE',
+                            help='With --stats, parse a saved /proc/fs/cifs/Stats instead of sampling')
+        parser.add_argument('--profile', action='store_true',
+                            help='Run --reconcile under cProfile and save the stats next to the logs')
+        parser.add_argument('--profile-running', action='store_true',
+                            help='Ask the running menubar app to sample all threads for 30 seconds')
         args = parser.parse_args()
 
+        if args.memory_soak:
+            from src.memory_monitor import soak, format_soak, format_mb
+            result = soak(args.memory_soak, progress=lambda cycle, rss: print(f"cycle {cycle}: {format_mb(rss)}"))
+            print(format_soak(result))
+            sys.exit(0 if result["passed"] else 1)
+
+        if args.memory_report:
+            from src.memory_monitor import request_snapshot
+            success, error = request_snapshot()
+            if not success:
+                print(error, file=sys.stderr)
+                sys.exit(1)
+            print("Report requested; see ~/Library/Logs/SMBManager/memory_*.txt")
+            sys.exit(0)
+
+        if args.profile_running:
+            from src.memory_monitor import signal_app
+            success, error = signal_app(signal.SIGUSR1)
+            if not success:
+                print(error, file=sys.stderr)
+                sys.exit(1)
+            print("Profile requested; see ~/Library/Logs/SMBManager/profile_stacks_*.txt")
+            sys.exit(0)
+
+        if args.stats or args.cifs_stats:
+            args.stats = args.stats or 5
+            sys.exit(run_stats(args))
+
+        if args.reconcile:
+            if args.profile:
+                from src.profiler import profile_call
+                code, path = profile_call("reconcile", run_reconcile, args)
+                print(f"cProfile stats saved to {path}")
+                sys.exit(code)
+            sys.exit(run_reconcile(args))
+
+        if args.tune or args.tune_restore:
+            sys.exit(run_tuning(args))
+
+        if args.search or args.index:
+            sys.exit(run_index(args))
+
+        if args.copy:
+            sys.exit(run_copy(args))
+
+        if args.mirror:
+            sys.exit(run_mirror(args))
+
+        if args.speedtest:
+            sys.exit(run_speed_test(args))
+
+        if args.simulate_schedule:
+            from src.mount_scheduler import simulate, format_simulation
+            print(format_simulation(simulate()))
+            sys.exit(0)
+
+        if args.import_file or args.export_file:
+            sys.exit(run_share_io(args))
+
         if not (args.gui or args.menubar):
             args.menubar = True
 
@@ -57,7 +352,7 @@ def main():
 
         if args.gui:
             from src.gui_manager import GUIManager
-            app = GUIManager()
+            app = GUIManager(helper_mode=args.helper)
             app.mainloop()
         else:
             from src.menubar_app import SMBMenuBar
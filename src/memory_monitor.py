@@ -0,0 +1,266 @@
+# File: src/memory_monitor.py
+import ctypes
+import ctypes.util
+import gc
+import os
+import resource
+import signal
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import logging
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger('SMBManager')
+
+LOG_DIR = "~/Library/Logs/SMBManager"
+PID_FILE = "menubar.pid"
+# Resident memory the menubar process is expected to stay under (see README)
+MEMORY_BUDGET_MB = 120
+# Soak runs fail if RSS grows more than this after warm-up
+SOAK_GROWTH_LIMIT_MB = 8
+SAMPLE_INTERVAL = 300
+# One day of samples at the default interval
+SAMPLE_COUNT = 288
+TRACEMALLOC_FRAMES = 10
+MACH_TASK_BASIC_INFO = 20
+
+
+class MachTaskBasicInfo(ctypes.Structure):
+    _fields_ = [("virtual_size", ctypes.c_uint64), ("resident_size", ctypes.c_uint64),
+                ("resident_size_max", ctypes.c_uint64), ("user_time", ctypes.c_int32 * 2),
+                ("system_time", ctypes.c_int32 * 2), ("policy", ctypes.c_int32),
+                ("suspend_count", ctypes.c_int32)]
+
+
+def mach_rss():
+    """Current resident size from task_info(); None if the call fails"""
+    libc = ctypes.CDLL(ctypes.util.find_library("c"))
+    task = ctypes.c_uint32.in_dll(libc, "mach_task_self_")
+    info = MachTaskBasicInfo()
+    count = ctypes.c_uint32(ctypes.sizeof(info) // 4)
+    if libc.task_info(task, MACH_TASK_BASIC_INFO, ctypes.byref(info), ctypes.byref(count)) != 0:
+        return None
+    return info.resident_size
+
+
+def current_rss():
+    """Resident set size of this process in bytes, without spawning anything"""
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        pass
+    if sys.platform == "darwin":
+        try:
+            rss = mach_rss()
+            if rss is not None:
+                return rss
+        except (OSError, AttributeError, ValueError) as e:
+            logger.debug(f"task_info failed: {str(e)}")
+    # Peak rather than current RSS, in bytes on macOS and KiB elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def format_mb(size):
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+class MemoryMonitor:
+    """Samples RSS on a schedule into a fixed-size ring buffer
+
+    On demand it also starts tracemalloc and diffs consecutive snapshots,
+    writing the top allocation sites to a report next to the logs.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, samples=SAMPLE_COUNT,
+                 budget_mb=MEMORY_BUDGET_MB, log_dir=LOG_DIR):
+        self.interval = interval
+        self.samples = deque(maxlen=samples)
+        self.budget = budget_mb * 1024 * 1024
+        self.log_dir = os.path.expanduser(log_dir)
+        self.snapshot = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="MemoryMonitor", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Memory sample failed: {str(e)}")
+            if self.stop_event.wait(self.interval):
+                return
+
+    def sample(self):
+        rss = current_rss()
+        with self.lock:
+            over_budget = rss > self.budget and not any(r > self.budget for _, r in self.samples)
+            self.samples.append((time.time(), rss))
+        if over_budget:
+            logger.warning(f"Memory use {format_mb(rss)} is over the {format_mb(self.budget)} budget")
+        return rss
+
+    def summary(self):
+        """Return a dict with current, min, max RSS and growth since the first sample"""
+        with self.lock:
+            samples = list(self.samples)
+        if not samples:
+            return {"current": None, "min": None, "max": None, "growth": None, "samples": 0}
+        values = [rss for _, rss in samples]
+        return {"current": values[-1], "min": min(values), "max": max(values),
+                "growth": values[-1] - values[0], "samples": len(values)}
+
+    def snapshot_diff(self, limit=15):
+        """Take a tracemalloc snapshot and return lines diffing it with the previous one
+
+        The first call only starts tracing and takes the baseline.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        previous, self.snapshot = self.snapshot, snapshot
+        rss = self.sample()
+        lines = [f"RSS {format_mb(rss)} (budget {format_mb(self.budget)})"]
+        if previous is None:
+            lines.append("tracemalloc started; take another snapshot later to see growth")
+            return lines
+        traced, peak = tracemalloc.get_traced_memory()
+        lines.append(f"Traced {format_mb(traced)}, peak {format_mb(peak)}")
+        for stat in snapshot.compare_to(previous, 'lineno')[:limit]:
+            lines.append(str(stat))
+        return lines
+
+    def write_report(self, lines):
+        """Write report lines next to the logs; returns the file path"""
+        os.makedirs(self.log_dir, exist_ok=True)
+        path = os.path.join(self.log_dir, f"memory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+        with open(path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        logger.info(f"Memory report written to {path}")
+        return path
+
+
+def write_pid_file(log_dir=LOG_DIR):
+    path = os.path.join(os.path.expanduser(log_dir), PID_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(str(os.getpid()))
+
+
+def signal_app(signum, log_dir=LOG_DIR):
+    """Send a signal to the running menubar app found through its pid file
+
+    Returns (success, error).
+    """
+    path = os.path.join(os.path.expanduser(log_dir), PID_FILE)
+    try:
+        with open(path, 'r') as f:
+            pid = int(f.read().strip())
+        os.kill(pid, signum)
+        return True, ""
+    except (OSError, ValueError) as e:
+        return False, f"Menubar app not running or not reachable: {str(e)}"
+
+
+def request_snapshot(log_dir=LOG_DIR):
+    """Ask the running menubar app for a memory report (SIGUSR2)"""
+    return signal_app(signal.SIGUSR2, log_dir)
+
+
+class FakeMountBackend:
+    """In-memory stand-in for MountManager used by the soak test
+
+    Mount and unmount only touch a dict, but attempts are recorded in a
+    real state store so its caches and connections are exercised too.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.mounts = {}
+
+    def get_mount_point(self, share_path):
+        return f"/Volumes/{os.path.basename(share_path)}"
+
+    def mount_table(self):
+        return {mount_point: f"//soak@localhost:8445{share_path}"
+                for mount_point, share_path in self.mounts.items()}
+
+    def mount_all(self, shares, hostname, port):
+        from src.mount_scheduler import MountScheduler
+
+        def mount(share, timeout):
+            mount_point = share.get("mount_point") or self.get_mount_point(share["share"])
+            self.mounts[mount_point] = share["share"]
+            return True, ""
+
+        mounted = []
+        scheduler = MountScheduler(self.store.share_stats())
+        for share, success, _, duration in scheduler.run(shares, mount, default_host=hostname):
+            self.store.record_mount_attempt(hostname, port, share["username"], share["share"],
+                                            "success", duration)
+            mounted.append(share)
+        return mounted, []
+
+    def unmount_share(self, share_path, force=False, mount_point=None):
+        self.mounts.pop(mount_point or self.get_mount_point(share_path), None)
+        return True, ""
+
+
+def soak(cycles=500, share_count=20, warmup=50, progress=None):
+    """Repeat reconcile mount/unmount cycles against FakeMountBackend
+
+    Returns a dict with start/end RSS, growth and whether it stayed in
+    budget and under SOAK_GROWTH_LIMIT_MB.
+    """
+    from src.state_store import StateStore
+    from src.reconciler import Reconciler
+
+    shares = [{"username": "soak", "share": f"/share{i}", "auto_mount": True}
+              for i in range(share_count)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = StateStore(os.path.join(tmp_dir, "state.db"), os.path.join(tmp_dir, "config.json"))
+        backend = FakeMountBackend(store)
+        reconciler = Reconciler(backend, mount_table=backend.mount_table)
+        baseline = None
+        for cycle in range(warmup + cycles):
+            reconciler.apply(reconciler.plan(shares), "soak-host", "8445")
+            reconciler.apply(reconciler.plan(shares, target="unmounted"), "soak-host", "8445")
+            if cycle == warmup - 1:
+                gc.collect()
+                baseline = current_rss()
+            if progress and cycle % 100 == 0:
+                progress(cycle, current_rss())
+        gc.collect()
+        end = current_rss()
+    baseline = baseline or end
+    growth = end - baseline
+    return {
+        "cycles": cycles, "start": baseline, "end": end, "growth": growth,
+        "passed": growth <= SOAK_GROWTH_LIMIT_MB * 1024 * 1024 and end <= MEMORY_BUDGET_MB * 1024 * 1024
+    }
+
+
+def format_soak(result):
+    return (f"{result['cycles']} cycles: RSS {format_mb(result['start'])} -> {format_mb(result['end'])} "
+            f"(growth {format_mb(result['growth'])}, limit {SOAK_GROWTH_LIMIT_MB} MB, "
+            f"budget {MEMORY_BUDGET_MB} MB): {'PASS' if result['passed'] else 'FAIL'}")
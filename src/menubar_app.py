@@ -4,6 +4,11 @@ import subprocess
 import sys
 import os
 import logging
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 logger = logging.getLogger('SMBManager')
@@ -15,135 +20,422 @@ class SMBMenuBar(rumps.App):
         # Initialize managers
         from src.config_manager import ConfigManager
         from src.mount_manager import MountManager
+        from src.network_monitor import NetworkMonitor
+        from src.gui_helper import GUIHelper
+        from src.mirror import MirrorManager
+        from src.file_indexer import IndexManager
+        from src.reconciler import Reconciler
+        from src.memory_monitor import MemoryMonitor, write_pid_file
+        from src.profiler import StackSampler, install_signal_handler
+        from src.idle_monitor import IdleMonitor, CHECK_INTERVAL
+        from src.capacity_monitor import CapacityMonitor
         
         self.config_manager = ConfigManager()
         self.mount_manager = MountManager()
-        self.config = self.config_manager.load_config()
+        self.load_config()
+
+        # Mount work runs here so the rumps main thread never blocks
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="MenuBarJob")
+        self.running_jobs = set()
+        self.jobs_lock = threading.Lock()
+        # Filled by background jobs, drained on the main thread by the UI timer
+        self.pending_notifications = queue.Queue()
+        self.share_status = {}
+        # Where each mounted share really is (~/SMB fallbacks, Finder's /Volumes/x-1)
+        self.share_mount_points = {}
+        self.status_refreshing = False
+        self.share_items = {}
+        self.mirror_manager = MirrorManager(self.mount_manager)
+        self.reconciler = Reconciler(self.mount_manager)
+        self.index_manager = IndexManager(self.mount_manager)
+        self.idle_monitor = IdleMonitor()
+        # Free space per mount, sampled in worker threads; menu titles read the cache
+        self.capacity = CapacityMonitor(alert_percent=self.config.get('capacity_alert_percent', 90),
+                                        on_alert=self.on_capacity_alert)
         
         # Setup menu
+        self.shares_menu = rumps.MenuItem("Shares")
+        self.profile_item = rumps.MenuItem("Profile Next Connect All", callback=self.profile_next_connect_all)
         self.menu = [
             rumps.MenuItem("Open Manager", callback=self.show_manager),
             None,  # Separator
+            self.shares_menu,
+            None,  # Separator
             rumps.MenuItem("Connect All", callback=self.connect_all),
             rumps.MenuItem("Disconnect All", callback=self.disconnect_all),
+            rumps.MenuItem("Remount Idle Shares", callback=self.remount_idle),
+            None,  # Separator
+            rumps.MenuItem("Memory Report", callback=self.memory_report),
+            rumps.MenuItem("Profile 30 Seconds", callback=self.profile_sample),
+            self.profile_item,
         ]
+        self.build_shares_menu()
 
-    def show_manager(self, _):
-        """Launch the GUI manager window"""
+        # Cheap main-thread timer: applies cached state, status checks run in the background
+        self.ui_timer = rumps.Timer(self.on_ui_timer, 1)
+        self.ui_timer.start()
+        self.status_interval = 10
+        self.last_status_refresh = 0
+        self.refresh_status()
+
+        # Keep offline mirrors fresh on a schedule as well as after mounts
+        self.mirror_timer = rumps.Timer(self.on_mirror_timer, 60)
+        self.mirror_timer.start()
+
+        # Unmount shares that have been idle longer than their idle_timeout
+        self.idle_timer = rumps.Timer(self.on_idle_timer, CHECK_INTERVAL)
+        self.idle_timer.start()
+        self.capacity.start()
+
+        # The menubar owns the tunnel; other MountManagers only start it when they mount
+        if self.mount_manager.tunnel_in_use():
+            self.submit_job("Start tunnel", self.mount_manager.start_cloudflared)
+
+        # Start the GUI hidden now so "Open Manager" only has to show it
+        self.gui_helper = GUIHelper()
         try:
-            logger.info("Attempting to launch GUI manager")
-            
-            # Get the current executable path
-            if getattr(sys, 'frozen', False):
-                # We're running in a bundle
-                current_app = sys.executable
+            self.gui_helper.start()
+        except Exception as e:
+            logger.error(f"Failed to pre-warm GUI helper: {str(e)}")
+
+        # Re-check mounts after network changes and resume from sleep
+        self.network_monitor = NetworkMonitor(self.handle_network_event)
+        self.network_monitor.start()
+
+        # RSS sampling for the long-running process; `--memory-report` signals us
+        self.memory_monitor = MemoryMonitor()
+        self.memory_monitor.start()
+        try:
+            write_pid_file()
+            signal.signal(signal.SIGUSR2, lambda signum, frame: self.memory_report(None))
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to set up memory report signal: {str(e)}")
+
+        # On-demand profiling; `--profile-running` sends SIGUSR1
+        self.sampler = StackSampler()
+        self.profile_connect_all = False
+        install_signal_handler(self.sampler, on_done=self.on_profile_done)
+
+    # Background jobs
+    def submit_job(self, name, func, *args):
+        """Run func on the executor unless a job with the same name is still running"""
+        with self.jobs_lock:
+            if name in self.running_jobs:
+                logger.info(f"Job {name} already running, ignoring request")
+                return None
+            self.running_jobs.add(name)
+
+        def run():
+            try:
+                return func(*args)
+            except Exception as e:
+                logger.error(f"Job {name} failed: {str(e)}", exc_info=True)
+                self.notify("Error", f"{name} failed: {str(e)}")
+            finally:
+                with self.jobs_lock:
+                    self.running_jobs.discard(name)
+                self.refresh_status()
+
+        return self.executor.submit(run)
+
+    def notify(self, subtitle, message):
+        """Queue a notification to be posted from the main thread"""
+        self.pending_notifications.put((subtitle, message))
+
+    def notify_batch(self, action, succeeded, errors):
+        """Post one summary notification for a batch of share operations"""
+        if succeeded > 0:
+            self.notify("Success", f"{action} {succeeded} share{'s' if succeeded > 1 else ''}")
+        if errors:
+            summary = "\n".join(errors[:3])
+            if len(errors) > 3:
+                summary += f"\n...and {len(errors) - 3} more"
+            self.notify("Errors Occurred", summary)
+
+    # Share status
+    def load_config(self):
+        """Reload the config and rebuild the share model (any thread)"""
+        from src.share_model import ShareModel
+        self.config = self.config_manager.load_config()
+        self.shares = ShareModel.from_config(self.config)
+
+    def share_title(self, share):
+        """Menu label for a share, qualified by username when the path is ambiguous"""
+        if len(self.shares.with_path(share.share)) > 1:
+            return f"{share.share} ({share.username})"
+        return share.share
+
+    def refresh_status(self):
+        """Refresh cached mount state for all shares in the background"""
+        if self.status_refreshing:
+            return
+        self.status_refreshing = True
+        self.last_status_refresh = time.monotonic()
+
+        def check():
+            try:
+                self.load_config()
+                # One mount table read instead of a stat per mount point
+                actual = self.reconciler.actual_state(self.shares)
+                self.share_status = {share.id: actual[share.key] is not None for share in self.shares}
+                self.share_mount_points = {share.id: actual[share.key] for share in self.shares
+                                           if actual[share.key]}
+            except Exception as e:
+                logger.error(f"Status refresh failed: {str(e)}")
+            finally:
+                self.status_refreshing = False
+
+        self.executor.submit(check)
+
+    def build_shares_menu(self):
+        """Rebuild the per-share submenus from the current config"""
+        if self.shares_menu.keys():
+            self.shares_menu.clear()
+        self.share_items = {}
+        if not len(self.shares):
+            self.shares_menu.add(rumps.MenuItem("No shares configured"))
+            return
+        for share in self.shares:
+            # Look the share up by id on click so edits made since the menu was built apply
+            item = rumps.MenuItem(self.share_title(share))
+            item.add(rumps.MenuItem("Mount", callback=lambda _, i=share.id: self.mount_one(i)))
+            item.add(rumps.MenuItem("Unmount", callback=lambda _, i=share.id: self.unmount_one(i)))
+            self.shares_menu.add(item)
+            self.share_items[share.id] = item
+
+    def on_ui_timer(self, _):
+        """Apply cached state to the menu and post queued notifications"""
+        from src.capacity_monitor import format_capacity
+
+        while True:
+            try:
+                subtitle, message = self.pending_notifications.get_nowait()
+            except queue.Empty:
+                break
+            rumps.notification("SMB Manager", subtitle, message)
+
+        if self.profile_item.state != self.profile_connect_all:
+            self.profile_item.state = self.profile_connect_all
+
+        shares = self.shares
+        if set(self.share_items) != set(shares.by_id):
+            self.build_shares_menu()
+        for share_id, item in self.share_items.items():
+            share = shares.get(share_id)
+            if share is None:
+                continue
+            if self.share_status.get(share_id):
+                marker = "●"
             else:
-                # We're running in development mode
-                current_app = os.path.abspath(__file__)
-            
-            logger.info(f"Current executable path: {current_app}")
-            
-            # Launch a new Python process running the GUI directly
-            cmd = [sys.executable, '-c', """
-import sys
-import tkinter as tk
-from src.gui_manager import GUIManager
-app = GUIManager()
-app.mainloop()
-"""]
-            
-            env = os.environ.copy()
-            if getattr(sys, 'frozen', False):
-                # If we're in a bundle, add the bundle's Python path
-                bundle_dir = os.path.dirname(os.path.dirname(current_app))
-                env['PYTHONPATH'] = os.path.join(bundle_dir, 'Resources/lib/python3.9/site-packages')
-            
-            logger.info(f"Launching GUI with command: {cmd}")
-            process = subprocess.Popen(
-                cmd,
-                env=env,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-            
-            # Log any immediate errors
-            stdout, stderr = process.communicate(timeout=1)
-            if stderr:
-                logger.error(f"GUI launch stderr: {stderr.decode()}")
-            if stdout:
-                logger.info(f"GUI launch stdout: {stdout.decode()}")
-                
-            logger.info("GUI launch command executed successfully")
+                # Dotted circle: unmounted for being idle, click Mount to bring it back
+                marker = "◌" if share_id in self.idle_monitor.idle_unmounted else "○"
+            title = f"{marker} {self.share_title(share)}"
+            mount_point = self.share_mount_points.get(share_id)
+            if self.share_status.get(share_id) and mount_point:
+                sample, error = self.capacity.get(mount_point)
+                if sample:
+                    title += f" — {format_capacity(sample, error)}"
+            if item.title != title:
+                item.title = title
+
+        if time.monotonic() - self.last_status_refresh >= self.status_interval:
+            self.refresh_status()
+
+    def on_mirror_timer(self, _):
+        due = self.mirror_manager.due_shares(list(self.shares))
+        if due:
+            self.submit_job("Mirror sync", self.run_mirror_sync, due)
+
+    def on_idle_timer(self, _):
+        if any(share.get("idle_timeout") for share in self.shares):
+            self.submit_job("Idle check", self.run_idle_check)
 
+    def run_idle_check(self):
+        """Unmount shares idle past their idle_timeout (background thread)"""
+        for share, mount_point, idle_minutes in self.idle_monitor.idle_shares(list(self.shares)):
+            success, error = self.mount_manager.unmount_share(share.share, mount_point=mount_point)
+            if not success:
+                logger.error(f"Idle unmount of {share.share} failed: {error}")
+                continue
+            logger.info(f"Unmounted {share.share} after {idle_minutes:.0f} minutes idle")
+            self.idle_monitor.mark_unmounted(share)
+            self.share_status[share.id] = False
+            self.notify("Idle Share Unmounted", f"{self.share_title(share)} was idle for {idle_minutes:.0f} minutes")
+
+    def on_capacity_alert(self, mount_point, sample, kind):
+        from src.capacity_monitor import format_size
+
+        share = self.shares.at_mount_point(mount_point)
+        name = self.share_title(share) if share else mount_point
+        if kind == "space":
+            message = f"{name} is {sample.used_percent:.0f}% full, {format_size(sample.free)} left"
+        else:
+            message = f"{name} has used {sample.inodes_used_percent:.0f}% of its files (inodes)"
+        self.notify("Volume Almost Full", message)
+
+    def run_mirror_sync(self, shares):
+        """Sync offline mirrors of mounted shares (background thread)"""
+        synced = 0
+        errors = []
+        for share in shares:
+            try:
+                summary = self.mirror_manager.sync_share(share)
+            except Exception as e:
+                errors.append(f"Mirror of {share['share']} failed: {str(e)}")
+                continue
+            if summary:
+                synced += 1
+                errors.extend(summary["errors"][:3])
+        if errors:
+            self.notify("Mirror Errors", "\n".join(errors[:3]))
+        return synced
+
+    def run_index(self, shares):
+        """Warm and refresh the filename index of freshly mounted shares (background thread)"""
+        for share in shares:
+            try:
+                self.index_manager.refresh_share(share)
+            except Exception as e:
+                logger.error(f"Indexing {share['share']} failed: {str(e)}")
+
+    def handle_network_event(self, reasons):
+        """Remount shares that went stale after a network change or wake"""
+        logger.info(f"Reconciling mounts after: {'; '.join(reasons)}")
+        restart_tunnel = any(reason.startswith("network") for reason in reasons)
+        if restart_tunnel:
+            # Route decisions and DNS answers are per network; redo them on the next mount
+            self.mount_manager.path_selector.invalidate()
+            self.mount_manager.preflight.dns_cache.clear()
+        remounted, errors = self.mount_manager.recover_shares(restart_tunnel=restart_tunnel)
+        if remounted > 0:
+            self.notify("Reconnected", f"Remounted {remounted} share{'s' if remounted > 1 else ''}")
+        if errors:
+            self.notify("Errors Occurred", "\n".join(errors[:3]))
+        self.refresh_status()
+
+    def show_manager(self, _):
+        """Show the GUI manager window via the pre-warmed helper process"""
+        try:
+            logger.info("Asking GUI helper to show the manager")
+            self.gui_helper.show()
         except Exception as e:
             error_msg = f"Error launching manager: {str(e)}"
             logger.error(error_msg, exc_info=True)
             rumps.notification("SMB Manager", "Error", error_msg)
 
     def connect_all(self, _):
+        self.submit_job("Connect All", self.run_connect_all)
+
+    def disconnect_all(self, _):
+        self.submit_job("Disconnect All", self.run_disconnect_all)
+
+    def remount_idle(self, _):
+        shares = [share for share in self.shares if share.id in self.idle_monitor.idle_unmounted]
+        if not shares:
+            self.notify("Remount Idle Shares", "No shares were unmounted for being idle")
+            return
+        self.submit_job("Remount idle shares", self.run_mount, shares)
+
+    def mount_one(self, share_id):
+        share = self.shares.get(share_id)
+        if share:
+            self.submit_job(f"Mount {share.share} ({share.username})", self.run_mount, [share])
+
+    def unmount_one(self, share_id):
+        share = self.shares.get(share_id)
+        if share:
+            self.submit_job(f"Unmount {share.share} ({share.username})", self.run_unmount, [share])
+
+    def memory_report(self, _):
+        self.submit_job("Memory Report", self.run_memory_report)
+
+    def profile_sample(self, _):
+        if self.sampler.start(on_done=self.on_profile_done):
+            self.notify("Profiling", "Sampling all threads for 30 seconds")
+        else:
+            self.notify("Profiling", "A profile is already being recorded")
+
+    def profile_next_connect_all(self, _):
+        self.profile_connect_all = not self.profile_connect_all
+
+    def on_profile_done(self, path):
+        self.notify("Profiling", f"Saved to {os.path.basename(path)}")
+
+    def run_connect_all(self):
+        """Mount the auto_mount shares that aren't mounted yet"""
+        if self.profile_connect_all:
+            from src.profiler import profile_call
+            self.profile_connect_all = False
+            self.notify("Profiling", "Profiling this Connect All")
+            _, path = profile_call("connect_all", self.connect_missing)
+            self.on_profile_done(path)
+            return
+        self.connect_missing()
+
+    def connect_missing(self):
+        self.load_config()
+        actions = self.reconciler.plan(list(self.shares))
+        if not actions:
+            self.notify("Connect All", "All shares are already mounted")
+            return
+        self.run_mount([action.share for action in actions])
+
+    def run_disconnect_all(self):
+        """Unmount every share found in the mount table, wherever it is mounted"""
+        self.load_config()
+        actions = self.reconciler.plan(list(self.shares), target="unmounted")
+        _, unmounted, errors = self.reconciler.apply(
+            actions, self.config.get("hostname", ""), self.config.get("port", "8445")
+        )
+        for share in unmounted:
+            self.share_status[share.id] = False
+        self.notify_batch("Unmounted", len(unmounted), errors)
+
+    def run_mount(self, shares):
+        """Mount shares using the history-driven scheduler (background thread)"""
         hostname = self.config.get("hostname", "")
         port = self.config.get("port", "8445")
         
         if not hostname:
-            rumps.notification("SMB Manager", "Error", "Please configure hostname in the manager")
+            self.notify("Error", "Please configure hostname in the manager")
             return
         
-        success_count = 0
-        error_messages = []
+        mounted, error_messages = self.mount_manager.mount_all(shares, hostname, port)
+        for share in mounted:
+            self.share_status[share.id] = True
+            self.idle_monitor.forget(share.id)
         
-        shares = self.config.get("shares", [])
+        self.notify_batch("Mounted", len(mounted), error_messages)
         
-        for i, share in enumerate(shares, 1):
-            username = share["username"]
-            share_path = share["share"]
-            mount_point = share.get("mount_point", f"/Volumes/{os.path.basename(share_path)}")
-            
-            password = self.config_manager.get_share_password(username, share_path)
-            
-            if not password:
-                error_messages.append(f"No password found for {share_path}")
-                continue
-            
-            success, error = self.mount_manager.mount_share(
-                hostname, port, share_path, mount_point, username, password
-            )
-            
-            if success:
-                success_count += 1
-                rumps.notification("SMB Manager", "Progress", 
-                                f"Mounted {i}/{len(shares)}: {share_path}")
-            else:
-                error_messages.append(f"Failed to mount {share_path}: {error}")
-            
-            # Add 5 second delay between mounts, but not after the last one
-            if i < len(shares):
-                import time
-                time.sleep(2)  # 5 second delay
+        if mounted:
+            self.submit_job("Index shares", self.run_index, mounted)
         
-        if success_count > 0:
-            rumps.notification("SMB Manager", "Success", 
-                            f"Mounted {success_count} share{'s' if success_count > 1 else ''}")
-        if error_messages:
-            rumps.notification("SMB Manager", "Errors Occurred", "\n".join(error_messages[:3]))
+        mirrored = [share for share in mounted if (share.get("mirror") or {}).get("folders")]
+        if mirrored:
+            self.submit_job("Mirror sync", self.run_mirror_sync, mirrored)
 
-    def disconnect_all(self, _):
+    def run_unmount(self, shares):
+        """Unmount shares (background thread)"""
         unmounted = 0
         errors = []
         
-        for share in self.config.get("shares", []):
-            share_path = share["share"]
-            if self.mount_manager.is_mounted(share_path):
-                success, error = self.mount_manager.unmount_share(share_path)
-                if success:
+        for share in shares:
+            share_path = share.share
+            success, error = self.mount_manager.unmount_share(share_path, mount_point=share.mount_point)
+            if success:
+                if error != "Not mounted":
                     unmounted += 1
-                else:
-                    errors.append(f"Failed to unmount {share_path}: {error}")
+                self.share_status[share.id] = False
+            else:
+                errors.append(f"Failed to unmount {share_path}: {error}")
         
-        if unmounted > 0:
-            rumps.notification("SMB Manager", "Success", 
-                             f"Unmounted {unmounted} share{'s' if unmounted > 1 else ''}")
-        if errors:
-            rumps.notification("SMB Manager", "Errors Occurred", "\n".join(errors[:3]))
+        self.notify_batch("Unmounted", unmounted, errors)
+
+    def run_memory_report(self):
+        """Diff tracemalloc snapshots and write the report next to the logs"""
+        lines = self.memory_monitor.snapshot_diff()
+        path = self.memory_monitor.write_report(lines)
+        self.notify("Memory Report", f"{lines[0]}\nSaved to {os.path.basename(path)}")
 
 def main():
     app = SMBMenuBar()
@@ -0,0 +1,186 @@
+# File: src/mirror.py
+import marshal
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from src.fs_utils import scan_tree, file_hash, copy_file
+
+logger = logging.getLogger('SMBManager')
+
+INDEX_FILE = ".smbmanager-index"
+INDEX_VERSION = 1
+DEFAULT_CACHE_ROOT = "~/Library/Caches/SMBManager/Mirrors"
+DEFAULT_INTERVAL_MINUTES = 30
+DEFAULT_WORKERS = 8
+
+
+class ShareMirror:
+    """Keeps selected folders of a mounted share synced to a local cache
+
+    The index maps each mirrored file to (size, mtime_ns, sha256 or None)
+    and is stored with marshal, so a rescan only has to stat the remote
+    tree and compare tuples.
+    """
+
+    def __init__(self, source_root, folders, cache_dir, use_hash=False, workers=DEFAULT_WORKERS):
+        self.source_root = source_root
+        self.folders = [folder.strip("/") for folder in folders]
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.use_hash = use_hash
+        self.workers = workers
+        self.index_path = os.path.join(self.cache_dir, INDEX_FILE)
+
+    def load_index(self):
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = marshal.load(f)
+            if data.get("version") == INDEX_VERSION:
+                return data["entries"]
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+        return {}
+
+    def save_index(self, entries):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            marshal.dump({"version": INDEX_VERSION, "entries": entries}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def owner(self, rel_path):
+        """The mirrored folder containing rel_path, or None if it is out of scope"""
+        for folder in self.folders:
+            if not folder or rel_path.startswith(folder + os.sep):
+                return folder
+        return None
+
+    def sync(self):
+        """Bring the cache up to date; returns a summary dict"""
+        if not os.path.isdir(self.source_root):
+            raise ValueError(f"{self.source_root} is not available")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        start = time.monotonic()
+        index = self.load_index()
+
+        folders = [f for f in self.folders if os.path.isdir(os.path.join(self.source_root, f))]
+        remote, failed_dirs = scan_tree(self.source_root, folders, self.workers)
+
+        to_copy = [
+            rel_path for rel_path, (size, mtime_ns) in remote.items()
+            if index.get(rel_path, (None, None))[:2] != (size, mtime_ns)
+            or not os.path.exists(os.path.join(self.cache_dir, rel_path))
+        ]
+        # Forget files that vanished remotely, or whose folder is no longer
+        # mirrored, but keep the cache of folders (at any depth) that could not be scanned
+        scanned = set(folders)
+        unscanned = tuple(d + os.sep for d in failed_dirs if d)
+        to_delete = [
+            rel_path for rel_path in index
+            if rel_path not in remote and self.owner(rel_path) in scanned | {None}
+            and not ("" in failed_dirs or rel_path.startswith(unscanned))
+        ]
+        deleted = set(to_delete)
+
+        summary = {"copied": 0, "skipped": 0, "deleted": 0, "bytes": 0, "errors": []}
+        new_index = {path: entry for path, entry in index.items() if path not in deleted}
+
+        def copy(rel_path):
+            source = os.path.join(self.source_root, rel_path)
+            target = os.path.join(self.cache_dir, rel_path)
+            size, mtime_ns = remote[rel_path]
+            digest = None
+            if self.use_hash:
+                digest = file_hash(source)
+                old = index.get(rel_path)
+                if old and old[2] == digest and os.path.exists(target):
+                    # Touched but unchanged; just refresh the index entry
+                    return rel_path, (size, mtime_ns, digest), 0
+            copy_file(source, target)
+            return rel_path, (size, mtime_ns, digest), size
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="Mirror") as executor:
+            futures = {executor.submit(copy, rel_path): rel_path for rel_path in to_copy}
+            for future, rel_path in futures.items():
+                try:
+                    _, entry, copied_bytes = future.result()
+                except OSError as e:
+                    summary["errors"].append(f"{rel_path}: {str(e)}")
+                    new_index.pop(rel_path, None)
+                    continue
+                new_index[rel_path] = entry
+                if copied_bytes or not self.use_hash:
+                    summary["copied"] += 1
+                    summary["bytes"] += copied_bytes
+                else:
+                    summary["skipped"] += 1
+
+        for rel_path in to_delete:
+            try:
+                os.remove(os.path.join(self.cache_dir, rel_path))
+                summary["deleted"] += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                summary["errors"].append(f"{rel_path}: {str(e)}")
+
+        self.save_index(new_index)
+        summary["files"] = len(new_index)
+        summary["seconds"] = time.monotonic() - start
+        logger.info(f"Mirror of {self.source_root} -> {self.cache_dir}: {summary['copied']} copied, "
+                    f"{summary['deleted']} deleted, {len(summary['errors'])} errors "
+                    f"in {summary['seconds']:.1f}s")
+        return summary
+
+
+class MirrorManager:
+    """Runs mirror syncs for configured shares, one at a time per share"""
+
+    def __init__(self, mount_manager):
+        self.mount_manager = mount_manager
+        self.lock = threading.Lock()
+        self.running = set()
+        self.last_sync = {}
+
+    def get_mirror(self, share):
+        settings = share.get("mirror") or {}
+        if not settings.get("folders"):
+            return None
+        mount_point = share.get("mount_point") or self.mount_manager.get_mount_point(share["share"])
+        cache_dir = settings.get("cache_dir") or os.path.join(
+            DEFAULT_CACHE_ROOT, f"{share['username']}{share['share'].replace('/', '_')}"
+        )
+        return ShareMirror(mount_point, settings["folders"], cache_dir,
+                           use_hash=settings.get("hash", False))
+
+    def sync_share(self, share):
+        """Sync one share if it is mirrored and mounted; returns a summary or None"""
+        mirror = self.get_mirror(share)
+        if mirror is None or not self.mount_manager.is_mounted(mirror.source_root):
+            return None
+        key = (share["username"], share["share"])
+        with self.lock:
+            if key in self.running:
+                return None
+            self.running.add(key)
+        try:
+            return mirror.sync()
+        finally:
+            self.last_sync[key] = time.monotonic()
+            with self.lock:
+                self.running.discard(key)
+
+    def due_shares(self, shares):
+        """Mirrored shares whose sync interval has elapsed"""
+        now = time.monotonic()
+        due = []
+        for share in shares:
+            settings = share.get("mirror") or {}
+            if not settings.get("folders"):
+                continue
+            interval = settings.get("interval", DEFAULT_INTERVAL_MINUTES) * 60
+            last = self.last_sync.get((share["username"], share["share"]))
+            if last is None or now - last >= interval:
+                due.append(share)
+        return due
@@ -0,0 +1,545 @@
+# File: src/mount_helper.py
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import pwd
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import logging
+
+# Standard library only: a root-owned copy of this file is the privileged helper
+
+logger = logging.getLogger('SMBManager')
+
+# Seconds to wait for an answer on top of the operation's own timeout
+CALL_MARGIN = 5
+DEFAULT_TIMEOUT = 30
+# After the helper fails to start, run operations locally this long before trying again
+RESTART_BACKOFF = 60
+# Where "privileged_helper": true expects the root-owned copy of this file
+PRIVILEGED_HELPER = "/usr/local/libexec/smb-manager/mount_helper.py"
+SYSTEM_PYTHON = "/usr/bin/python3"
+
+# The only programs a mount request may run, by absolute path
+MOUNT_TOOLS = {
+    "open": ("/usr/bin/open",),
+    "mount_smbfs": ("/sbin/mount_smbfs",),
+    "mount": ("/bin/mount", "/sbin/mount", "/usr/bin/mount"),
+}
+# mount.cifs reads the password from PASSWD; nothing else may be passed through
+MOUNT_ENV = ("PASSWD",)
+MOUNT_OPTION = re.compile(r'^[A-Za-z0-9_.-]+(=[^,]*)?$')
+# Options that would hand out root: set-id files, device nodes, another owner, root's files
+UNSAFE_OPTIONS = {"suid", "setuids", "dev", "exec", "uid", "gid", "forceuid", "forcegid",
+                  "cruid", "credentials", "cred"}
+# Added to every mount with options
+SAFE_OPTIONS = ("nosuid", "nodev")
+# A helper running as root only mounts directly inside these (~ is the requesting user's)
+MOUNT_ROOTS = ("/Volumes", "~/SMB")
+# The only processes a helper running as root will look for or stop
+ALLOWED_PROCESSES = ("cloudflared",)
+SMB_FILESYSTEMS = {"smbfs", "cifs", "smb3"}
+# macOS `mount` output: //user@host:port/share on /Volumes/share (smbfs, nodev, ...)
+MACOS_MOUNT_LINE = re.compile(r'^(?P<device>.+?) on (?P<mount_point>.+) \((?P<fstype>[^,)]+)')
+# umount2(2) / unmount(2) flag
+MNT_FORCE = 0x80000 if sys.platform == "darwin" else 1
+
+
+def tool_path(name):
+    return next((path for path in MOUNT_TOOLS[name] if os.path.exists(path)), MOUNT_TOOLS[name][0])
+
+
+def requesting_user():
+    """(uid, gid, home) of the user the helper works for, also when sudo runs it as root"""
+    uid = int(os.environ.get("SUDO_UID", os.getuid())) if os.geteuid() == 0 else os.getuid()
+    entry = pwd.getpwuid(uid)
+    return entry.pw_uid, entry.pw_gid, entry.pw_dir
+
+
+def validate_mount_options(options):
+    """Check a comma-separated option list; returns it with SAFE_OPTIONS added"""
+    names = []
+    for option in options.split(",") if options else []:
+        if not MOUNT_OPTION.match(option):
+            raise ValueError(f"Invalid mount options {options!r}")
+        names.append(option.split("=", 1)[0])
+    unsafe = sorted(set(names) & UNSAFE_OPTIONS)
+    if unsafe:
+        raise ValueError(f"Mount option {unsafe[0]} is not allowed")
+    return ",".join(([options] if options else []) + [option for option in SAFE_OPTIONS if option not in names])
+
+
+def validate_mount_point(mount_point, privileged=False):
+    """Return the mount point to use; as root it must be directly inside MOUNT_ROOTS
+
+    The path is resolved first, so a symlink in ~/SMB can't point the mount at /etc.
+    """
+    if not os.path.isabs(mount_point):
+        raise ValueError(f"Mount point {mount_point!r} is not an absolute path")
+    if not privileged:
+        return mount_point
+    home = requesting_user()[2]
+    roots = {os.path.realpath(root.replace("~", home, 1)) for root in MOUNT_ROOTS}
+    real = os.path.realpath(mount_point)
+    if os.path.dirname(real) not in roots:
+        raise ValueError(f"Mount point {mount_point} is not directly inside {' or '.join(MOUNT_ROOTS)}")
+    return real
+
+
+def validate_mount_command(argv, env=None, privileged=False):
+    """Check a mount request is one of the commands build_mount_command makes
+
+    Returns (argv with the tool's absolute path, env); raises ValueError
+    for anything else, so a privileged helper never runs arbitrary argv.
+    nosuid,nodev are always added; privileged mounts must also use one of
+    MOUNT_ROOTS and cifs files are owned by the requesting user.
+    """
+    argv = list(argv)
+    if set(env or ()) - set(MOUNT_ENV):
+        raise ValueError(f"Mount environment may only set {', '.join(MOUNT_ENV)}")
+    if len(argv) == 2 and argv[0] == "open" and argv[1].startswith("smb://"):
+        return [tool_path("open"), argv[1]], env
+    if argv and argv[0] == "mount_smbfs" and len(argv) in (3, 5):
+        if len(argv) == 5 and argv[1] != "-o":
+            raise ValueError("mount_smbfs only takes -o")
+        options = validate_mount_options(argv[2] if len(argv) == 5 else "")
+        url, mount_point = argv[-2:]
+        if url.startswith("//"):
+            mount_point = validate_mount_point(mount_point, privileged)
+            return [tool_path("mount_smbfs"), "-o", options, url, mount_point], env
+    if len(argv) == 7 and argv[:3] == ["mount", "-t", "cifs"] and argv[5] == "-o":
+        unc, mount_point = argv[3:5]
+        options = validate_mount_options(argv[6])
+        if unc.startswith("//"):
+            mount_point = validate_mount_point(mount_point, privileged)
+            if privileged:
+                uid, gid, _ = requesting_user()
+                options += f",uid={uid},gid={gid}"
+            return [tool_path("mount"), "-t", "cifs", unc, mount_point, "-o", options], env
+    raise ValueError(f"Not a mount command: {argv[0] if argv else ''!r}")
+
+
+def smb_mount_points():
+    """Mount points of every SMB mount; standalone twin of reconciler.read_mount_table"""
+    if os.path.exists("/proc/self/mounts"):
+        with open("/proc/self/mounts", 'r') as f:
+            lines = [line.split() for line in f]
+        return {re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), fields[1])
+                for fields in lines if len(fields) >= 3 and fields[2] in SMB_FILESYSTEMS}
+    result = subprocess.run(['/sbin/mount'], capture_output=True, text=True, timeout=10)
+    matches = (MACOS_MOUNT_LINE.match(line) for line in result.stdout.splitlines())
+    return {m.group("mount_point") for m in matches if m and m.group("fstype") in SMB_FILESYSTEMS}
+
+
+def list_processes():
+    """Yield (pid, name) of every process without running ps"""
+    if os.path.isdir("/proc"):
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/comm", 'r') as f:
+                    yield int(entry), f.read().strip()
+            except OSError:
+                # Exited while we were scanning
+                continue
+        return
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    count = libc.proc_listallpids(None, 0)
+    pids = (ctypes.c_int * (count + 64))()
+    count = libc.proc_listallpids(pids, ctypes.sizeof(pids))
+    name = ctypes.create_string_buffer(256)
+    for pid in pids[:max(count, 0)]:
+        if pid and libc.proc_name(pid, name, ctypes.sizeof(name)) > 0:
+            yield pid, name.value.decode(errors="replace")
+
+
+def find_processes(name):
+    """Pids of processes named exactly name (other than this one)"""
+    if not name:
+        return []
+    own = os.getpid()
+    return [pid for pid, comm in list_processes() if comm == name and pid != own]
+
+
+def unmount_syscall(mount_point, force=False):
+    """umount2(2) on Linux, unmount(2) on macOS; returns 0 or an errno"""
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    unmount = libc.unmount if sys.platform == "darwin" else libc.umount2
+    if unmount(os.fsencode(mount_point), MNT_FORCE if force else 0) == 0:
+        return 0
+    return ctypes.get_errno()
+
+
+class SystemBackend:
+    """Runs the operations for real; used inside the helper process
+
+    Only mounting starts a program; unmounting and process checks are
+    system calls made by the helper itself. privileged (default: running
+    as root) turns on the mount point and process restrictions.
+    """
+
+    def __init__(self, privileged=None):
+        self.privileged = os.geteuid() == 0 if privileged is None else privileged
+
+    def run(self, argv, timeout=None, env=None):
+        """Run a command; returns (returncode, stderr)"""
+        try:
+            result = subprocess.run(argv, capture_output=True, text=True, timeout=timeout,
+                                    env={**os.environ, **env} if env else None)
+        except subprocess.TimeoutExpired:
+            return None, f"timed out after {timeout:.0f}s"
+        return result.returncode, result.stderr.strip()
+
+    def mount(self, argv, timeout=None, env=None):
+        try:
+            argv, env = validate_mount_command(argv, env, self.privileged)
+        except ValueError as e:
+            return False, str(e)
+        returncode, stderr = self.run(argv, timeout, env)
+        if returncode is None:
+            return False, f"Mount timed out after {timeout:.0f}s"
+        return returncode == 0, stderr
+
+    def unmount(self, mount_point, force=False):
+        try:
+            mounted = smb_mount_points()
+        except (OSError, subprocess.SubprocessError) as e:
+            return False, f"umount: could not read the mount table: {str(e)}"
+        if mount_point not in mounted:
+            return False, f"umount: {mount_point}: not an SMB mount"
+        error = unmount_syscall(mount_point, force)
+        if error == 0:
+            return True, ""
+        if error != errno.EPERM or os.geteuid() == 0:
+            return False, f"umount: {mount_point}: {os.strerror(error)}"
+        # Linux user mounts are unmounted by the setuid umount, which checks fstab/mtab
+        cmd = ['umount', '-f', mount_point] if force else ['umount', mount_point]
+        returncode, stderr = self.run(cmd, DEFAULT_TIMEOUT)
+        if returncode == 0:
+            return True, ""
+        # Non-interactive: fails instead of prompting when sudo needs a password
+        returncode, stderr = self.run(['sudo', '-n'] + cmd, DEFAULT_TIMEOUT)
+        if returncode == 0:
+            return True, ""
+        return False, stderr
+
+    def check_process_name(self, name):
+        if self.privileged and name not in ALLOWED_PROCESSES:
+            raise ValueError(f"Process {name!r} is not one the helper manages")
+
+    def pgrep(self, name):
+        self.check_process_name(name)
+        return bool(find_processes(name))
+
+    def pkill(self, name):
+        self.check_process_name(name)
+        found = False
+        for pid in find_processes(name):
+            try:
+                os.kill(pid, signal.SIGTERM)
+                found = True
+            except OSError:
+                continue
+        return found
+
+    def probe(self, mount_point):
+        """True if the mount point is mounted and can be listed"""
+        try:
+            if not os.path.ismount(mount_point):
+                return False
+            os.listdir(mount_point)
+            return True
+        except OSError:
+            return False
+
+
+class StubBackend:
+    """In-memory stand-in so the helper and its protocol can run without root"""
+
+    def __init__(self, mounted=(), processes=(), privileged=False):
+        self.mounted = set(mounted)
+        self.processes = set(processes)
+        self.privileged = privileged
+        self.calls = []
+
+    def mount(self, argv, timeout=None, env=None):
+        self.calls.append(("mount", argv))
+        try:
+            validate_mount_command(argv, env, self.privileged)
+        except ValueError as e:
+            return False, str(e)
+        if argv[0] != 'open':
+            # mount_smbfs ends with the mount point, mount -t cifs with "-o OPTIONS"
+            self.mounted.add(argv[-3] if argv[-2] == '-o' else argv[-1])
+        return True, ""
+
+    def unmount(self, mount_point, force=False):
+        self.calls.append(("unmount", mount_point))
+        if mount_point not in self.mounted:
+            return False, f"umount: {mount_point}: not currently mounted"
+        self.mounted.discard(mount_point)
+        return True, ""
+
+    def pgrep(self, name):
+        self.calls.append(("pgrep", name))
+        return name in self.processes
+
+    def pkill(self, name):
+        self.calls.append(("pkill", name))
+        found = name in self.processes
+        self.processes.discard(name)
+        return found
+
+    def probe(self, mount_point):
+        self.calls.append(("probe", mount_point))
+        return mount_point in self.mounted
+
+
+BACKENDS = {"system": SystemBackend, "stub": StubBackend}
+OPERATIONS = ("mount", "unmount", "pgrep", "pkill", "probe")
+
+
+def handle_request(backend, request):
+    """Run one request against a backend and build its response"""
+    response = {"id": request.get("id")}
+    op = request.get("op")
+    if op == "ping":
+        response["ok"] = True
+        return response
+    if op not in OPERATIONS:
+        response.update(ok=False, error=f"Unknown operation {op!r}")
+        return response
+    try:
+        result = getattr(backend, op)(**request.get("args", {}))
+    except Exception as e:
+        response.update(ok=False, error=str(e))
+        return response
+    if isinstance(result, tuple):
+        response.update(ok=result[0], error=result[1])
+    else:
+        response.update(ok=True, result=result)
+    return response
+
+
+def serve(backend, stdin=None, stdout=None):
+    """Helper process main loop: one JSON request per line in, one response per line out
+
+    Each request runs in its own thread, so a mount or probe stuck on a
+    dead server never holds up the others; responses carry the request id.
+    Returns at EOF, i.e. when the app that started the helper exits.
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    write_lock = threading.Lock()
+
+    def run(request):
+        response = handle_request(backend, request)
+        with write_lock:
+            stdout.write(json.dumps(response) + "\n")
+            stdout.flush()
+
+    for line in stdin:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            logger.error(f"Mount helper got a malformed request: {line[:80]!r}")
+            continue
+        threading.Thread(target=run, args=(request,), name="HelperOp", daemon=True).start()
+
+
+def main(argv=None):
+    """Helper process entry point: mount_helper.py {system,stub}"""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1 or argv[0] not in BACKENDS:
+        sys.stderr.write(f"usage: mount_helper.py {{{','.join(BACKENDS)}}}\n")
+        return 2
+    serve(BACKENDS[argv[0]]())
+    return 0
+
+
+def check_privileged_helper(path):
+    """Raise OSError unless path is a root-owned file only root can change"""
+    if not os.path.isabs(path):
+        raise OSError(f"Privileged helper {path} is not an absolute path")
+    # Every directory above it must be root's too, or the file could be swapped
+    current = path
+    while True:
+        st = os.stat(current)
+        if st.st_uid != 0 or st.st_mode & 0o022:
+            raise OSError(f"Privileged helper {current} must be owned by root and not group/world writable")
+        if current == os.path.dirname(current):
+            return
+        current = os.path.dirname(current)
+
+
+class MountHelperClient:
+    """Talks to a long-lived mount helper process over its stdin/stdout
+
+    The helper is started on first use and restarted once if it dies.
+    If it can't be started (e.g. sudo refuses a privileged helper) calls
+    of the system backend run in-process on a SystemBackend, as they did
+    before the helper. privileged is True (PRIVILEGED_HELPER) or the path
+    of a root-owned copy of this file to run through sudo.
+    """
+
+    def __init__(self, backend="system", privileged=False, command=None):
+        self.backend = backend
+        self.privileged = privileged
+        self.command = command
+        self.process = None
+        self.next_id = 0
+        self.pending = {}
+        self.lock = threading.Lock()
+        # The stub must never fall through to real mounts
+        self.local = SystemBackend() if backend == "system" else None
+        self.retry_at = 0
+
+    def get_command(self):
+        if self.command:
+            return self.command
+        if self.privileged:
+            path = PRIVILEGED_HELPER if self.privileged is True else self.privileged
+            check_privileged_helper(path)
+            # -I: ignore PYTHON* variables and user site-packages
+            return ['sudo', '-n', SYSTEM_PYTHON, '-I', path, self.backend]
+        from src.gui_helper import app_command
+        return app_command('--mount-helper', self.backend)
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Start the helper process if it is not already running (call with lock held)"""
+        if self.is_running():
+            return
+        from src.gui_helper import app_cwd
+        cmd = self.get_command()
+        logger.info(f"Starting mount helper: {cmd}")
+        self.process = subprocess.Popen(
+            cmd,
+            cwd=app_cwd(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1
+        )
+        threading.Thread(target=self._read_responses, args=(self.process,),
+                         name="MountHelperReader", daemon=True).start()
+
+    def _read_responses(self, process):
+        for line in process.stdout:
+            try:
+                response = json.loads(line)
+            except ValueError:
+                continue
+            with self.lock:
+                waiter = self.pending.pop(response.get("id"), None)
+            if waiter:
+                waiter[1].update(response)
+                waiter[0].set()
+        # Helper exited: fail whatever is still waiting on it
+        with self.lock:
+            waiters = [w for w in self.pending.values() if w[2] is process]
+            self.pending = {k: w for k, w in self.pending.items() if w[2] is not process}
+        for event, response, _ in waiters:
+            response.update(ok=False, error="Mount helper exited")
+            event.set()
+
+    def _send(self, op, args, wait):
+        event = threading.Event()
+        response = {}
+        with self.lock:
+            self.start()
+            self.next_id += 1
+            request_id = self.next_id
+            self.pending[request_id] = (event, response, self.process)
+            try:
+                self.process.stdin.write(json.dumps({"id": request_id, "op": op, "args": args}) + "\n")
+                self.process.stdin.flush()
+            except (OSError, ValueError):
+                self.pending.pop(request_id, None)
+                raise
+        if not event.wait(wait):
+            with self.lock:
+                self.pending.pop(request_id, None)
+            return {"ok": False, "error": f"Mount helper did not answer {op} within {wait:.0f}s"}
+        return response
+
+    def call(self, op, wait=DEFAULT_TIMEOUT, **args):
+        """Run an operation in the helper, waiting up to `wait` seconds
+
+        Returns the response dict (ok, error, result).
+        """
+        for attempt in range(2 if time.monotonic() >= self.retry_at else 0):
+            try:
+                response = self._send(op, args, wait)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Mount helper unavailable: {str(e)}")
+                with self.lock:
+                    self.process = None
+                continue
+            if response.get("error") != "Mount helper exited":
+                return response
+            with self.lock:
+                self.process = None
+        if self.local is None:
+            return {"ok": False, "error": f"Mount helper ({self.backend}) unavailable"}
+        if time.monotonic() >= self.retry_at:
+            logger.warning(f"Mount helper unavailable, running operations in-process for {RESTART_BACKOFF}s")
+            self.retry_at = time.monotonic() + RESTART_BACKOFF
+        # Still bounded by wait: a probe of a dead mount can block forever
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(handle_request(self.local, {"op": op, "args": args})),
+                                  daemon=True)
+        thread.start()
+        thread.join(wait)
+        return result or {"ok": False, "error": f"{op} did not finish within {wait:.0f}s"}
+
+    def mount(self, argv, timeout=None, env=None):
+        # Only what differs from our environment (e.g. PASSWD) goes over the pipe
+        extra = {k: v for k, v in (env or {}).items() if os.environ.get(k) != v}
+        response = self.call("mount", (timeout or DEFAULT_TIMEOUT) + CALL_MARGIN,
+                             argv=argv, timeout=timeout, env=extra or None)
+        return response["ok"], response.get("error", "")
+
+    def unmount(self, mount_point, force=False):
+        response = self.call("unmount", DEFAULT_TIMEOUT * 2 + CALL_MARGIN, mount_point=mount_point, force=force)
+        return response["ok"], response.get("error", "")
+
+    def pgrep(self, name):
+        response = self.call("pgrep", name=name)
+        return response["ok"] and response.get("result", False)
+
+    def pkill(self, name):
+        response = self.call("pkill", name=name)
+        return response["ok"] and response.get("result", False)
+
+    def probe(self, mount_point, timeout=3.0):
+        """True if the mount answers within timeout; a hung probe only ties up a helper thread"""
+        response = self.call("probe", timeout, mount_point=mount_point)
+        return response["ok"] and response.get("result", False)
+
+    def stop(self):
+        with self.lock:
+            if not self.is_running():
+                return
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=2)
+            except Exception:
+                self.process.terminate()
+            self.process = None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
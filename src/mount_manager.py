@@ -1,51 +1,165 @@
 # File: src/mount_manager.py
 import subprocess
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import logging
 from src.config_manager import ConfigManager
+from src.mount_scheduler import MountScheduler
+from src.path_selector import PathSelector
+from src.mount_profiles import mount_options, build_mount_command
+from src.preflight import Preflight, PreflightError, url_host
+from src.share_model import ShareModel
+from src.mount_helper import MountHelperClient
+from src.reconciler import Reconciler, read_mount_table, device_share_path
 
 logger = logging.getLogger('SMBManager')
 
+# Where mount_smbfs mounts go when /Volumes/<name> can't be created (non-root users)
+USER_MOUNT_ROOT = "~/SMB"
+# `open smb://` returns before Finder has mounted; wait this long for the mount to appear
+OPEN_MOUNT_WAIT = 30
+OPEN_POLL_INTERVAL = 0.5
+
 class MountManager:
     def __init__(self):
         self.config_manager = ConfigManager()
         self.config = self.config_manager.load_config()
-        if self.config.get('use_tunnel', True):
-            self.start_cloudflared()
+        self.shares = ShareModel.from_config(self.config)
+        # Mount points this process has mounted or seen mounted
+        self.known_mounts = set()
+        self.path_selector = PathSelector(self.config_manager.store)
+        self.preflight = Preflight(timeout=self.config.get('preflight_timeout', 3.0))
+        # Mounts, unmounts, probes and process checks go through one long-lived helper,
+        # started on first use so a MountManager that never mounts (e.g. the
+        # pre-spawned GUI) doesn't start a second, possibly sudo, helper
+        self.helper = MountHelperClient(privileged=self.config.get('privileged_helper', False))
+        self.tunnel_checked = False
 
     def reload_config(self):
         self.config = self.config_manager.load_config()
+        self.shares = ShareModel.from_config(self.config)
+
+    def mount_share(self, hostname, port, share_path, mount_point, username, password, timeout=None,
+                    options=None, route=None):
+        """Mount an SMB share using open command, or the mount tool when options are given
+
+        route is a preflighted (host, port) to connect to; without it
+        the route is resolved for this mount alone.
+        """
+        started_at = time.time()
+        start = time.monotonic()
+        phases = {}
+        success, error = self._mount_share(
+            hostname, port, share_path, mount_point, username, password, phases, timeout, options, route
+        )
+        self.record_attempt(hostname, port, username, share_path, success, error,
+                            time.monotonic() - start, phases, started_at)
+        return success, error
+
+    def tunnel_in_use(self):
+        """True if mounts may go through cloudflared
+
+        With auto_route the tunnel is one of the routes being compared, so
+        it has to be up even when the direct route usually wins.
+        """
+        return self.config.get('auto_route', False) or self.config.get('use_tunnel', True)
+
+    def resolve_route(self, hostname, port):
+        """Return the (host, port) to connect to for a server"""
+        if self.config.get('auto_route', False):
+            # Make sure the tunnel is up so both routes can be probed
+            self.start_cloudflared()
+            # The tunnel's local port says nothing about the server's own SMB port
+            direct_port = self.config.get('direct_port', 445)
+            _, host, port = self.path_selector.choose(hostname, direct_port, port)
+            return host, port
+        # Use localhost if tunnel is enabled
+        if self.config.get('use_tunnel', True):
+            if not self.tunnel_checked:
+                # Once per process; recover_shares restarts it after network changes
+                self.tunnel_checked = True
+                self.start_cloudflared()
+            return "localhost", port
+        return hostname, port
+
+    def preflight_route(self, hostname, port):
+        """Resolve the route and check it answers; returns the (host, port) to mount
+
+        Raises PreflightError with the reason if the server can't be reached,
+        before any mount command has been run. The host name is kept so
+        Kerberos can find the server's SPN; the address that answered is
+        only used with "pin_preflight_address".
+        """
+        connect_host, connect_port = self.resolve_route(hostname, port)
+        if not self.config.get('preflight', True):
+            return connect_host, connect_port
+        address, _ = self.preflight.check(connect_host, connect_port)
+        # A link-local IPv6 address is useless without its scope, which URLs can't carry
+        if self.config.get('pin_preflight_address', False) and not address.lower().startswith("fe80:"):
+            return address, connect_port
+        return connect_host, connect_port
+
+    def record_attempt(self, hostname, port, username, share_path, success, error,
+                       duration, phases, started_at):
+        """Store a mount attempt in the state store; never fails the mount"""
+        try:
+            self.config_manager.store.record_mount_attempt(
+                hostname, port, username, share_path,
+                "success" if success else "failure", duration,
+                error=error or None, phases=phases, started_at=started_at
+            )
+        except Exception as e:
+            logger.error(f"Failed to record mount attempt: {str(e)}")
 
-    def mount_share(self, hostname, port, share_path, mount_point, username, password):
-        """Mount an SMB share using open command"""
+    def _mount_share(self, hostname, port, share_path, mount_point, username, password, phases, timeout,
+                     options=None, route=None):
         try:
+            phase_start = time.monotonic()
             self.reload_config()
+            phases['config'] = time.monotonic() - phase_start
             
-            # Use localhost if tunnel is enabled
-            use_tunnel = self.config.get('use_tunnel', True)
-            connect_host = "localhost" if use_tunnel else hostname
+            phase_start = time.monotonic()
+            connect_host, port = route or self.resolve_route(hostname, port)
+            phases['route'] = time.monotonic() - phase_start
             
             # Build the SMB URL
-            smb_url = f"smb://{username}:{password}@{connect_host}:{port}{share_path}"
+            smb_url = f"smb://{username}:{password}@{url_host(connect_host)}:{port}{share_path}"
             
             # Log the attempt (without password)
-            safe_url = f"smb://{username}:****@{connect_host}:{port}{share_path}"
-            logger.info(f"Attempting to mount {safe_url}")
+            safe_url = f"smb://{username}:****@{url_host(connect_host)}:{port}{share_path}"
+            logger.info(f"Attempting to mount {safe_url}" + (f" with {','.join(options)}" if options else ""))
             
-            # Execute open command
-            result = subprocess.run(
-                ['open', smb_url],
-                capture_output=True,
-                text=True
-            )
+            # Finder's open can't take options, and Linux has no open at all
+            command, env = ['open', smb_url], None
+            if options or sys.platform != "darwin":
+                mount_point = self.user_mount_point(mount_point or self.get_mount_point(share_path))
+                os.makedirs(mount_point, exist_ok=True)
+                command, env = build_mount_command(
+                    connect_host, port, share_path, mount_point, username, password, options or []
+                )
+            
+            phase_start = time.monotonic()
+            success, error = self.helper.mount(command, timeout=timeout, env=env)
+            phases['open'] = time.monotonic() - phase_start
+            
+            if success and command[0] == 'open':
+                # Only a mount that exists counts, so the recorded duration is time to mounted
+                phase_start = time.monotonic()
+                mount_point = self.wait_for_mount(share_path, (timeout or OPEN_MOUNT_WAIT) - phases['open'])
+                phases['finder'] = time.monotonic() - phase_start
+                if mount_point is None:
+                    success, error = False, f"Finder did not mount it within {timeout or OPEN_MOUNT_WAIT:.0f}s"
             
-            if result.returncode == 0:
+            if success:
                 logger.info(f"Successfully mounted {share_path}")
+                self.known_mounts.add(mount_point or self.get_mount_point(share_path))
                 return True, ""
             else:
-                error_msg = f"Mount failed: {result.stderr.strip()}"
-                logger.error(error_msg)
+                error_msg = error if error.startswith("Mount timed out") else f"Mount failed: {error}"
+                logger.error(f"{error_msg}: {share_path}")
                 return False, error_msg
                 
         except Exception as e:
@@ -53,24 +167,100 @@ class MountManager:
             logger.error(error_msg)
             return False, error_msg
 
-    def unmount_share(self, share_path):
-        """Unmount a share"""
+    def mount_all(self, shares, hostname, port):
+        """Mount shares in the order and with the timeouts learned from history
+
+        Returns (mounted_shares, errors).
+        """
+        self.reload_config()
+        errors = []
+        passwords = {}
+        for share in shares:
+            password = self.config_manager.get_share_password(share["username"], share["share"])
+            if password:
+                passwords[(share["username"], share["share"])] = password
+            else:
+                errors.append(f"No password found for {share['share']}")
+        shares = [s for s in shares if (s["username"], s["share"]) in passwords]
+        if not shares:
+            return [], errors
+
+        # One resolve and reachability check for the whole batch
+        try:
+            route = self.preflight_route(hostname, port)
+        except PreflightError as e:
+            logger.error(f"Preflight failed: {str(e)}")
+            errors.extend(f"Failed to mount {s['share']}: {str(e)}" for s in shares)
+            return [], errors
+
+        def mount(share, timeout):
+            share_path = share["share"]
+            mount_point = share.get("mount_point") or self.get_mount_point(share_path)
+            try:
+                options = mount_options(share, defaults=self.config.get("cifs_default_options"))
+            except ValueError as e:
+                return False, f"Failed to mount {share_path}: {str(e)}"
+            success, error = self.mount_share(
+                hostname, port, share_path, mount_point, share["username"],
+                passwords[(share["username"], share_path)], timeout=timeout,
+                options=options, route=route
+            )
+            return success, "" if success else f"Failed to mount {share_path}: {error}"
+
+        scheduler = MountScheduler(
+            self.config_manager.store.share_stats(),
+            max_concurrency=self.config.get("max_concurrent_mounts", 3)
+        )
+        mounted = []
+        for share, success, error, _ in scheduler.run(shares, mount, default_host=hostname):
+            if success:
+                mounted.append(share)
+            else:
+                errors.append(error)
+        return mounted, errors
+
+    def wait_for_mount(self, share_path, wait):
+        """Poll the mount table until share_path is mounted; returns where, or None"""
+        deadline = time.monotonic() + max(wait, OPEN_POLL_INTERVAL)
+        target = "/" + share_path.strip("/").lower()
+        while True:
+            try:
+                for mount_point, device in read_mount_table().items():
+                    if device_share_path(device) == target:
+                        return mount_point
+            except (OSError, subprocess.SubprocessError) as e:
+                logger.warning(f"Could not read the mount table: {str(e)}")
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(OPEN_POLL_INTERVAL)
+
+    def user_mount_point(self, mount_point):
+        """The mount point mount_smbfs actually uses for a configured one
+
+        Only root can create directories in /Volumes, so for other users a
+        /Volumes/<name> that doesn't exist yet becomes ~/SMB/<name>.
+        """
+        if (sys.platform == "darwin" and os.path.dirname(mount_point.rstrip("/")) == "/Volumes"
+                and not os.path.isdir(mount_point) and os.geteuid() != 0):
+            return os.path.join(os.path.expanduser(USER_MOUNT_ROOT), os.path.basename(mount_point.rstrip("/")))
+        return mount_point
+
+    def unmount_share(self, share_path, force=False, mount_point=None):
+        """Unmount a share, at mount_point if given (e.g. as found in the mount table)"""
         try:
-            mount_point = f"/Volumes/{Path(share_path).name}"
+            mount_point = mount_point or self.get_mount_point(share_path)
+            if not self.is_mounted(mount_point) and self.is_mounted(self.user_mount_point(mount_point)):
+                mount_point = self.user_mount_point(mount_point)
             if self.is_mounted(mount_point):
-                result = subprocess.run(['umount', mount_point], capture_output=True, text=True)
-                if result.returncode == 0:
+                # The helper retries with sudo itself, without ever prompting
+                success, error = self.helper.unmount(mount_point, force)
+                if success:
                     logger.info(f"Successfully unmounted {mount_point}")
+                    self.known_mounts.discard(mount_point)
                     return True, ""
-                else:
-                    # Try with sudo if regular unmount fails
-                    sudo_result = subprocess.run(['sudo', 'umount', mount_point], capture_output=True, text=True)
-                    if sudo_result.returncode == 0:
-                        logger.info(f"Successfully unmounted {mount_point} using sudo")
-                        return True, ""
-                    error_msg = f"Unmount failed: {sudo_result.stderr.strip()}"
-                    logger.error(error_msg)
-                    return False, error_msg
+                error_msg = f"Unmount failed: {error}"
+                logger.error(error_msg)
+                return False, error_msg
             return True, "Not mounted"
         except Exception as e:
             error_msg = f"Unmount error: {str(e)}"
@@ -78,7 +268,10 @@ class MountManager:
             return False, error_msg
 
     def get_mount_point(self, share_path):
-        """Get the mount point for a share path"""
+        """Get the mount point for a share path, as configured when that is unambiguous"""
+        matches = self.shares.with_path(share_path)
+        if len(matches) == 1:
+            return matches[0].mount_point
         return f"/Volumes/{Path(share_path).name}"
 
     def is_mounted(self, mount_point):
@@ -88,6 +281,92 @@ class MountManager:
         except Exception:
             return False
 
+    def check_share_health(self, mount_point, timeout=3.0):
+        """Check that a mount point is mounted and answers a stat within timeout"""
+        # A stale SMB mount can block forever; that ties up a helper thread, not ours
+        healthy = self.helper.probe(mount_point, timeout)
+        if not healthy:
+            logger.warning(f"Health check failed for {mount_point}")
+        return healthy
+
+    def is_cloudflared_running(self):
+        try:
+            return self.helper.pgrep('cloudflared')
+        except Exception:
+            return False
+
+    def recover_shares(self, restart_tunnel=False, max_workers=8):
+        """Health check known mounts in parallel and remount only the broken ones
+
+        Returns a (remounted, errors) tuple.
+        """
+        self.reload_config()
+        hostname = self.config.get("hostname", "")
+        port = self.config.get("port", "8445")
+
+        # Where each share is really mounted: ~/SMB fallbacks and Finder's /Volumes/x-1 included
+        table = read_mount_table()
+        actual = Reconciler(self).actual_state(list(self.shares), table)
+        candidates = []
+        for share in self.shares:
+            mount_point = actual[(share["username"], share["share"])]
+            if mount_point is None:
+                # Mounted earlier but gone from the mount table: remount it where it was
+                mount_point = next((mp for mp in (share.mount_point, self.user_mount_point(share.mount_point))
+                                    if mp in self.known_mounts), None)
+            if mount_point is not None:
+                candidates.append((share, mount_point))
+        if not candidates:
+            return 0, []
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            health = list(executor.map(lambda c: self.check_share_health(c[1]), candidates))
+        affected = [c for c, healthy in zip(candidates, health) if not healthy]
+        for _, mount_point in candidates:
+            self.known_mounts.add(mount_point)
+        if not affected:
+            logger.info("All mounted shares healthy")
+            return 0, []
+
+        logger.info(f"{len(affected)} share(s) need remounting")
+        if self.tunnel_in_use() and (restart_tunnel or not self.is_cloudflared_running()):
+            self.stop_cloudflared()
+            self.start_cloudflared()
+
+        # The network just changed: resolve again, then fail fast if the server is gone
+        self.preflight.dns_cache.clear()
+        try:
+            route = self.preflight_route(hostname, port)
+        except PreflightError as e:
+            logger.error(f"Preflight failed: {str(e)}")
+            return 0, [f"Failed to remount {share['share']}: {str(e)}" for share, _ in affected]
+
+        def remount(candidate):
+            share, mount_point = candidate
+            share_path = share["share"]
+            if self.is_mounted(mount_point):
+                self.unmount_share(share_path, force=True, mount_point=mount_point)
+            password = self.config_manager.get_share_password(share["username"], share_path)
+            if not password:
+                return False, f"No password found for {share_path}"
+            try:
+                options = mount_options(share, defaults=self.config.get("cifs_default_options"))
+            except ValueError as e:
+                return False, f"Failed to remount {share_path}: {str(e)}"
+            success, error = self.mount_share(
+                hostname, port, share_path, mount_point, share["username"], password,
+                options=options, route=route
+            )
+            if not success:
+                return False, f"Failed to remount {share_path}: {error}"
+            return True, ""
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(remount, affected))
+        remounted = sum(1 for success, _ in results if success)
+        errors = [error for success, error in results if not success]
+        return remounted, errors
+
     def start_cloudflared(self):
         """Start cloudflared tunnel if needed"""
         try:
@@ -96,7 +375,7 @@ class MountManager:
                 logger.warning("No hostname configured, skipping cloudflared")
                 return
 
-            if subprocess.run(['pgrep', 'cloudflared'], capture_output=True).returncode != 0:
+            if not self.helper.pgrep('cloudflared'):
                 subprocess.Popen(
                     ['cloudflared', 'access', 'tcp', 
                      '--hostname', hostname, 
@@ -111,9 +390,7 @@ class MountManager:
     def stop_cloudflared(self):
         """Stop cloudflared tunnel"""
         try:
-            subprocess.run(['pkill', 'cloudflared'], 
-                         stdout=subprocess.DEVNULL, 
-                         stderr=subprocess.DEVNULL)
+            self.helper.pkill('cloudflared')
             logger.info("Stopped cloudflared")
         except Exception as e:
             logger.error(f"Error stopping cloudflared: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,127 @@
+# File: src/mount_profiles.py
+import os
+import sys
+from urllib.parse import quote
+
+from src.preflight import url_host
+
+DEFAULT_PROFILE = "default"
+
+# Options per backend: "darwin" goes to mount_smbfs -o, "linux" to mount.cifs -o.
+# Read/write sizes on macOS are client-wide (nsmb.conf), not per mount.
+PROFILES = {
+    "default": {
+        "label": "Default",
+        "darwin": [],
+        "linux": [],
+    },
+    "lan_bulk": {
+        "label": "LAN bulk",
+        "description": "Large sequential transfers on a fast, reliable network",
+        "darwin": ["noatime"],
+        "linux": ["rsize=4194304", "wsize=4194304", "cache=loose", "actimeo=60", "hard", "noatime"],
+    },
+    "wan_interactive": {
+        "label": "WAN interactive",
+        "description": "Browsing and small edits over a slow or lossy link; fails instead of hanging",
+        "darwin": ["soft", "nostreams"],
+        "linux": ["rsize=1048576", "wsize=1048576", "cache=strict", "actimeo=5", "soft", "echo_interval=10"],
+    },
+    "readonly_archive": {
+        "label": "Read-only archive",
+        "description": "Rarely changing data; long attribute caching, hidden from the Finder sidebar",
+        "darwin": ["rdonly", "nobrowse", "noatime", "nostreams"],
+        "linux": ["ro", "rsize=4194304", "cache=loose", "actimeo=3600", "soft", "noatime"],
+    },
+}
+
+READONLY_OPTION = {"darwin": "rdonly", "linux": "ro"}
+# Options that can't be combined; a later one replaces any other of its group
+EXCLUSIVE_OPTIONS = [
+    {"soft", "hard"},
+    {"ro", "rw"},
+    {"rdonly", "rw"},
+    {"noatime", "relatime", "strictatime"},
+    {"multichannel", "nomultichannel"},
+    {"serverino", "noserverino"},
+    {"strictsync", "nostrictsync"},
+]
+
+
+def backend_name(platform=None):
+    return "darwin" if (platform or sys.platform) == "darwin" else "linux"
+
+
+def profile_names():
+    return list(PROFILES)
+
+
+def profile_label(name):
+    return PROFILES.get(name or DEFAULT_PROFILE, PROFILES[DEFAULT_PROFILE])["label"]
+
+
+def profile_from_label(label):
+    for name, profile in PROFILES.items():
+        if profile["label"] == label:
+            return name
+    return DEFAULT_PROFILE
+
+
+def option_conflicts(option):
+    """Names of the options an option replaces: itself and its exclusive group"""
+    name = option.split("=", 1)[0]
+    names = {name}
+    for group in EXCLUSIVE_OPTIONS:
+        if name in group:
+            names |= group
+    return names
+
+
+def merge_options(defaults, overrides):
+    """Combine mount options; an override replaces a default with the same name
+
+    Mutually exclusive options such as soft/hard count as the same name.
+    """
+    replaced = set()
+    for option in overrides:
+        replaced |= option_conflicts(option)
+    return [option for option in defaults if option.split("=", 1)[0] not in replaced] + list(overrides)
+
+
+def mount_options(share, platform=None, defaults=None):
+    """Return the mount options for a share: defaults, its profile and the readonly flag
+
+    defaults are the client-wide cifs_default_options (Linux only; macOS
+    keeps client-wide settings in nsmb.conf).
+    """
+    backend = backend_name(platform)
+    profile = share.get("profile") or DEFAULT_PROFILE
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown mount profile '{profile}'")
+    options = list(PROFILES[profile][backend])
+    if backend == "linux" and defaults:
+        options = merge_options(defaults, options)
+    if share.get("readonly") and READONLY_OPTION[backend] not in options:
+        options = merge_options(options, [READONLY_OPTION[backend]])
+    return options
+
+
+def build_mount_command(host, port, share_path, mount_point, username, password, options, platform=None):
+    """Return (argv, env) for mounting with explicit options
+
+    On Linux the password is passed to mount.cifs through PASSWD so it
+    doesn't show up in the process list.
+    """
+    if backend_name(platform) == "darwin":
+        url = f"//{quote(username, safe='')}:{quote(password, safe='')}@{url_host(host)}:{port}{quote(share_path)}"
+        argv = ['mount_smbfs']
+        if options:
+            argv += ['-o', ",".join(options)]
+        return argv + [url, mount_point], None
+    options = options + [f"port={port}", f"username={username}"]
+    if ":" in host:
+        # mount.cifs takes IPv6 addresses through ip= rather than the UNC
+        options.append(f"ip={host}")
+        host = host.replace(":", "-") + ".ipv6-literal.net"
+    env = {**os.environ, "PASSWD": password}
+    return ['mount', '-t', 'cifs', f"//{host}{share_path}", mount_point, '-o', ",".join(options)], env
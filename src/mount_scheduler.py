@@ -0,0 +1,250 @@
+# File: src/mount_scheduler.py
+import heapq
+import math
+import random
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('SMBManager')
+
+DEFAULT_TIMEOUT = 30.0
+MIN_TIMEOUT = 5.0
+MAX_TIMEOUT = 120.0
+# Per-share timeout is this multiple of the share's p95 mount time
+TIMEOUT_FACTOR = 2.0
+# Fewer successful samples than this and we fall back to the defaults
+MIN_SAMPLES = 3
+# A mount this many times slower than the share's median counts as congestion
+SLOW_FACTOR = 2.0
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class HostLimiter:
+    """Adaptive concurrency limit for one host
+
+    Halves the limit when a mount fails or is much slower than usual and
+    grows it back by one after each normal mount.
+    """
+
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.active = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.active >= self.limit:
+                self.condition.wait()
+            self.active += 1
+
+    def release(self, congested):
+        with self.condition:
+            self.active -= 1
+            if congested:
+                self.limit = max(1, self.limit // 2)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1)
+            self.condition.notify_all()
+
+
+class MountScheduler:
+    """Orders and paces mounts using each share's recorded history
+
+    stats is the {(username, share): {...}} mapping returned by
+    StateStore.share_stats().
+    """
+
+    def __init__(self, stats=None, max_concurrency=3, default_timeout=DEFAULT_TIMEOUT):
+        self.stats = stats or {}
+        self.max_concurrency = max(1, max_concurrency)
+        self.default_timeout = default_timeout
+
+    def estimate(self, share):
+        """Return (expected_seconds, timeout, median) for a share
+
+        expected_seconds is None for shares without enough history.
+        """
+        entry = self.stats.get((share["username"], share["share"]))
+        if not entry or len(entry["durations"]) < MIN_SAMPLES:
+            return None, self.default_timeout, None
+        durations = entry["durations"]
+        median = percentile(durations, 0.5)
+        timeout = min(MAX_TIMEOUT, max(MIN_TIMEOUT, percentile(durations, 0.95) * TIMEOUT_FACTOR))
+        # Smoothed success rate so one lucky attempt doesn't look perfect
+        success_rate = (entry["attempts"] - entry["failures"] + 1) / (entry["attempts"] + 2)
+        # A failed attempt costs us the whole timeout
+        expected = success_rate * median + (1 - success_rate) * timeout
+        return expected, timeout, median
+
+    def plan(self, shares):
+        """Order shares fast-and-reliable first; returns [(share, timeout, median)]"""
+        estimates = [(share, *self.estimate(share)) for share in shares]
+        known = sorted(e[1] for e in estimates if e[1] is not None)
+        # Shares without history go in the middle of the pack
+        unknown_cost = percentile(known, 0.5) if known else 0.0
+        ordered = sorted(estimates, key=lambda e: unknown_cost if e[1] is None else e[1])
+        return [(share, timeout, median) for share, _, timeout, median in ordered]
+
+    def run(self, shares, mount_func, default_host=None):
+        """Mount shares following plan()
+
+        mount_func(share, timeout) must return (success, error). Returns a
+        list of (share, success, error, duration) in completion order.
+        """
+        limiters = {}
+        results = []
+        results_lock = threading.Lock()
+
+        def mount(share, timeout, median):
+            host = share.get("hostname", default_host)
+            limiter = limiters[host]
+            limiter.acquire()
+            start = time.monotonic()
+            success, error = False, ""
+            try:
+                success, error = mount_func(share, timeout)
+            except Exception as e:
+                error = str(e)
+            finally:
+                duration = time.monotonic() - start
+                congested = not success or (median is not None and duration > median * SLOW_FACTOR)
+                limiter.release(congested)
+                if congested:
+                    logger.info(f"Mount of {share['share']} took {duration:.1f}s, "
+                                f"concurrency for {host} now {limiter.limit}")
+            with results_lock:
+                results.append((share, success, error, duration))
+
+        plan = self.plan(shares)
+        for share, _, _ in plan:
+            host = share.get("hostname", default_host)
+            if host not in limiters:
+                limiters[host] = HostLimiter(self.max_concurrency)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="Mount") as executor:
+            for share, timeout, median in plan:
+                executor.submit(mount, share, timeout, median)
+        return results
+
+
+def default_simulation_shares():
+    """A mixed inventory: a flaky share and slow shares early in the list"""
+    return [
+        {"username": "sim", "share": "/archive", "median": 6.0, "failure_rate": 0.3},
+        {"username": "sim", "share": "/legacy", "median": 4.0, "failure_rate": 0.5},
+        {"username": "sim", "share": "/media", "median": 3.0, "failure_rate": 0.05},
+        {"username": "sim", "share": "/home", "median": 0.6, "failure_rate": 0.01},
+        {"username": "sim", "share": "/projects", "median": 0.8, "failure_rate": 0.02},
+        {"username": "sim", "share": "/scratch", "median": 1.5, "failure_rate": 0.1},
+        {"username": "sim", "share": "/docs", "median": 0.5, "failure_rate": 0.01},
+        {"username": "sim", "share": "/backup", "median": 8.0, "failure_rate": 0.2},
+    ]
+
+
+def sample_mount(rng, model, timeout):
+    """Simulate one mount; a failure hangs until the timeout"""
+    if rng.random() < model["failure_rate"]:
+        return False, timeout
+    duration = model["median"] * rng.lognormvariate(0, 0.4)
+    if duration > timeout:
+        return False, timeout
+    return True, duration
+
+
+SIMULATION_STRATEGIES = ("serial", "list_order", "adaptive")
+
+
+def simulate(models=None, runs=500, seed=1, history=30, baseline_timeout=DEFAULT_TIMEOUT,
+             baseline_delay=2.0, max_concurrency=3):
+    """Compare list-order mounting with the adaptive scheduler
+
+    "list_order" runs the shares in config order with one global timeout
+    on the same number of parallel mounts as "adaptive", so the difference
+    between the two is ordering and per-share timeouts only. "serial" is
+    the old Connect All (one at a time with a fixed delay), for reference.
+    Returns a dict of averaged metrics per strategy.
+    """
+    models = models or default_simulation_shares()
+    rng = random.Random(seed)
+
+    # Synthetic history so the scheduler has something to learn from
+    stats = {}
+    for model in models:
+        entry = {"attempts": history, "failures": 0, "durations": []}
+        for _ in range(history):
+            success, duration = sample_mount(rng, model, MAX_TIMEOUT)
+            if success:
+                entry["durations"].append(duration)
+            else:
+                entry["failures"] += 1
+        entry["durations"].sort()
+        stats[(model["username"], model["share"])] = entry
+    plan = MountScheduler(stats, max_concurrency=max_concurrency).plan(models)
+
+    totals = {
+        name: {"time_to_mounted": 0.0, "makespan": 0.0, "mounted": 0}
+        for name in SIMULATION_STRATEGIES
+    }
+    for _ in range(runs):
+        # Serial in list order, as Connect All used to mount
+        clock = 0.0
+        mounted_times = []
+        for i, model in enumerate(models):
+            success, duration = sample_mount(rng, model, baseline_timeout)
+            clock += duration
+            if success:
+                mounted_times.append(clock)
+            if i < len(models) - 1:
+                clock += baseline_delay
+        record_run(totals["serial"], mounted_times, clock)
+
+        record_run(totals["list_order"], *simulate_pool(
+            rng, [(model, baseline_timeout) for model in models], max_concurrency))
+        record_run(totals["adaptive"], *simulate_pool(
+            rng, [(model, timeout) for model, timeout, _ in plan], max_concurrency))
+
+    return {
+        name: {key: value / runs for key, value in metrics.items()}
+        for name, metrics in totals.items()
+    }
+
+
+def simulate_pool(rng, jobs, concurrency):
+    """Run (model, timeout) jobs in order on `concurrency` workers; returns (mounted_times, makespan)"""
+    workers = [0.0] * concurrency
+    mounted_times = []
+    for model, timeout in jobs:
+        start = heapq.heappop(workers)
+        success, duration = sample_mount(rng, model, timeout)
+        heapq.heappush(workers, start + duration)
+        if success:
+            mounted_times.append(start + duration)
+    return mounted_times, max(workers)
+
+
+def record_run(totals, mounted_times, makespan):
+    if mounted_times:
+        totals["time_to_mounted"] += sum(mounted_times) / len(mounted_times)
+    totals["makespan"] += makespan
+    totals["mounted"] += len(mounted_times)
+
+
+def format_simulation(results):
+    lines = [f"{'':10} {'avg time-to-mounted':>20} {'all done':>10} {'mounted':>8}"]
+    for name in SIMULATION_STRATEGIES:
+        metrics = results[name]
+        lines.append(
+            f"{name:10} {metrics['time_to_mounted']:>19.1f}s {metrics['makespan']:>9.1f}s "
+            f"{metrics['mounted']:>8.2f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,146 @@
+# File: src/network_monitor.py
+import socket
+import threading
+import time
+import logging
+
+logger = logging.getLogger('SMBManager')
+
+# TEST-NET-1 address, only used to let the kernel pick an outgoing route
+ROUTE_PROBE_ADDRESS = ("192.0.2.1", 9)
+
+
+class NetworkChangeTrigger:
+    """Fires when the network interfaces or the default route change"""
+    name = "network"
+
+    def __init__(self):
+        self.last_state = self.get_state()
+
+    @staticmethod
+    def get_route_address():
+        """Return the local address the default route would use"""
+        try:
+            # Connecting a UDP socket sends nothing but selects a route
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.connect(ROUTE_PROBE_ADDRESS)
+                return sock.getsockname()[0]
+        except OSError:
+            return None
+
+    def get_state(self):
+        try:
+            interfaces = tuple(sorted(name for _, name in socket.if_nameindex()))
+        except OSError:
+            interfaces = ()
+        return interfaces, self.get_route_address()
+
+    def poll(self):
+        state = self.get_state()
+        if state == self.last_state:
+            return None
+        old_address = self.last_state[1]
+        self.last_state = state
+        return f"network changed ({old_address} -> {state[1]})"
+
+
+class SleepWakeTrigger:
+    """Fires when the wall clock jumps ahead of the monotonic clock (resume from sleep)"""
+    name = "wake"
+
+    def __init__(self, threshold=30.0):
+        self.threshold = threshold
+        self.last_wall = time.time()
+        self.last_monotonic = time.monotonic()
+
+    def poll(self):
+        wall = time.time()
+        monotonic = time.monotonic()
+        # The monotonic clock does not advance while the machine sleeps
+        gap = (wall - self.last_wall) - (monotonic - self.last_monotonic)
+        self.last_wall = wall
+        self.last_monotonic = monotonic
+        if gap > self.threshold:
+            return f"resumed after {int(gap)}s asleep"
+        return None
+
+
+class NetworkMonitor:
+    """Polls triggers in the background and calls back once per burst of events"""
+
+    def __init__(self, callback, triggers=None, interval=5.0, debounce=3.0):
+        self.callback = callback
+        self.triggers = list(triggers) if triggers is not None else [
+            NetworkChangeTrigger(),
+            SleepWakeTrigger(),
+        ]
+        self.interval = interval
+        self.debounce = debounce
+        self.lock = threading.Lock()
+        self.pending_reasons = []
+        self.timer = None
+        self.running = False
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def add_trigger(self, trigger):
+        """Register an additional trigger exposing a poll() method"""
+        self.triggers.append(trigger)
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._poll_loop, name="NetworkMonitor", daemon=True)
+        self.thread.start()
+        logger.info("Network monitor started")
+
+    def stop(self):
+        self.stop_event.set()
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+
+    def _poll_loop(self):
+        while not self.stop_event.wait(self.interval):
+            for trigger in self.triggers:
+                try:
+                    reason = trigger.poll()
+                except Exception as e:
+                    logger.error(f"Network trigger {getattr(trigger, 'name', trigger)} failed: {str(e)}")
+                    continue
+                if reason:
+                    self.notify(reason)
+
+    def notify(self, reason):
+        """Queue an event; events within the debounce window are merged into one run"""
+        logger.info(f"Network event: {reason}")
+        with self.lock:
+            self.pending_reasons.append(reason)
+            if self.timer:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.debounce, self._fire)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def _fire(self):
+        with self.lock:
+            self.timer = None
+            if self.running or not self.pending_reasons:
+                # A run is in progress; it will pick up the pending reasons when done
+                return
+            reasons = self.pending_reasons
+            self.pending_reasons = []
+            self.running = True
+
+        while reasons:
+            try:
+                self.callback(reasons)
+            except Exception as e:
+                logger.error(f"Network event handler failed: {str(e)}", exc_info=True)
+            with self.lock:
+                reasons = self.pending_reasons
+                self.pending_reasons = []
+                if not reasons:
+                    self.running = False
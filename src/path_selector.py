@@ -0,0 +1,167 @@
+# File: src/path_selector.py
+import socket
+import statistics
+import struct
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from src.network_monitor import NetworkChangeTrigger
+
+logger = logging.getLogger('SMBManager')
+
+PROBE_TIMEOUT = 2.0
+# Each round is a fresh connection plus one NEGOTIATE; the median is used
+PROBE_ROUNDS = 3
+# Route decisions older than this are re-probed even on the same network
+DECISION_TTL = 24 * 60 * 60
+SMB2_DIALECTS = (0x0202, 0x0210, 0x0300, 0x0302)
+
+
+def smb2_negotiate_request():
+    """A minimal SMB2 NEGOTIATE request wrapped in a NetBIOS session header
+
+    Any SMB server answers it, so the time to the response covers the
+    whole path, including the far side of a tunnel, not just the local
+    listener.
+    """
+    header = struct.pack(
+        '<4sHHIHHIIQIIQ16s',
+        b'\xfeSMB', 64, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, b'\x00' * 16
+    )
+    body = struct.pack('<HHHHI16sQ', 36, len(SMB2_DIALECTS), 1, 0, 0, b'\x00' * 16, 0)
+    body += b''.join(struct.pack('<H', dialect) for dialect in SMB2_DIALECTS)
+    payload = header + body
+    return struct.pack('>I', len(payload)) + payload
+
+
+def recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed mid-response")
+        data += chunk
+    return data
+
+
+def probe_once(host, port, timeout):
+    """One connect plus NEGOTIATE round trip; returns (connect_ms, response_ms)
+
+    response_ms is None when the listener accepted but no SMB reply came
+    back, e.g. a tunnel whose far side is down.
+    """
+    start = time.perf_counter()
+    with socket.create_connection((host, int(port)), timeout=timeout) as sock:
+        connected = time.perf_counter()
+        try:
+            sock.sendall(smb2_negotiate_request())
+            # NetBIOS session header carries the length of the SMB2 reply
+            length, = struct.unpack('>I', recv_exact(sock, 4))
+            recv_exact(sock, length & 0xFFFFFF)
+        except OSError:
+            return (connected - start) * 1000, None
+        return (connected - start) * 1000, (time.perf_counter() - connected) * 1000
+
+
+def probe_route(host, port, timeout=PROBE_TIMEOUT, rounds=PROBE_ROUNDS):
+    """Measure one route with a few connect + SMB2 NEGOTIATE round trips
+
+    Returns a dict with "reachable", "connect_ms", "response_ms" (medians
+    over the rounds that got that far) and "rounds" answered. An SMB
+    server can't be asked for bulk data before a session is set up, so the
+    probe measures latency only; a lone slow round doesn't decide the route.
+    """
+    result = {"host": host, "port": port, "reachable": False, "connect_ms": None,
+              "response_ms": None, "rounds": 0}
+    connects, responses = [], []
+    for _ in range(rounds):
+        try:
+            connect_ms, response_ms = probe_once(host, port, timeout)
+        except OSError as e:
+            result["error"] = str(e)
+            if not connects:
+                # Refused or unreachable on the first try: don't keep waiting
+                break
+            continue
+        connects.append(connect_ms)
+        if response_ms is not None:
+            responses.append(response_ms)
+    if connects:
+        result["reachable"] = True
+        result["connect_ms"] = statistics.median(connects)
+    if responses:
+        result["response_ms"] = statistics.median(responses)
+        result["rounds"] = len(responses)
+    return result
+
+
+def route_cost(probe):
+    """Estimated ms to connect and get an SMB reply over a route
+
+    Lower is better; unreachable routes cost infinity.
+    """
+    if not probe["reachable"]:
+        return float("inf")
+    if probe["response_ms"] is None:
+        # Connected but nothing answered: only usable as a last resort
+        return probe["connect_ms"] + PROBE_TIMEOUT * 1000
+    return probe["connect_ms"] + probe["response_ms"]
+
+
+class PathSelector:
+    """Chooses between the direct route and the cloudflared tunnel per server
+
+    Decisions are cached per network (interfaces plus route source
+    address) in the state store, so moving between office and home
+    re-probes once and then reuses the answer.
+    """
+
+    def __init__(self, store, network_id=None):
+        self.store = store
+        self.network_id = network_id or self.current_network
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def current_network():
+        interfaces, address = NetworkChangeTrigger().get_state()
+        return f"{address}|{','.join(interfaces)}"
+
+    def invalidate(self):
+        """Forget in-memory decisions, e.g. after a network change"""
+        with self.lock:
+            self.cache.clear()
+
+    def choose(self, hostname, direct_port, tunnel_port, tunnel_host="localhost", force=False):
+        """Return ("direct" | "tunnel", host, port) for a server"""
+        network = self.network_id()
+        key = (network, hostname)
+        routes = {"direct": (hostname, direct_port), "tunnel": (tunnel_host, tunnel_port)}
+        if not force:
+            with self.lock:
+                route = self.cache.get(key)
+            if route is None:
+                route = self.store.get_route_choice(network, hostname, DECISION_TTL)
+            if route in routes:
+                with self.lock:
+                    self.cache[key] = route
+                return (route, *routes[route])
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            probes = dict(zip(routes, executor.map(lambda r: probe_route(*r), routes.values())))
+        route = min(probes, key=lambda name: route_cost(probes[name]))
+        for name, probe in probes.items():
+            logger.info(f"Route {name} to {hostname}: reachable={probe['reachable']} "
+                        f"connect={probe['connect_ms']} response={probe['response_ms']} "
+                        f"rounds={probe['rounds']}")
+        if route_cost(probes[route]) == float("inf"):
+            # Nothing answered; don't remember a decision we didn't really make
+            logger.warning(f"Neither route to {hostname} is reachable")
+            return ("tunnel", *routes["tunnel"])
+        logger.info(f"Using {route} route for {hostname} on this network")
+        with self.lock:
+            self.cache[key] = route
+        self.store.set_route_choice(network, hostname, route)
+        return (route, *routes[route])
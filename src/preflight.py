@@ -0,0 +1,150 @@
+# File: src/preflight.py
+import socket
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('SMBManager')
+
+# getaddrinfo() doesn't expose record TTLs, so answers are kept this long
+DNS_TTL = 300
+# Failed lookups are retried sooner
+DNS_NEGATIVE_TTL = 30
+CONNECT_TIMEOUT = 3.0
+# RFC 8305 "Connection Attempt Delay" between staggered attempts
+ATTEMPT_DELAY = 0.25
+
+
+class PreflightError(Exception):
+    """The server can't be reached; the message says why"""
+
+
+class DNSCache:
+    """Caches getaddrinfo() answers per (host, port) for DNS_TTL seconds"""
+
+    def __init__(self, ttl=DNS_TTL, negative_ttl=DNS_NEGATIVE_TTL, resolver=socket.getaddrinfo):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.resolver = resolver
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def resolve(self, host, port):
+        """Return [(family, sockaddr)], raising PreflightError if the name doesn't resolve"""
+        key = (host, str(port))
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+        if not entry or entry[0] <= now:
+            try:
+                infos = self.resolver(host, int(port), type=socket.SOCK_STREAM)
+                addresses = list(dict.fromkeys((family, sockaddr) for family, _, _, _, sockaddr in infos))
+                entry = (now + self.ttl, addresses)
+            except (socket.gaierror, UnicodeError) as e:
+                entry = (now + self.negative_ttl, PreflightError(f"Cannot resolve {host}: {e}"))
+            with self.lock:
+                self.entries[key] = entry
+        if isinstance(entry[1], PreflightError):
+            raise entry[1]
+        return entry[1]
+
+
+def interleave_families(addresses):
+    """Alternate IPv6 and IPv4 addresses, IPv6 first (RFC 8305 section 4)"""
+    v6 = [a for a in addresses if a[0] == socket.AF_INET6]
+    others = [a for a in addresses if a[0] != socket.AF_INET6]
+    ordered = []
+    for i in range(max(len(v6), len(others))):
+        ordered.extend(group[i] for group in (v6, others) if i < len(group))
+    return ordered
+
+
+def happy_eyeballs(addresses, timeout=CONNECT_TIMEOUT, delay=ATTEMPT_DELAY):
+    """Race TCP connects to the addresses, starting one every `delay` seconds
+
+    Returns (family, sockaddr, connect_ms) of the first to connect, or
+    raises PreflightError with the errors seen. Returns as soon as one
+    attempt wins or all have failed, never later than `timeout`.
+    """
+    if not addresses:
+        raise PreflightError("No addresses to connect to")
+    ordered = interleave_families(addresses)
+    deadline = time.monotonic() + timeout
+    winner = []
+    errors = []
+    finished = [0]
+    done = threading.Event()
+    lock = threading.Lock()
+
+    def attempt(index, family, sockaddr):
+        sock = None
+        try:
+            if done.wait(index * delay):
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            start = time.monotonic()
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.settimeout(remaining)
+            sock.connect(sockaddr)
+            with lock:
+                if not winner:
+                    winner.append((family, sockaddr, (time.monotonic() - start) * 1000))
+            done.set()
+        except OSError as e:
+            with lock:
+                errors.append(f"{sockaddr[0]}: {e.strerror or e}")
+        finally:
+            if sock:
+                sock.close()
+            with lock:
+                finished[0] += 1
+                if finished[0] == len(ordered):
+                    done.set()
+
+    executor = ThreadPoolExecutor(max_workers=len(ordered), thread_name_prefix="Preflight")
+    for index, (family, sockaddr) in enumerate(ordered):
+        executor.submit(attempt, index, family, sockaddr)
+    done.wait(timeout)
+    done.set()
+    # Losing attempts finish (and close their sockets) in the background
+    executor.shutdown(wait=False)
+    with lock:
+        if winner:
+            return winner[0]
+        raise PreflightError("; ".join(errors) or f"no answer within {timeout:.0f}s")
+
+
+class Preflight:
+    """Checks a server is reachable before any mount command runs
+
+    Each server is resolved once (through the TTL cache) and the address
+    that connects first is pinned for the whole batch.
+    """
+
+    def __init__(self, dns_cache=None, timeout=CONNECT_TIMEOUT):
+        self.dns_cache = dns_cache or DNSCache()
+        self.timeout = timeout
+
+    def check(self, host, port):
+        """Return (address, connect_ms); raises PreflightError with the reason"""
+        start = time.monotonic()
+        addresses = self.dns_cache.resolve(host, port)
+        try:
+            _, sockaddr, connect_ms = happy_eyeballs(addresses, self.timeout)
+        except PreflightError as e:
+            raise PreflightError(f"{host}:{port} unreachable ({e})") from None
+        logger.info(f"Preflight {host}:{port} -> {sockaddr[0]} in {connect_ms:.0f}ms "
+                    f"(total {(time.monotonic() - start) * 1000:.0f}ms)")
+        return sockaddr[0], connect_ms
+
+
+def url_host(address):
+    """Bracket IPv6 literals for use in smb:// URLs"""
+    return f"[{address}]" if ":" in address else address
@@ -0,0 +1,159 @@
+# File: src/profiler.py
+import cProfile
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import logging
+from collections import Counter
+from datetime import datetime
+
+from src.memory_monitor import LOG_DIR
+
+logger = logging.getLogger('SMBManager')
+
+SAMPLE_INTERVAL = 0.01
+DEFAULT_DURATION = 30
+
+
+def output_path(kind, extension, log_dir=LOG_DIR):
+    log_dir = os.path.expanduser(log_dir)
+    os.makedirs(log_dir, exist_ok=True)
+    return os.path.join(log_dir, f"profile_{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}")
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the stacks of all threads at a fixed interval
+
+    Results are collapsed stacks ("thread;outer;...;inner count" per
+    line), the input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def sample(self):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}").replace(";", ":"))
+            self.counts[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, duration):
+        """Sample in the calling thread for duration seconds"""
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline and not self.stop_event.is_set():
+            self.sample()
+            time.sleep(self.interval)
+
+    def start(self, duration=DEFAULT_DURATION, on_done=None):
+        """Sample in a background thread; on_done(path) gets the written file"""
+        if self.running:
+            return False
+        self.counts.clear()
+        self.samples = 0
+        self.stop_event.clear()
+
+        def worker():
+            self.run(duration)
+            path = self.write()
+            if on_done:
+                on_done(path)
+
+        self.thread = threading.Thread(target=worker, name="StackSampler", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+    def write(self, path=None):
+        path = path or output_path("stacks", "txt")
+        with open(path, 'w') as f:
+            f.write(self.collapsed())
+        logger.info(f"Wrote {self.samples} stack samples to {path}")
+        return path
+
+
+def profile_call(name, func, *args, **kwargs):
+    """Run func under cProfile and write a .pstats file; returns (result, path)
+
+    Threads started during the call (e.g. the MountScheduler pool) are
+    profiled too and merged into the same file. Ones that outlive the call
+    stop profiling at their next function call. From Python 3.12 one
+    profiler already sees every thread.
+    """
+    profiles = [cProfile.Profile()]
+    per_thread = sys.version_info < (3, 12)
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def profile_thread(frame, event, arg):
+        profile = cProfile.Profile()
+        with lock:
+            profiles.append(profile)
+        # Replaces this hook for the rest of the thread
+        profile.enable()
+        # cProfile can only be switched off from its own thread, so a light
+        # call-only tracer does that once the profiled call has returned
+        previous = sys.gettrace()
+
+        def stop_when_done(frame, event, arg):
+            if done.is_set():
+                sys.setprofile(None)
+                sys.settrace(previous)
+            return previous(frame, event, arg) if previous else None
+
+        sys.settrace(stop_when_done)
+
+    if per_thread:
+        threading.setprofile(profile_thread)
+    try:
+        result = profiles[0].runcall(func, *args, **kwargs)
+    finally:
+        done.set()
+        if per_thread:
+            threading.setprofile(None)
+        with lock:
+            stats = pstats.Stats(*profiles)
+        path = output_path(name, "pstats")
+        stats.dump_stats(path)
+        logger.info(f"Wrote cProfile stats for {name} ({len(profiles)} threads) to {path}")
+    return result, path
+
+
+def install_signal_handler(sampler, duration=DEFAULT_DURATION, on_done=None):
+    """Start sampling on SIGUSR1 (e.g. `kill -USR1 <pid>` or --profile-running)"""
+    def handler(signum, frame):
+        if sampler.start(duration, on_done):
+            logger.info(f"Sampling all threads for {duration}s after SIGUSR1")
+
+    try:
+        signal.signal(signal.SIGUSR1, handler)
+    except (OSError, ValueError) as e:
+        logger.error(f"Failed to install profiling signal handler: {str(e)}")
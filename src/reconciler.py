@@ -0,0 +1,140 @@
+# File: src/reconciler.py
+import os
+import re
+import subprocess
+import logging
+from urllib.parse import unquote
+
+logger = logging.getLogger('SMBManager')
+
+SMB_FILESYSTEMS = {"smbfs", "cifs", "smb3"}
+# macOS `mount` output: //user@host:port/share on /Volumes/share (smbfs, nodev, ...)
+MACOS_MOUNT_LINE = re.compile(r'^(?P<device>.+?) on (?P<mount_point>.+) \((?P<fstype>[^,)]+)')
+
+
+def unescape_proc(value):
+    """Undo the octal escapes /proc/mounts uses for spaces and tabs"""
+    return re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), value)
+
+
+def parse_proc_mounts(text):
+    mounts = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) >= 3 and fields[2] in SMB_FILESYSTEMS:
+            mounts[unescape_proc(fields[1])] = unescape_proc(fields[0])
+    return mounts
+
+
+def parse_macos_mounts(text):
+    mounts = {}
+    for line in text.splitlines():
+        match = MACOS_MOUNT_LINE.match(line)
+        if match and match.group("fstype") in SMB_FILESYSTEMS:
+            mounts[match.group("mount_point")] = match.group("device")
+    return mounts
+
+
+def read_mount_table():
+    """Return {mount_point: device} for every SMB mount, without touching the mounts"""
+    if os.path.exists("/proc/mounts"):
+        with open("/proc/mounts", 'r') as f:
+            return parse_proc_mounts(f.read())
+    result = subprocess.run(['mount'], capture_output=True, text=True, timeout=10)
+    return parse_macos_mounts(result.stdout)
+
+
+def device_share_path(device):
+    """"//user@host:port/Share%20Name" -> "/share name" (lowercased for matching)"""
+    device = device.replace("\\", "/")
+    path = device.lstrip("/").partition("/")[2]
+    return "/" + unquote(path).strip("/").lower()
+
+
+class Action:
+    __slots__ = ("kind", "share", "mount_point", "reason")
+
+    def __init__(self, kind, share, mount_point, reason):
+        self.kind = kind
+        self.share = share
+        self.mount_point = mount_point
+        self.reason = reason
+
+    def __repr__(self):
+        return f"Action({self.kind}, {self.share['share']}, {self.mount_point})"
+
+
+class Reconciler:
+    """Computes and applies the mounts needed to reach the desired state
+
+    Desired state comes from the config: shares with auto_mount set should
+    be mounted, others are left alone. Actual state comes from the mount
+    table, read once per plan.
+    """
+
+    def __init__(self, mount_manager, mount_table=read_mount_table):
+        self.mount_manager = mount_manager
+        self.mount_table = mount_table
+
+    def actual_state(self, shares, table=None):
+        """Return {(username, share): mount_point or None}"""
+        table = self.mount_table() if table is None else table
+        by_path = {}
+        for mount_point, device in table.items():
+            by_path.setdefault(device_share_path(device), mount_point)
+        state = {}
+        for share in shares:
+            mount_point = share.get("mount_point") or self.mount_manager.get_mount_point(share["share"])
+            if mount_point in table:
+                state[(share["username"], share["share"])] = mount_point
+            else:
+                # Finder may have picked another name, e.g. /Volumes/share-1
+                state[(share["username"], share["share"])] = by_path.get(
+                    "/" + share["share"].strip("/").lower()
+                )
+        return state
+
+    def plan(self, shares, target="config"):
+        """Return the actions needed; target is "config" or "unmounted" """
+        actual = self.actual_state(shares)
+        actions = []
+        for share in shares:
+            mounted_at = actual[(share["username"], share["share"])]
+            if target == "unmounted":
+                if mounted_at:
+                    actions.append(Action("unmount", share, mounted_at, "disconnect requested"))
+            elif share.get("auto_mount", True) and not mounted_at:
+                mount_point = share.get("mount_point") or self.mount_manager.get_mount_point(share["share"])
+                actions.append(Action("mount", share, mount_point, "auto_mount share not mounted"))
+        return actions
+
+    def apply(self, actions, hostname, port):
+        """Apply a plan; returns (mounted_shares, unmounted_shares, errors)"""
+        errors = []
+        unmounted = []
+        for action in actions:
+            if action.kind != "unmount":
+                continue
+            success, error = self.mount_manager.unmount_share(
+                action.share["share"], mount_point=action.mount_point
+            )
+            if success:
+                unmounted.append(action.share)
+            else:
+                errors.append(f"Failed to unmount {action.share['share']}: {error}")
+
+        mounted = []
+        to_mount = [action.share for action in actions if action.kind == "mount"]
+        if to_mount:
+            mounted, mount_errors = self.mount_manager.mount_all(to_mount, hostname, port)
+            errors.extend(mount_errors)
+        return mounted, unmounted, errors
+
+
+def format_plan(actions):
+    if not actions:
+        return "Nothing to do, all shares are in the desired state"
+    return "\n".join(
+        f"{action.kind:8} {action.share['share']} at {action.mount_point} ({action.reason})"
+        for action in actions
+    )
@@ -0,0 +1,195 @@
+# File: src/share_io.py
+import csv
+import json
+import os
+import logging
+
+from src.mount_profiles import PROFILES, DEFAULT_PROFILE
+
+logger = logging.getLogger('SMBManager')
+
+SHARE_FIELDS = ["username", "share", "mount_point", "auto_mount", "readonly", "profile"]
+TRUE_VALUES = {"1", "true", "yes", "y", "on"}
+FALSE_VALUES = {"0", "false", "no", "n", "off", ""}
+
+
+def get_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".csv", ".json"):
+        return ext[1:]
+    raise ValueError(f"Unsupported file type '{ext}', use .csv or .json")
+
+
+def normalize_share(share):
+    """Fill in the defaults the app assumes for missing share fields"""
+    return {
+        "username": share["username"],
+        "share": share["share"],
+        "mount_point": share.get("mount_point") or f"/Volumes/{os.path.basename(share['share'])}",
+        "auto_mount": share.get("auto_mount", True),
+        "readonly": share.get("readonly", False),
+        "profile": share.get("profile") or DEFAULT_PROFILE
+    }
+
+
+def export_shares(shares, path):
+    """Write share definitions (never passwords) to a CSV or JSON file"""
+    rows = [normalize_share(share) for share in shares]
+    if get_format(path) == "json":
+        with open(path, 'w') as f:
+            json.dump({"shares": rows}, f, indent=2)
+    else:
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=SHARE_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    logger.info(f"Exported {len(rows)} shares to {path}")
+    return len(rows)
+
+
+def read_share_file(path):
+    """Read raw share records from a CSV or JSON file"""
+    if get_format(path) == "json":
+        with open(path, 'r') as f:
+            data = json.load(f)
+        records = data.get("shares", []) if isinstance(data, dict) else data
+        if not isinstance(records, list):
+            raise ValueError("JSON import must be a list of shares or an object with a 'shares' list")
+        return records
+    with open(path, 'r', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def parse_bool(value, default):
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return default if text == "" else False
+    raise ValueError(f"invalid boolean '{value}'")
+
+
+def validate_shares(records):
+    """Validate raw records, returning (shares, passwords, errors)
+
+    Shares only carry the fields the record sets (a blank cell counts as
+    unset); diff_shares fills in the rest. passwords maps (username, share)
+    to a password for rows that carry one. Nothing is applied if errors
+    is non-empty.
+    """
+    shares = []
+    passwords = {}
+    errors = []
+    seen = set()
+    for line, record in enumerate(records, 1):
+        if not isinstance(record, dict):
+            errors.append(f"Row {line}: expected an object")
+            continue
+        username = str(record.get("username") or "").strip()
+        share_path = str(record.get("share") or "").strip()
+        if not username or not share_path:
+            errors.append(f"Row {line}: username and share are required")
+            continue
+        if not share_path.startswith("/"):
+            share_path = f"/{share_path}"
+        key = (username, share_path)
+        if key in seen:
+            errors.append(f"Row {line}: duplicate share {share_path} for {username}")
+            continue
+        seen.add(key)
+        share = {"username": username, "share": share_path}
+        try:
+            for field in ("auto_mount", "readonly"):
+                value = parse_bool(record.get(field), None)
+                if value is not None:
+                    share[field] = value
+        except ValueError as e:
+            errors.append(f"Row {line}: {e}")
+            continue
+        profile = str(record.get("profile") or "").strip()
+        if profile and profile not in PROFILES:
+            errors.append(f"Row {line}: unknown profile '{profile}', use one of {', '.join(PROFILES)}")
+            continue
+        if profile:
+            share["profile"] = profile
+        mount_point = str(record.get("mount_point") or "").strip()
+        if mount_point:
+            share["mount_point"] = mount_point
+        shares.append(share)
+        if record.get("password"):
+            passwords[key] = str(record["password"])
+    return shares, passwords, errors
+
+
+def diff_shares(current, incoming):
+    """Compare incoming shares with the current ones
+
+    Returns a dict with "added", "changed" (list of (old, new)) and "unchanged".
+    Fields an incoming share leaves out keep the existing share's value,
+    and only new shares get the defaults. Shares that are not in the
+    import are left alone.
+    """
+    existing = {(s["username"], s["share"]): normalize_share(s) for s in current}
+    diff = {"added": [], "changed": [], "unchanged": []}
+    for share in incoming:
+        old = existing.get((share["username"], share["share"]))
+        if old is None:
+            diff["added"].append(normalize_share(share))
+            continue
+        share = {**old, **share}
+        if any(old.get(field) != share.get(field) for field in SHARE_FIELDS):
+            diff["changed"].append((old, share))
+        else:
+            diff["unchanged"].append(share)
+    return diff
+
+
+def format_diff(diff, passwords=None):
+    """Human readable summary of a diff, used for dry runs"""
+    lines = [
+        f"{len(diff['added'])} to add, {len(diff['changed'])} to update, "
+        f"{len(diff['unchanged'])} unchanged"
+    ]
+    if passwords:
+        lines.append(f"{len(passwords)} password{'s' if len(passwords) != 1 else ''} to store")
+    for share in diff["added"]:
+        lines.append(f"+ {share['username']}@{share['share']} -> {share['mount_point']}")
+    for old, new in diff["changed"]:
+        changes = ", ".join(
+            f"{field}: {old.get(field)} -> {new.get(field)}"
+            for field in SHARE_FIELDS if old.get(field) != new.get(field)
+        )
+        lines.append(f"~ {new['username']}@{new['share']} ({changes})")
+    return "\n".join(lines)
+
+
+def apply_diff(config, diff):
+    """Return a new config with the diff merged into its shares list"""
+    updated = {(new["username"], new["share"]): new for _, new in diff["changed"]}
+    shares = []
+    for share in config.get("shares", []):
+        new = updated.get((share["username"], share["share"]))
+        shares.append({**share, **new} if new else share)
+    shares.extend(diff["added"])
+    return {**config, "shares": shares}
+
+
+def import_shares(config_manager, path, dry_run=False):
+    """Validate a share file, store its passwords and write the config once
+
+    Returns (diff, passwords, errors). Nothing is written when there are
+    validation errors or when dry_run is set.
+    """
+    shares, passwords, errors = validate_shares(read_share_file(path))
+    config = config_manager.load_config()
+    diff = diff_shares(config.get("shares", []), shares)
+    if errors or dry_run:
+        return diff, passwords, errors
+    errors = config_manager.store_share_passwords(passwords)
+    config_manager.save_config(apply_diff(config, diff))
+    logger.info(f"Imported {len(diff['added'])} new and {len(diff['changed'])} updated shares from {path}")
+    return diff, passwords, errors
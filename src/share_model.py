@@ -0,0 +1,201 @@
+# File: src/share_model.py
+import hashlib
+import os
+import logging
+
+from src.mount_profiles import DEFAULT_PROFILE
+
+logger = logging.getLogger('SMBManager')
+
+
+def default_mount_point(share_path):
+    return f"/Volumes/{os.path.basename(share_path.rstrip('/'))}"
+
+
+def stable_id(username, share_path):
+    """ID for a share that doesn't have one yet
+
+    Derived from the key so every process loading the same config agrees
+    on it; once saved it stays with the share across renames.
+    """
+    return hashlib.sha1(f"{username}\0{share_path}".encode()).hexdigest()[:12]
+
+
+class Share:
+    """One configured share
+
+    Fields the model indexes or the app reads often are slots; anything
+    else (mirror, idle settings, ...) lives in extra. Supports share["key"]
+    and share.get() so code written against config dicts keeps working.
+    """
+
+    __slots__ = ("id", "username", "share", "mount_point", "auto_mount", "readonly", "profile",
+                 "hostname", "extra")
+    FIELDS = ("username", "share", "mount_point", "auto_mount", "readonly", "profile")
+
+    def __init__(self, id, username, share, mount_point=None, auto_mount=True, readonly=False,
+                 profile=DEFAULT_PROFILE, hostname=None, extra=None):
+        self.id = id
+        self.username = username
+        self.share = share
+        self.mount_point = mount_point or default_mount_point(share)
+        self.auto_mount = auto_mount
+        self.readonly = readonly
+        self.profile = profile or DEFAULT_PROFILE
+        # Server of this share when it isn't the configured default
+        self.hostname = hostname
+        self.extra = extra or {}
+
+    @classmethod
+    def from_dict(cls, data):
+        extra = {k: v for k, v in data.items() if k not in cls.FIELDS and k not in ("id", "hostname")}
+        return cls(
+            data.get("id") or stable_id(data["username"], data["share"]),
+            data["username"], data["share"], data.get("mount_point"),
+            data.get("auto_mount", True), data.get("readonly", False),
+            data.get("profile"), data.get("hostname"), extra
+        )
+
+    def to_dict(self):
+        data = {"id": self.id}
+        data.update((field, getattr(self, field)) for field in self.FIELDS)
+        if self.hostname:
+            data["hostname"] = self.hostname
+        data.update(self.extra)
+        return data
+
+    @property
+    def key(self):
+        return (self.username, self.share)
+
+    def __getitem__(self, name):
+        if name in self.__slots__ and name != "extra":
+            value = getattr(self, name)
+            if value is None:
+                raise KeyError(name)
+            return value
+        return self.extra[name]
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __repr__(self):
+        return f"Share({self.id}, {self.username}, {self.share})"
+
+
+class ShareModel:
+    """The configured shares with O(1) lookups
+
+    Indexed by id, by (username, share), by share path, by server and by
+    mount point. Iteration follows config order.
+    """
+
+    def __init__(self, shares=(), default_server=""):
+        self.default_server = default_server
+        self.by_id = {}
+        self.by_key = {}
+        self.by_path = {}
+        self.by_server = {}
+        self.by_mount_point = {}
+        for data in shares:
+            share = data if isinstance(data, Share) else Share.from_dict(data)
+            if share.key in self.by_key:
+                logger.warning(f"Ignoring duplicate share {share.share} for {share.username}")
+                continue
+            if share.id in self.by_id:
+                # Copied config entry; the copy needs its own identity
+                share.id = stable_id(share.username, share.share)
+            self.by_id[share.id] = share
+            self._index(share)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.get("shares", []), config.get("hostname", ""))
+
+    def _server(self, share):
+        return share.hostname or self.default_server
+
+    def _index(self, share):
+        """Add a share to every index except by_id"""
+        self.by_key[share.key] = share
+        self.by_path.setdefault(share.share, {})[share.id] = share
+        self.by_server.setdefault(self._server(share), {})[share.id] = share
+        self.by_mount_point[share.mount_point] = share
+
+    def _unindex(self, share):
+        del self.by_key[share.key]
+        self.by_path[share.share].pop(share.id, None)
+        if not self.by_path[share.share]:
+            del self.by_path[share.share]
+        server = self._server(share)
+        self.by_server[server].pop(share.id, None)
+        if not self.by_server[server]:
+            del self.by_server[server]
+        if self.by_mount_point.get(share.mount_point) is share:
+            del self.by_mount_point[share.mount_point]
+
+    def __iter__(self):
+        return iter(list(self.by_id.values()))
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def get(self, share_id):
+        return self.by_id.get(share_id)
+
+    def find(self, username, share_path):
+        return self.by_key.get((username, share_path))
+
+    def with_path(self, share_path):
+        return list(self.by_path.get(share_path, {}).values())
+
+    def on_server(self, server):
+        return list(self.by_server.get(server, {}).values())
+
+    def at_mount_point(self, mount_point):
+        return self.by_mount_point.get(mount_point)
+
+    def add(self, data):
+        """Add a share from a dict; raises ValueError if (username, share) exists"""
+        share = Share.from_dict(data)
+        if share.key in self.by_key:
+            raise ValueError(f"{share.share} is already configured for {share.username}")
+        while share.id in self.by_id:
+            share.id = hashlib.sha1(share.id.encode()).hexdigest()[:12]
+        self.by_id[share.id] = share
+        self._index(share)
+        return share
+
+    def update(self, share_id, **fields):
+        """Change fields of a share, keeping its id; extra fields set to None are removed"""
+        share = self.by_id[share_id]
+        new_key = (fields.get("username", share.username), fields.get("share", share.share))
+        if new_key != share.key and new_key in self.by_key:
+            raise ValueError(f"{new_key[1]} is already configured for {new_key[0]}")
+        self._unindex(share)
+        for name, value in fields.items():
+            if name in Share.__slots__ and name not in ("id", "extra"):
+                setattr(share, name, value)
+            elif value is None:
+                share.extra.pop(name, None)
+            else:
+                share.extra[name] = value
+        if not share.mount_point:
+            share.mount_point = default_mount_point(share.share)
+        self._index(share)
+        return share
+
+    def remove(self, share_id):
+        share = self.by_id.pop(share_id, None)
+        if share:
+            self._unindex(share)
+        return share
+
+    def to_list(self):
+        return [share.to_dict() for share in self.by_id.values()]
@@ -0,0 +1,243 @@
+# File: src/smb_tuning.py
+import difflib
+import os
+import sys
+import time
+import logging
+
+logger = logging.getLogger('SMBManager')
+
+NSMB_CONF = "~/Library/Preferences/nsmb.conf"
+BACKUP_SUFFIX = ".smbmanager-backup"
+# Marks a backup taken when there was no nsmb.conf, so restore deletes it
+ABSENT_MARKER = "# smbmanager: no nsmb.conf existed\n"
+
+# "darwin" keys go to the [default] section of nsmb.conf; "linux" options
+# become cifs_default_options in the config.
+PRESETS = {
+    "fast_lan": {
+        "description": "Wired or fast Wi-Fi to a trusted NAS: no client-required signing, SMB2/3, multichannel",
+        "darwin": {
+            "signing_required": "no",
+            "protocol_vers_map": "6",
+            "mc_on": "yes",
+            "mc_prefer_wired": "yes",
+            "port445": "no_netbios",
+            "dir_cache_max_cnt": "4096",
+        },
+        "linux": ["vers=3.1.1", "cache=loose", "rsize=4194304", "wsize=4194304", "multichannel", "max_channels=4"],
+    },
+    "large_directories": {
+        "description": "Folders with many thousands of entries: bigger directory cache, no change notifications",
+        "darwin": {
+            "dir_cache_max_cnt": "16384",
+            "dir_cache_max": "60",
+            "notify_off": "yes",
+            "streams": "no",
+        },
+        "linux": ["actimeo=30", "nostrictsync"],
+    },
+    "wan": {
+        "description": "Remote or tunnelled servers: SMB3 only, no multichannel, soft mounts",
+        "darwin": {
+            "protocol_vers_map": "4",
+            "mc_on": "no",
+            "soft": "yes",
+            "dir_cache_max": "30",
+        },
+        "linux": ["vers=3.1.1", "soft", "echo_interval=10", "actimeo=10"],
+    },
+    "system_defaults": {
+        "description": "Remove every setting the presets manage",
+        "darwin": {},
+        "linux": [],
+    },
+}
+
+MANAGED_KEYS = sorted({key for preset in PRESETS.values() for key in preset["darwin"]})
+
+
+GENERATED_HEADER = "# Generated by SMB Manager; previous versions are kept as nsmb.conf" + BACKUP_SUFFIX + ".*"
+
+
+def parse_nsmb(text):
+    """Parse nsmb.conf into [(section, [(key, value)])] keeping order, unknown keys and comments
+
+    Comment lines are kept as (None, line) in the section they appear in;
+    comments before the first section go in a section named None. An
+    inline comment stays part of the value it follows.
+    """
+    sections = []
+    current = None
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line == GENERATED_HEADER:
+            continue
+        if line.startswith("#") or line.startswith(";"):
+            if current is None:
+                current = (None, [])
+                sections.append(current)
+            current[1].append((None, line))
+        elif line.startswith("[") and line.endswith("]"):
+            current = (line[1:-1].strip(), [])
+            sections.append(current)
+        elif "=" in line:
+            if current is None or current[0] is None:
+                current = ("default", [])
+                sections.append(current)
+            key, value = line.split("=", 1)
+            current[1].append((key.strip(), value.strip()))
+    return sections
+
+
+def render_nsmb(sections):
+    lines = [GENERATED_HEADER]
+    for name, entries in sections:
+        if name is not None:
+            lines.append(f"[{name}]")
+        lines.extend(value if key is None else f"{key}={value}" for key, value in entries)
+        lines.append("")
+    return "\n".join(lines)
+
+
+def apply_preset(sections, preset):
+    """Return new sections with the preset's keys set in [default]
+
+    Managed keys the preset doesn't set are removed, so switching presets
+    doesn't leave settings from the previous one behind.
+    """
+    settings = PRESETS[preset]["darwin"]
+    sections = [(name, list(entries)) for name, entries in sections]
+    default = next((entries for name, entries in sections if name == "default"), None)
+    if default is None:
+        default = []
+        # After any leading comments
+        sections.insert(1 if sections and sections[0][0] is None else 0, ("default", default))
+    kept = [(key, value) for key, value in default if key not in MANAGED_KEYS]
+    default[:] = kept + list(settings.items())
+    return [(name, entries) for name, entries in sections if entries or name != "default"]
+
+
+def settings_diff(current, proposed, name):
+    """Unified diff of two key=value listings"""
+    return "".join(difflib.unified_diff(
+        [line + "\n" for line in current], [line + "\n" for line in proposed],
+        fromfile=f"{name} (current)", tofile=f"{name} (proposed)"
+    ))
+
+
+class NsmbTuner:
+    """Creates and edits the per-user nsmb.conf from presets, with backups"""
+
+    def __init__(self, path=NSMB_CONF):
+        self.path = os.path.expanduser(path)
+
+    def read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def plan(self, preset):
+        """Return (current_text, proposed_text, diff)"""
+        if preset not in PRESETS:
+            raise ValueError(f"Unknown preset '{preset}', use one of {', '.join(PRESETS)}")
+        current = self.read()
+        proposed = render_nsmb(apply_preset(parse_nsmb(current or ""), preset))
+        diff = "".join(difflib.unified_diff(
+            (current or "").splitlines(keepends=True), proposed.splitlines(keepends=True),
+            fromfile=f"{self.path} (current)", tofile=f"{self.path} (proposed)"
+        ))
+        return current, proposed, diff
+
+    def backups(self):
+        """Backup files, newest first"""
+        directory, name = os.path.split(self.path)
+        prefix = name + BACKUP_SUFFIX + "."
+        try:
+            found = [f for f in os.listdir(directory) if f.startswith(prefix)]
+        except FileNotFoundError:
+            return []
+        return [os.path.join(directory, f) for f in sorted(found, reverse=True)]
+
+    def apply(self, preset):
+        """Back up the current file and write the preset; returns (changed, backup_path)"""
+        current, proposed, _ = self.plan(preset)
+        if current == proposed:
+            return False, None
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        now = time.time()
+        # Microseconds keep backups taken within one second distinct and ordered
+        backup = f"{self.path}{BACKUP_SUFFIX}.{time.strftime('%Y%m%d%H%M%S', time.localtime(now))}{int(now * 1e6) % 1000000:06d}"
+        with open(backup, 'w') as f:
+            f.write(ABSENT_MARKER if current is None else current)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(proposed)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Applied SMB tuning preset {preset} to {self.path} (backup {backup})")
+        return True, backup
+
+    def restore(self):
+        """Put back the newest backup and remove it; returns (success, error)"""
+        backups = self.backups()
+        if not backups:
+            return False, "No backup to restore"
+        with open(backups[0], 'r') as f:
+            previous = f.read()
+        if previous == ABSENT_MARKER:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        else:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(previous)
+            os.replace(tmp_path, self.path)
+        os.remove(backups[0])
+        logger.info(f"Restored {self.path} from {backups[0]}")
+        return True, ""
+
+
+class CifsTuner:
+    """Default mount.cifs options kept in the config as cifs_default_options
+
+    The list from before the first preset is kept in
+    cifs_default_options_backup for restore.
+    """
+
+    def __init__(self, config_manager):
+        self.config_manager = config_manager
+
+    def plan(self, preset):
+        if preset not in PRESETS:
+            raise ValueError(f"Unknown preset '{preset}', use one of {', '.join(PRESETS)}")
+        current = self.config_manager.load_config().get("cifs_default_options", [])
+        proposed = list(PRESETS[preset]["linux"])
+        return current, proposed, settings_diff(current, proposed, "cifs_default_options")
+
+    def apply(self, preset):
+        current, proposed, _ = self.plan(preset)
+        if current == proposed:
+            return False, None
+        config = self.config_manager.load_config()
+        # Keep the options from before the first preset so restore goes back to them
+        config.setdefault("cifs_default_options_backup", current)
+        config["cifs_default_options"] = proposed
+        self.config_manager.save_config(config)
+        logger.info(f"Applied SMB tuning preset {preset} to cifs_default_options")
+        return True, "cifs_default_options_backup"
+
+    def restore(self):
+        config = self.config_manager.load_config()
+        if "cifs_default_options_backup" not in config:
+            return False, "No backup to restore"
+        config["cifs_default_options"] = config.pop("cifs_default_options_backup")
+        self.config_manager.save_config(config)
+        return True, ""
+
+
+def get_tuner(config_manager, platform=None):
+    if (platform or sys.platform) == "darwin":
+        return NsmbTuner()
+    return CifsTuner(config_manager)
@@ -0,0 +1,212 @@
+# File: src/speed_test.py
+import os
+import fcntl
+import shutil
+import tempfile
+import time
+import logging
+
+logger = logging.getLogger('SMBManager')
+
+DEFAULT_BLOCK_SIZES = (64 * 1024, 1024 * 1024)
+DEFAULT_FILE_SIZE = 64 * 1024 * 1024
+DEFAULT_SMALL_FILES = 200
+DEFAULT_LISTING_ENTRIES = 500
+
+
+class SpeedTest:
+    """Measures throughput and metadata latency of a directory (usually a mount)
+
+    All test files are created in a temporary directory under path and
+    removed afterwards, even when the test fails or is cancelled.
+    """
+
+    def __init__(self, path, block_sizes=DEFAULT_BLOCK_SIZES, file_size=DEFAULT_FILE_SIZE,
+                 small_files=DEFAULT_SMALL_FILES, listing_entries=DEFAULT_LISTING_ENTRIES,
+                 progress=None):
+        self.path = path
+        self.block_sizes = list(block_sizes)
+        self.file_size = file_size
+        self.small_files = small_files
+        self.listing_entries = listing_entries
+        self.progress = progress or (lambda message: None)
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise RuntimeError("Speed test cancelled")
+
+    def run(self):
+        """Run all measurements and return a results dict"""
+        if not os.path.isdir(self.path):
+            raise ValueError(f"{self.path} is not a directory")
+        work_dir = tempfile.mkdtemp(prefix=".smbmanager-speedtest-", dir=self.path)
+        try:
+            results = {"path": self.path, "started_at": time.time(), "sequential": []}
+            for block_size in self.block_sizes:
+                self.progress(f"Sequential write/read with {format_size(block_size)} blocks")
+                results["sequential"].append(self.measure_sequential(work_dir, block_size))
+            self.progress("Small file create/stat/delete")
+            results["small_files"] = self.measure_small_files(work_dir)
+            self.progress("Directory listing")
+            results["listing"] = self.measure_listing(work_dir)
+            return results
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def measure_sequential(self, work_dir, block_size):
+        file_path = os.path.join(work_dir, "sequential.bin")
+        block = os.urandom(block_size)
+        blocks = max(1, self.file_size // block_size)
+
+        start = time.perf_counter()
+        with open(file_path, 'wb', buffering=0) as f:
+            for _ in range(blocks):
+                self.check_cancelled()
+                f.write(block)
+            os.fsync(f.fileno())
+        write_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        read_bytes = 0
+        # Unbuffered, uncached reads so each request goes to the server
+        with open(file_path, 'rb', buffering=0) as f:
+            drop_cache(f.fileno())
+            while True:
+                self.check_cancelled()
+                data = f.read(block_size)
+                if not data:
+                    break
+                read_bytes += len(data)
+        read_time = time.perf_counter() - start
+        os.remove(file_path)
+
+        total = blocks * block_size
+        return {
+            "block_size": block_size,
+            "bytes": total,
+            "write_mbps": total / write_time / 1e6 if write_time else None,
+            "read_mbps": read_bytes / read_time / 1e6 if read_time else None
+        }
+
+    def measure_small_files(self, work_dir):
+        small_dir = os.path.join(work_dir, "small")
+        os.mkdir(small_dir)
+        paths = [os.path.join(small_dir, f"f{i:05d}") for i in range(self.small_files)]
+        payload = b"x" * 4096
+        timings = {}
+
+        start = time.perf_counter()
+        for path in paths:
+            self.check_cancelled()
+            with open(path, 'wb') as f:
+                f.write(payload)
+        timings["create"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for path in paths:
+            self.check_cancelled()
+            os.stat(path)
+        timings["stat"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for path in paths:
+            self.check_cancelled()
+            os.remove(path)
+        timings["delete"] = time.perf_counter() - start
+
+        count = len(paths)
+        return {
+            "files": count,
+            **{f"{op}_per_sec": count / seconds if seconds else None for op, seconds in timings.items()}
+        }
+
+    def measure_listing(self, work_dir):
+        list_dir = os.path.join(work_dir, "listing")
+        os.mkdir(list_dir)
+        for i in range(self.listing_entries):
+            self.check_cancelled()
+            open(os.path.join(list_dir, f"e{i:05d}"), 'wb').close()
+
+        samples = []
+        for _ in range(3):
+            start = time.perf_counter()
+            with os.scandir(list_dir) as entries:
+                count = sum(1 for _ in entries)
+            samples.append(time.perf_counter() - start)
+        return {"entries": count, "latency_ms": min(samples) * 1000}
+
+
+def drop_cache(fd):
+    """Keep reads of a file we just wrote from being served by the page cache"""
+    try:
+        if hasattr(fcntl, "F_NOCACHE"):
+            fcntl.fcntl(fd, fcntl.F_NOCACHE, 1)
+        elif hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    except OSError:
+        pass
+
+
+def parse_size(text):
+    """Parse sizes like 4096, 64K or 1M (binary units)"""
+    text = str(text).strip().upper().rstrip("B").rstrip("I")
+    multipliers = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if text and text[-1] in multipliers:
+        return int(float(text[:-1]) * multipliers[text[-1]])
+    return int(text)
+
+
+def format_size(size):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:g} {unit}" if unit == "B" else f"{size:.0f} {unit}"
+        size /= 1024
+
+
+def format_results(results):
+    lines = [f"Speed test of {results['path']}"]
+    for entry in results["sequential"]:
+        lines.append(
+            f"  {format_size(entry['block_size']):>8} blocks: "
+            f"write {entry['write_mbps']:.1f} MB/s, read {entry['read_mbps']:.1f} MB/s"
+        )
+    small = results["small_files"]
+    lines.append(
+        f"  {small['files']} small files: create {small['create_per_sec']:.0f}/s, "
+        f"stat {small['stat_per_sec']:.0f}/s, delete {small['delete_per_sec']:.0f}/s"
+    )
+    listing = results["listing"]
+    lines.append(f"  Listing {listing['entries']} entries: {listing['latency_ms']:.1f} ms")
+    return "\n".join(lines)
+
+
+def compare_results(current, previous):
+    """Summarise the change between two runs as percentage lines"""
+    def change(new, old):
+        if not new or not old:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.0f}%"
+
+    lines = [f"Compared with run {previous.get('label') or time.strftime('%Y-%m-%d %H:%M', time.localtime(previous['started_at']))}:"]
+    old_sequential = {entry["block_size"]: entry for entry in previous.get("sequential", [])}
+    for entry in current["sequential"]:
+        old = old_sequential.get(entry["block_size"])
+        if old:
+            lines.append(
+                f"  {format_size(entry['block_size']):>8} blocks: write {change(entry['write_mbps'], old['write_mbps'])}, "
+                f"read {change(entry['read_mbps'], old['read_mbps'])}"
+            )
+    old_small = previous.get("small_files", {})
+    small = current["small_files"]
+    lines.append(
+        f"  small files: create {change(small['create_per_sec'], old_small.get('create_per_sec'))}, "
+        f"stat {change(small['stat_per_sec'], old_small.get('stat_per_sec'))}, "
+        f"delete {change(small['delete_per_sec'], old_small.get('delete_per_sec'))}"
+    )
+    old_latency = previous.get("listing", {}).get("latency_ms")
+    lines.append(f"  listing latency: {change(current['listing']['latency_ms'], old_latency)}")
+    return "\n".join(lines)
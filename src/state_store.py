@@ -0,0 +1,389 @@
+# File: src/state_store.py
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+from src.share_model import stable_id
+
+logger = logging.getLogger('SMBManager')
+
+DEFAULT_DB_FILE = "~/.smb_manager_state.db"
+LEGACY_CONFIG_FILE = "~/.smb_manager_config.json"
+
+DEFAULT_SETTINGS = {
+    "hostname": "",
+    "port": "8445",
+    "autostart": False,
+    "use_tunnel": True
+}
+
+# Share keys that have their own column; anything else is kept in "extra"
+SHARE_COLUMNS = ("id", "username", "share", "mount_point", "auto_mount", "readonly")
+# ROW_NUMBER() and friends; older SQLite gets the history queries done in Python
+WINDOW_FUNCTIONS = sqlite3.sqlite_version_info >= (3, 25, 0)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS servers (
+    id INTEGER PRIMARY KEY,
+    hostname TEXT NOT NULL,
+    port TEXT NOT NULL,
+    UNIQUE (hostname, port)
+);
+CREATE TABLE IF NOT EXISTS shares (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    share TEXT NOT NULL,
+    mount_point TEXT,
+    auto_mount INTEGER NOT NULL DEFAULT 1,
+    readonly INTEGER NOT NULL DEFAULT 0,
+    extra TEXT NOT NULL DEFAULT '{}',
+    UNIQUE (username, share)
+);
+CREATE TABLE IF NOT EXISTS mount_attempts (
+    id INTEGER PRIMARY KEY,
+    share_id INTEGER REFERENCES shares(id) ON DELETE CASCADE,
+    server_id INTEGER REFERENCES servers(id),
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_server ON mount_attempts (server_id, outcome, started_at);
+CREATE INDEX IF NOT EXISTS idx_attempts_share ON mount_attempts (share_id, outcome, duration);
+CREATE TABLE IF NOT EXISTS mount_phases (
+    attempt_id INTEGER NOT NULL REFERENCES mount_attempts(id) ON DELETE CASCADE,
+    phase TEXT NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_phases_attempt ON mount_phases (attempt_id);
+CREATE TABLE IF NOT EXISTS speed_tests (
+    id INTEGER PRIMARY KEY,
+    share_id INTEGER REFERENCES shares(id) ON DELETE CASCADE,
+    path TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    label TEXT,
+    results TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_speed_tests_share ON speed_tests (share_id, started_at);
+CREATE TABLE IF NOT EXISTS route_choices (
+    network TEXT NOT NULL,
+    hostname TEXT NOT NULL,
+    route TEXT NOT NULL,
+    chosen_at REAL NOT NULL,
+    PRIMARY KEY (network, hostname)
+);
+"""
+
+
+class StateStore:
+    """SQLite store for settings, shares and mount history
+
+    Uses WAL mode and one connection per thread so the menubar and GUI
+    processes (and their worker threads) can read and write concurrently.
+    """
+
+    def __init__(self, db_file=DEFAULT_DB_FILE, legacy_config_file=LEGACY_CONFIG_FILE):
+        self.db_file = os.path.expanduser(db_file)
+        self.legacy_config_file = os.path.expanduser(legacy_config_file)
+        self.local = threading.local()
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+            self.migrate_share_uids(conn)
+        self.migrate_legacy_config()
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self.local.conn = conn
+        return conn
+
+    def migrate_share_uids(self, conn):
+        """Give every share row the ShareModel id it is saved under (uid)
+
+        Rows are matched on it when saving, so a renamed share keeps its
+        row and therefore its mount history.
+        """
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(shares)")}
+        if "uid" not in columns:
+            conn.execute("ALTER TABLE shares ADD COLUMN uid TEXT")
+        for row in conn.execute("SELECT id, username, share, extra FROM shares WHERE uid IS NULL").fetchall():
+            extra = json.loads(row["extra"])
+            uid = extra.pop("id", None) or stable_id(row["username"], row["share"])
+            conn.execute("UPDATE shares SET uid = ?, extra = ? WHERE id = ?", (uid, json.dumps(extra), row["id"]))
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_shares_uid ON shares (uid)")
+
+    def migrate_legacy_config(self):
+        """Import ~/.smb_manager_config.json once, on first use of the store"""
+        conn = self.connection()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_migrated'").fetchone():
+            return
+        config = None
+        if os.path.exists(self.legacy_config_file):
+            try:
+                with open(self.legacy_config_file, 'r') as f:
+                    config = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not read legacy config for migration: {str(e)}")
+        with conn:
+            # Another process may have migrated while we were reading
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_migrated'").fetchone():
+                return
+            if config:
+                self._write_config(conn, config)
+                logger.info(f"Migrated {len(config.get('shares', []))} shares from {self.legacy_config_file}")
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('legacy_migrated', ?)", (str(time.time()),)
+            )
+
+    # Settings and shares
+    def load_config(self):
+        """Return the config in the same dict shape the JSON file used"""
+        conn = self.connection()
+        config = dict(DEFAULT_SETTINGS)
+        for row in conn.execute("SELECT key, value FROM settings"):
+            config[row["key"]] = json.loads(row["value"])
+        config["shares"] = []
+        for row in conn.execute("SELECT * FROM shares ORDER BY position"):
+            share = json.loads(row["extra"])
+            share.update({
+                "id": row["uid"],
+                "username": row["username"],
+                "share": row["share"],
+                "mount_point": row["mount_point"],
+                "auto_mount": bool(row["auto_mount"]),
+                "readonly": bool(row["readonly"])
+            })
+            if share["mount_point"] is None:
+                del share["mount_point"]
+            config["shares"].append(share)
+        return config
+
+    def save_config(self, config):
+        with self.connection() as conn:
+            self._write_config(conn, config)
+
+    def _write_config(self, conn, config):
+        settings = {key: value for key, value in config.items() if key != "shares"}
+        conn.execute("DELETE FROM settings")
+        conn.executemany(
+            "INSERT INTO settings (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in settings.items()]
+        )
+        if settings.get("hostname"):
+            self._server_id(conn, settings["hostname"], settings.get("port", "8445"))
+
+        # Rows are matched on the share's id, so a renamed share keeps its row and mount history
+        shares = []
+        keep = set()
+        for share in config.get("shares", []):
+            uid = share.get("id")
+            if not uid or uid in keep:
+                uid = stable_id(share["username"], share["share"])
+            shares.append((uid, share))
+            keep.add(uid)
+        existing = {row["uid"]: (row["username"], row["share"])
+                    for row in conn.execute("SELECT uid, username, share FROM shares")}
+        conn.executemany("DELETE FROM shares WHERE uid = ?", [(uid,) for uid in existing if uid not in keep])
+        # Park renamed rows on a unique name first, so swapping two names can't collide
+        conn.executemany(
+            "UPDATE shares SET share = ? WHERE uid = ?",
+            [(f"\0{uid}", uid) for uid, share in shares
+             if uid in existing and existing[uid] != (share["username"], share["share"])]
+        )
+        for position, (uid, share) in enumerate(shares):
+            extra = {key: value for key, value in share.items() if key not in SHARE_COLUMNS}
+            values = (position, share["username"], share["share"], share.get("mount_point"),
+                      int(share.get("auto_mount", True)), int(share.get("readonly", False)),
+                      json.dumps(extra), uid)
+            if uid in existing:
+                conn.execute(
+                    """UPDATE shares SET position = ?, username = ?, share = ?, mount_point = ?,
+                              auto_mount = ?, readonly = ?, extra = ?
+                       WHERE uid = ?""", values)
+            else:
+                conn.execute(
+                    """INSERT INTO shares (position, username, share, mount_point, auto_mount, readonly, extra, uid)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", values)
+
+    def _server_id(self, conn, hostname, port):
+        conn.execute(
+            "INSERT OR IGNORE INTO servers (hostname, port) VALUES (?, ?)", (hostname, str(port))
+        )
+        return conn.execute(
+            "SELECT id FROM servers WHERE hostname = ? AND port = ?", (hostname, str(port))
+        ).fetchone()["id"]
+
+    def _share_id(self, conn, username, share):
+        row = conn.execute(
+            "SELECT id FROM shares WHERE username = ? AND share = ?", (username, share)
+        ).fetchone()
+        return row["id"] if row else None
+
+    # Mount history
+    def record_mount_attempt(self, hostname, port, username, share, outcome, duration,
+                             error=None, phases=None, started_at=None):
+        """Record one mount attempt with optional {phase: seconds} timings"""
+        with self.connection() as conn:
+            cursor = conn.execute(
+                """INSERT INTO mount_attempts (share_id, server_id, started_at, duration, outcome, error)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (self._share_id(conn, username, share), self._server_id(conn, hostname, port),
+                 started_at or time.time() - duration, duration, outcome, error)
+            )
+            attempt_id = cursor.lastrowid
+            if phases:
+                conn.executemany(
+                    "INSERT INTO mount_phases (attempt_id, phase, duration) VALUES (?, ?, ?)",
+                    [(attempt_id, phase, seconds) for phase, seconds in phases.items()]
+                )
+        return attempt_id
+
+    def record_speed_test(self, results, username=None, share=None, label=None):
+        """Store a speed test result, optionally tied to a configured share"""
+        with self.connection() as conn:
+            share_id = self._share_id(conn, username, share) if share else None
+            cursor = conn.execute(
+                "INSERT INTO speed_tests (share_id, path, started_at, label, results) VALUES (?, ?, ?, ?, ?)",
+                (share_id, results["path"], results["started_at"], label, json.dumps(results))
+            )
+        return cursor.lastrowid
+
+    def speed_tests(self, username=None, share=None, path=None, limit=20):
+        """Previous speed test results for a share (or a plain path), newest first"""
+        conn = self.connection()
+        if share:
+            rows = conn.execute(
+                """SELECT t.id, t.label, t.results FROM speed_tests t
+                   JOIN shares s ON s.id = t.share_id
+                   WHERE s.username = ? AND s.share = ?
+                   ORDER BY t.started_at DESC LIMIT ?""",
+                (username, share, limit)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT id, label, results FROM speed_tests WHERE path = ? ORDER BY started_at DESC LIMIT ?",
+                (path, limit)
+            ).fetchall()
+        return [{"id": row["id"], "label": row["label"], **json.loads(row["results"])} for row in rows]
+
+    def get_route_choice(self, network, hostname, max_age):
+        """The route chosen for a server on a network, if decided recently"""
+        row = self.connection().execute(
+            "SELECT route FROM route_choices WHERE network = ? AND hostname = ? AND chosen_at > ?",
+            (network, hostname, time.time() - max_age)
+        ).fetchone()
+        return row["route"] if row else None
+
+    def set_route_choice(self, network, hostname, route):
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO route_choices (network, hostname, route, chosen_at) VALUES (?, ?, ?, ?)",
+                (network, hostname, route, time.time())
+            )
+
+    def recent_failures(self, hostname, limit=100):
+        """Most recent failed attempts against a host, newest first"""
+        rows = self.connection().execute(
+            """SELECT a.started_at, a.duration, a.outcome, a.error, s.username, s.share, v.port
+               FROM mount_attempts a
+               JOIN servers v ON v.id = a.server_id
+               LEFT JOIN shares s ON s.id = a.share_id
+               WHERE v.hostname = ? AND a.outcome != 'success'
+               ORDER BY a.started_at DESC
+               LIMIT ?""",
+            (hostname, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def mount_time_percentile(self, percentile=0.95):
+        """Nearest-rank percentile of successful mount time per share
+
+        Returns {(username, share): seconds}.
+        """
+        if not WINDOW_FUNCTIONS:
+            durations = {}
+            for row in self.connection().execute(
+                    """SELECT s.username, s.share, a.duration FROM mount_attempts a
+                       JOIN shares s ON s.id = a.share_id
+                       WHERE a.outcome = 'success' ORDER BY a.duration"""):
+                durations.setdefault((row["username"], row["share"]), []).append(row["duration"])
+            return {key: values[max(1, math.ceil(percentile * len(values))) - 1]
+                    for key, values in durations.items()}
+        rows = self.connection().execute(
+            """WITH ranked AS (
+                   SELECT share_id, duration,
+                          ROW_NUMBER() OVER (PARTITION BY share_id ORDER BY duration) AS rank,
+                          COUNT(*) OVER (PARTITION BY share_id) AS total
+                   FROM mount_attempts
+                   WHERE outcome = 'success' AND share_id IS NOT NULL
+               )
+               SELECT s.username, s.share, r.duration
+               FROM ranked r JOIN shares s ON s.id = r.share_id
+               WHERE r.rank = MAX(1, CAST(? * r.total AS INTEGER)
+                                  + (? * r.total > CAST(? * r.total AS INTEGER)))""",
+            (percentile, percentile, percentile)
+        ).fetchall()
+        return {(row["username"], row["share"]): row["duration"] for row in rows}
+
+    def share_stats(self, window=50):
+        """Recent mount history per share for scheduling
+
+        Looks at the last `window` attempts of each share and returns
+        {(username, share): {"attempts", "failures", "durations"}} where
+        durations are the successful mount times, sorted ascending.
+        """
+        if WINDOW_FUNCTIONS:
+            rows = self.connection().execute(
+                """WITH recent AS (
+                       SELECT share_id, duration, outcome,
+                              ROW_NUMBER() OVER (PARTITION BY share_id ORDER BY started_at DESC) AS age
+                       FROM mount_attempts
+                       WHERE share_id IS NOT NULL
+                   )
+                   SELECT s.username, s.share, r.duration, r.outcome
+                   FROM recent r JOIN shares s ON s.id = r.share_id
+                   WHERE r.age <= ?""",
+                (window,)
+            ).fetchall()
+        else:
+            rows = []
+            counts = {}
+            for row in self.connection().execute(
+                    """SELECT a.share_id, s.username, s.share, a.duration, a.outcome
+                       FROM mount_attempts a JOIN shares s ON s.id = a.share_id
+                       ORDER BY a.started_at DESC"""):
+                counts[row["share_id"]] = counts.get(row["share_id"], 0) + 1
+                if counts[row["share_id"]] <= window:
+                    rows.append(row)
+        stats = {}
+        for row in rows:
+            entry = stats.setdefault(
+                (row["username"], row["share"]), {"attempts": 0, "failures": 0, "durations": []}
+            )
+            entry["attempts"] += 1
+            if row["outcome"] == "success":
+                entry["durations"].append(row["duration"])
+            else:
+                entry["failures"] += 1
+        for entry in stats.values():
+            entry["durations"].sort()
+        return stats
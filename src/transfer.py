@@ -0,0 +1,151 @@
+# File: src/transfer.py
+import os
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.fs_utils import scan_tree, file_hash, copy_file, DEFAULT_BUFFER_SIZE, PARTIAL_SUFFIX
+
+logger = logging.getLogger('SMBManager')
+
+DEFAULT_WORKERS = 8
+
+
+class ThroughputMeter:
+    """Bytes per second over a sliding window"""
+
+    def __init__(self, window=5.0):
+        self.window = window
+        self.samples = deque()
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def add(self, count):
+        now = time.monotonic()
+        with self.lock:
+            self.total += count
+            self.samples.append((now, count))
+            while self.samples and now - self.samples[0][0] > self.window:
+                self.samples.popleft()
+
+    def rate(self):
+        now = time.monotonic()
+        with self.lock:
+            while self.samples and now - self.samples[0][0] > self.window:
+                self.samples.popleft()
+            if not self.samples:
+                return 0.0
+            elapsed = max(now - self.samples[0][0], 0.001)
+            return sum(count for _, count in self.samples) / elapsed
+
+
+class BulkCopier:
+    """Copies a file or directory tree to or from a mount with a thread pool
+
+    Files that already exist at the destination with the same size and
+    mtime are skipped and partially copied files are resumed, so an
+    interrupted run can simply be started again.
+    """
+
+    def __init__(self, source, destination, workers=DEFAULT_WORKERS, buffer_size=DEFAULT_BUFFER_SIZE,
+                 verify=False, progress=None, progress_interval=0.5):
+        self.source = os.path.abspath(source)
+        self.destination = os.path.abspath(destination)
+        self.workers = workers
+        self.buffer_size = buffer_size
+        self.verify = verify
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.meter = ThroughputMeter()
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def plan(self):
+        """Return ([(source, target, size)], skipped_count, [folders that could not be listed])"""
+        if os.path.isfile(self.source):
+            target = self.destination
+            if os.path.isdir(target):
+                target = os.path.join(target, os.path.basename(self.source))
+            files = {"": (os.path.getsize(self.source), os.stat(self.source).st_mtime_ns)}
+            pairs = {"": (self.source, target)}
+            failed = []
+        else:
+            # Unreadable folders can't be copied; run() reports them as errors
+            files, failed = scan_tree(self.source, [""], self.workers)
+            pairs = {
+                rel_path: (os.path.join(self.source, rel_path), os.path.join(self.destination, rel_path))
+                for rel_path in files
+                if not rel_path.endswith(PARTIAL_SUFFIX)
+            }
+        jobs = []
+        skipped = 0
+        for rel_path, (source, target) in pairs.items():
+            size, mtime_ns = files[rel_path]
+            try:
+                stat = os.stat(target)
+                if stat.st_size == size and stat.st_mtime_ns == mtime_ns:
+                    skipped += 1
+                    continue
+            except FileNotFoundError:
+                pass
+            jobs.append((source, target, size))
+        return jobs, skipped, failed
+
+    def run(self):
+        """Copy everything; returns a summary dict"""
+        start = time.monotonic()
+        jobs, skipped, failed = self.plan()
+        summary = {
+            "files_total": len(jobs), "files_done": 0, "skipped": skipped,
+            "bytes_total": sum(size for _, _, size in jobs), "bytes_done": 0,
+            "errors": [f"{os.path.join(self.source, rel_dir)}: could not be listed, nothing in it was copied"
+                       for rel_dir in failed]
+        }
+        stop_reporting = threading.Event()
+        reporter = None
+        if self.progress:
+            reporter = threading.Thread(target=self._report, args=(summary, stop_reporting), daemon=True)
+            reporter.start()
+
+        def copy(source, target):
+            if self.cancelled:
+                raise RuntimeError("Transfer cancelled")
+            copy_file(source, target, self.buffer_size, resume=True, progress=self.meter.add)
+            if self.verify and (file_hash(source, self.buffer_size)
+                                != file_hash(target, self.buffer_size, uncached=True)):
+                os.remove(target)
+                raise OSError(f"Checksum mismatch for {target}")
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="Copy") as executor:
+                futures = {executor.submit(copy, source, target): source for source, target, _ in jobs}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                        summary["files_done"] += 1
+                    except Exception as e:
+                        summary["errors"].append(f"{futures[future]}: {str(e)}")
+        finally:
+            stop_reporting.set()
+            if reporter:
+                reporter.join()
+
+        summary["bytes_done"] = self.meter.total
+        summary["seconds"] = time.monotonic() - start
+        summary["average_rate"] = summary["bytes_done"] / summary["seconds"] if summary["seconds"] else 0.0
+        logger.info(f"Copied {summary['files_done']}/{summary['files_total']} files "
+                    f"({summary['bytes_done']} bytes) from {self.source} to {self.destination} "
+                    f"in {summary['seconds']:.1f}s, {len(summary['errors'])} errors")
+        return summary
+
+    def _report(self, summary, stop_event):
+        while not stop_event.wait(self.progress_interval):
+            self.progress({**summary, "bytes_done": self.meter.total, "rate": self.meter.rate()})
+
+
+def format_rate(bytes_per_second):
+    return f"{bytes_per_second / 1e6:.1f} MB/s"
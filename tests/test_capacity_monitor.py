@@ -0,0 +1,52 @@
+# File: tests/test_capacity_monitor.py
+import os
+import threading
+
+from src.capacity_monitor import CapacityMonitor
+
+
+class FakeStatvfs:
+    """statvfs stand-in: "/hung" blocks until released, "/broken" fails"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+
+    def __call__(self, mount_point):
+        self.calls.append(mount_point)
+        if mount_point == "/hung":
+            self.release.wait(10)
+        if mount_point == "/broken":
+            raise OSError(5, "Input/output error")
+        return os.statvfs("/")
+
+
+def test_hung_mount_uses_bounded_workers():
+    statvfs = FakeStatvfs()
+    table = {f"/m{i}": "//nas/x" for i in range(10)}
+    table["/hung"] = "//nas/hung"
+    monitor = CapacityMonitor(timeout=0.5, mount_table=lambda: table, statvfs=statvfs, max_workers=3)
+    before = threading.active_count()
+    try:
+        monitor.sample()
+        assert threading.active_count() - before <= 3
+        assert all(monitor.get(f"/m{i}")[0] for i in range(10))
+        assert "no answer" in monitor.get("/hung")[1]
+        # Not queried again while the first call is stuck
+        monitor.sample()
+        assert statvfs.calls.count("/hung") == 1
+        assert "still hung" in monitor.get("/hung")[1]
+    finally:
+        statvfs.release.set()
+
+
+def test_error_only_mounts_are_forgotten():
+    statvfs = FakeStatvfs()
+    table = {"/broken": "//nas/broken", "/ok": "//nas/ok"}
+    monitor = CapacityMonitor(timeout=2, mount_table=lambda: table, statvfs=statvfs)
+    monitor.sample()
+    assert monitor.get("/broken") == (None, "Input/output error")
+    del table["/broken"]
+    monitor.sample()
+    assert monitor.get("/broken") == (None, None)
+    assert "/broken" not in monitor.errors and "/broken" not in monitor.in_flight
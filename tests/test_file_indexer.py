@@ -0,0 +1,57 @@
+# File: tests/test_file_indexer.py
+import os
+
+from src import file_indexer
+from src.file_indexer import ShareIndex
+
+
+def make_tree(root):
+    for rel_path in ("a/one.txt", "locked/two.txt", "locked/deep/three.txt"):
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(rel_path)
+
+
+def test_unlistable_folder_keeps_cached_subtree(tmp_path, monkeypatch):
+    root, index_file = str(tmp_path / "share"), str(tmp_path / "share.idx")
+    make_tree(root)
+    index = ShareIndex(root, index_file, workers=2)
+    index.refresh()
+    assert "locked/deep/three.txt" in index.paths
+
+    scandir = os.scandir
+
+    def failing_scandir(path):
+        if path.rstrip("/").endswith("locked"):
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+
+    monkeypatch.setattr(file_indexer.os, "scandir", failing_scandir)
+    # Force a re-list of the failing folder
+    os.utime(os.path.join(root, "locked"), ns=(0, 0))
+    index.refresh()
+    assert "locked/two.txt" in index.paths
+    assert "locked/deep/three.txt" in index.paths
+
+
+def test_removed_folder_drops_out(tmp_path):
+    root, index_file = str(tmp_path / "share"), str(tmp_path / "share.idx")
+    make_tree(root)
+    index = ShareIndex(root, index_file, workers=2)
+    index.refresh()
+    os.remove(os.path.join(root, "a", "one.txt"))
+    os.rmdir(os.path.join(root, "a"))
+    index.refresh()
+    assert not any(path.startswith("a") for path in index.paths)
+
+
+def test_reloads_index_written_by_another_process(tmp_path):
+    root, index_file = str(tmp_path / "share"), str(tmp_path / "share.idx")
+    make_tree(root)
+    reader = ShareIndex(root, index_file)
+    assert reader.search("three") == []
+
+    ShareIndex(root, index_file, workers=2).refresh()
+    reader.reload_if_changed()
+    assert reader.search("three") == [os.path.join(root, "locked/deep/three.txt")]
@@ -0,0 +1,47 @@
+# File: tests/test_idle_monitor.py
+from src.idle_monitor import IdleMonitor, parse_nettop
+
+NETTOP = """time,,bytes_in,bytes_out,
+17:00:00.100000,kernel_task.0,,,
+17:00:00.100000,tcp4 10.0.0.2:49320<->10.0.0.5:445,1000,200,
+17:00:00.100000,tcp6 fe80::1%en0.49321<->fe80::5%en0.445,10,5,
+17:00:00.100000,Safari.123,,,
+17:00:00.100000,tcp4 10.0.0.2:49330<->10.0.0.5:443,99999,1,
+"""
+
+
+class FakeShare(dict):
+    id = 1
+    share = "/media"
+    mount_point = "/Volumes/Media"
+
+
+def make_monitor(clock, traffic=None):
+    return IdleMonitor(mount_table=lambda: {"/Volumes/Media": "//alice@10.0.0.5/Media"},
+                       stats_reader=lambda: {}, open_files=lambda mount_point: False,
+                       clock=lambda: clock[0], connection_traffic=traffic)
+
+
+def test_parse_nettop_counts_kernel_connections_only():
+    assert parse_nettop(NETTOP) == {"10.0.0.5": 1200, "fe80::5": 15}
+
+
+def test_connection_traffic_keeps_share_active():
+    clock = [0]
+    traffic = {"10.0.0.5": 100}
+    monitor = make_monitor(clock, lambda: traffic)
+    share = FakeShare(idle_timeout=1)
+    assert monitor.idle_shares([share]) == []
+    clock[0] = 61
+    assert [mount_point for _, mount_point, _ in monitor.idle_shares([share])] == ["/Volumes/Media"]
+    traffic["10.0.0.5"] = 150
+    clock[0] = 120
+    assert monitor.idle_shares([share]) == []
+
+
+def test_no_io_counter_is_never_idle():
+    clock = [0]
+    monitor = make_monitor(clock)
+    share = FakeShare(idle_timeout=1)
+    for clock[0] in (0, 100, 200):
+        assert monitor.idle_shares([share]) == []
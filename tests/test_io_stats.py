@@ -0,0 +1,101 @@
+# File: tests/test_io_stats.py
+import os
+
+import pytest
+
+from src.io_stats import compute_sample, format_counters, parse_cifs_stats, read_cifs_stats, share_key
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "cifs_stats")
+
+
+def load(name):
+    return read_cifs_stats(os.path.join(FIXTURES, name))
+
+
+def test_smb2_counters():
+    stats = load("smb2")
+    media = stats[("nas.local", "/media")]
+    assert media["bytes_read"] == 10485760
+    assert media["bytes_written"] == 2048
+    assert media["ops"]["Creates"] == (10, 1)
+    assert media["ops"]["Reads"] == (40, 0)
+    assert media["latency"] == {}
+    assert not media["disconnected"]
+
+
+def test_share_name_with_spaces():
+    stats = load("smb2")
+    assert set(stats) == {("nas.local", "/media"), ("nas.local", "/shared documents")}
+    assert stats[share_key("//alice@nas.local/Shared Documents")]["bytes_written"] == 8192
+
+
+def test_smb1_bytes_from_read_write_lines():
+    public = load("smb1")[("oldnas", "/public")]
+    assert public["bytes_read"] == 40960
+    assert public["bytes_written"] == 512
+    assert public["ops"] == {"Reads": (10, 0), "Writes": (2, 0)}
+
+
+def test_stats2_timing_table_in_ms():
+    stats = load("stats2")
+    media = stats[("nas.local", "/media")]
+    # 250 jiffies per second: 20 jiffies over 40 reads is 80 ms in total
+    assert media["latency"]["READ"] == (40, 80.0)
+    assert media["latency"]["WRITE"] == (8, 64.0)
+    assert media["latency"]["QUERY_INFO"] == (30, 12.0)
+    # The timing table is per server, so IPC$ shares it
+    assert stats[("nas.local", "/ipc$")]["latency"] is media["latency"]
+
+
+def test_disconnected_share():
+    stats = load("disconnected")
+    media = stats[("nas.local", "/media")]
+    assert media["disconnected"]
+    assert media["ops"]["Reads"] == (4, 1)
+    assert not stats[("nas.local", "/backups")]["disconnected"]
+    assert "(disconnected)" in format_counters(stats)
+
+
+def test_missing_file_is_empty():
+    assert read_cifs_stats(os.path.join(FIXTURES, "missing")) == {}
+    assert parse_cifs_stats("") == {}
+
+
+def counters(bytes_read, bytes_written, reads, read_ms=None):
+    return {"bytes_read": bytes_read, "bytes_written": bytes_written, "ops": {"Reads": (reads, 0)},
+            "latency": {} if read_ms is None else {"READ": (reads, read_ms)}, "disconnected": False}
+
+
+def test_compute_sample_rates():
+    sample = compute_sample(counters(1000, 0, 10), counters(6000, 2500, 20), 5.0, 100.0, probe_ms=3.0)
+    assert sample.read_bps == 1000
+    assert sample.write_bps == 500
+    assert sample.ops_per_sec == 2
+    assert sample.latency is None
+    assert sample.probe_ms == 3.0
+
+
+def test_compute_sample_latency_per_interval():
+    sample = compute_sample(counters(0, 0, 10, 50.0), counters(0, 0, 15, 80.0), 5.0, 100.0)
+    assert sample.op_latency("READ") == pytest.approx(6.0)
+    # No writes in the interval
+    assert sample.op_latency("WRITE") is None
+
+
+def test_compute_sample_counter_reset():
+    # Counters go back to zero when the module is reloaded or the share remounted
+    sample = compute_sample(counters(5000, 5000, 50), counters(100, 0, 1), 5.0, 100.0)
+    assert sample.read_bps == 0
+    assert sample.write_bps == 0
+    assert sample.ops_per_sec == 0
+
+
+@pytest.mark.parametrize("previous, current, elapsed", [
+    (None, counters(1, 1, 1), 5.0),
+    (counters(1, 1, 1), None, 5.0),
+    (counters(1, 1, 1), counters(2, 2, 2), 0),
+])
+def test_compute_sample_without_baseline(previous, current, elapsed):
+    sample = compute_sample(previous, current, elapsed, 100.0, probe_ms=1.0)
+    assert sample.read_bps is None
+    assert sample.probe_ms == 1.0
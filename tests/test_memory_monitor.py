@@ -0,0 +1,17 @@
+# File: tests/test_memory_monitor.py
+from src.memory_monitor import MemoryMonitor, SOAK_GROWTH_LIMIT_MB, current_rss, soak
+
+
+def test_short_soak_growth_is_bounded():
+    result = soak(cycles=150, share_count=10, warmup=30)
+    assert result["cycles"] == 150
+    assert result["start"] > 0
+    assert result["growth"] <= SOAK_GROWTH_LIMIT_MB * 1024 * 1024
+
+
+def test_samples_stay_in_ring_buffer():
+    monitor = MemoryMonitor(samples=5)
+    for _ in range(20):
+        assert monitor.sample() == monitor.summary()["current"]
+    assert monitor.summary()["samples"] == 5
+    assert current_rss() > 0
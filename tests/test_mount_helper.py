@@ -0,0 +1,197 @@
+# File: tests/test_mount_helper.py
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from src import mount_helper
+from src.mount_helper import (MountHelperClient, StubBackend, SystemBackend, serve,
+                              validate_mount_command, find_processes, MOUNT_TOOLS)
+
+STUB_COMMAND = [sys.executable, '-m', 'src.mount_helper', 'stub']
+SMBFS = ['mount_smbfs', '-o', 'nobrowse,soft', '//alice:pw@nas.local:445/Media', '/tmp/smb-test/Media']
+CIFS = ['mount', '-t', 'cifs', '//nas.local/Media', '/mnt/media', '-o', 'vers=3.0,port=445,username=alice']
+
+
+def run_serve(backend, requests):
+    """Feed requests through serve() and return the responses by id"""
+    stdout = io.StringIO()
+    serve(backend, io.StringIO("".join(json.dumps(r) + "\n" for r in requests)), stdout)
+    deadline = time.monotonic() + 5
+    while stdout.getvalue().count("\n") < len(requests) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return {r["id"]: r for r in map(json.loads, stdout.getvalue().splitlines())}
+
+
+def test_serve_answers_every_request():
+    backend = StubBackend(processes={"cloudflared"})
+    responses = run_serve(backend, [
+        {"id": 1, "op": "ping"},
+        {"id": 2, "op": "mount", "args": {"argv": SMBFS}},
+        {"id": 3, "op": "pgrep", "args": {"name": "cloudflared"}},
+        {"id": 4, "op": "format_disk"},
+        {"id": 5, "op": "unmount", "args": {"mount_point": "/nowhere"}},
+    ])
+    assert responses[1]["ok"]
+    assert responses[2]["ok"]
+    assert responses[3] == {"id": 3, "ok": True, "result": True}
+    assert not responses[4]["ok"] and "Unknown operation" in responses[4]["error"]
+    assert not responses[5]["ok"]
+    assert "/tmp/smb-test/Media" in backend.mounted
+
+
+def serve_one(backend, request):
+    return run_serve(backend, [request])[request["id"]]
+
+
+def test_serve_rejects_arbitrary_mount_argv():
+    backend = StubBackend()
+    responses = run_serve(backend, [
+        {"id": 1, "op": "mount", "args": {"argv": ["sh", "-c", "id"]}},
+        {"id": 2, "op": "mount", "args": {"argv": CIFS, "env": {"LD_PRELOAD": "/tmp/evil.so"}}},
+    ])
+    assert not responses[1]["ok"] and not responses[2]["ok"]
+    assert not backend.mounted
+
+
+@pytest.mark.parametrize("argv, expected", [
+    (SMBFS, SMBFS[1:2] + ['nobrowse,soft,nosuid,nodev'] + SMBFS[3:]),
+    (SMBFS[:1] + SMBFS[3:], ['-o', 'nosuid,nodev'] + SMBFS[3:]),
+    (CIFS, CIFS[1:6] + [CIFS[6] + ',nosuid,nodev']),
+    (['open', 'smb://nas.local/Media'], ['smb://nas.local/Media']),
+])
+def test_validate_mount_command_uses_absolute_tools(argv, expected):
+    validated, _ = validate_mount_command(argv, {"PASSWD": "pw"} if argv[0] == "mount" else None)
+    assert validated[0] in MOUNT_TOOLS[argv[0]]
+    assert validated[1:] == expected
+
+
+@pytest.mark.parametrize("argv", [
+    ['/bin/sh', '-c', 'id'],
+    ['open', '-a', 'Terminal'],
+    ['mount_smbfs', '-d', '777', '//nas/Media', '/tmp/m'],
+    ['mount_smbfs', '//nas/Media', 'relative'],
+    CIFS[:6] + ['vers=3.0,credentials=/etc/x,,'],
+    CIFS[:3] + ['/dev/sda1'] + CIFS[4:],
+    CIFS[:6] + ['vers=3.0,suid'],
+    CIFS[:6] + ['uid=0'],
+    SMBFS[:2] + ['dev,exec'] + SMBFS[3:],
+])
+def test_validate_mount_command_rejects(argv):
+    with pytest.raises(ValueError):
+        validate_mount_command(argv)
+
+
+@pytest.fixture
+def user_home(tmp_path, monkeypatch):
+    home = tmp_path / "home"
+    (home / "SMB").mkdir(parents=True)
+    monkeypatch.setattr(mount_helper, "requesting_user", lambda: (501, 20, str(home)))
+    return home
+
+
+def test_privileged_mounts_only_inside_mount_roots(user_home):
+    argv, _ = validate_mount_command(CIFS[:4] + [str(user_home / "SMB" / "Media")] + CIFS[5:], privileged=True)
+    assert argv[-1] == "vers=3.0,port=445,username=alice,nosuid,nodev,uid=501,gid=20"
+    assert validate_mount_command(CIFS[:4] + ["/Volumes/Media"] + CIFS[5:], privileged=True)[0][4] == "/Volumes/Media"
+    # A symlink in ~/SMB is resolved before the check
+    (user_home / "SMB" / "evil").symlink_to("/etc")
+    for mount_point in ("/etc", "/Volumes/a/b", str(user_home / "SMB" / "evil"), str(user_home / "Media")):
+        with pytest.raises(ValueError):
+            validate_mount_command(CIFS[:4] + [mount_point] + CIFS[5:], privileged=True)
+
+
+def test_privileged_backend_only_manages_cloudflared():
+    backend = SystemBackend(privileged=True)
+    response = serve_one(backend, {"id": 1, "op": "pkill", "args": {"name": ""}})
+    assert not response["ok"] and "not one the helper manages" in response["error"]
+    assert not serve_one(backend, {"id": 2, "op": "pgrep", "args": {"name": "python"}})["ok"]
+    assert serve_one(backend, {"id": 3, "op": "pgrep", "args": {"name": "cloudflared"}})["ok"]
+    assert find_processes("") == []
+
+
+def test_system_backend_only_unmounts_smb_mounts(monkeypatch):
+    monkeypatch.setattr(mount_helper, "smb_mount_points", lambda: {"/Volumes/Media"})
+    monkeypatch.setattr(mount_helper, "unmount_syscall", lambda mount_point, force=False: 0)
+    backend = SystemBackend(privileged=True)
+    ok, error = backend.unmount("/")
+    assert not ok and "not an SMB mount" in error
+    assert backend.unmount("/Volumes/Media") == (True, "")
+
+
+@pytest.fixture
+def client():
+    client = MountHelperClient(backend="stub", command=STUB_COMMAND)
+    yield client
+    client.stop()
+
+
+def test_client_round_trip_through_stub_helper(client):
+    assert client.mount(SMBFS) == (True, "")
+    assert client.probe("/tmp/smb-test/Media")
+    assert client.unmount("/tmp/smb-test/Media") == (True, "")
+    assert not client.probe("/tmp/smb-test/Media")
+    ok, error = client.unmount("/tmp/smb-test/Media")
+    assert not ok and "not currently mounted" in error
+    assert not client.pgrep("cloudflared")
+    assert client.call("ping")["ok"]
+
+
+def test_client_concurrent_calls_share_one_helper(client):
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(client.mount(SMBFS[:-1] + [f"/tmp/smb-test/{i}"])))
+               for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [(True, "")] * 10
+    process = client.process
+    assert client.probe("/tmp/smb-test/3")
+    assert client.process is process
+
+
+def test_client_restarts_helper_after_exit(client):
+    assert client.mount(SMBFS)[0]
+    client.process.kill()
+    client.process.wait()
+    # A new helper starts with an empty stub
+    assert not client.probe("/tmp/smb-test/Media")
+    assert client.is_running()
+
+
+def test_stub_never_falls_back_to_system_backend():
+    client = MountHelperClient(backend="stub", command=[sys.executable, '-c', 'pass'])
+    response = client.call("mount", 5, argv=SMBFS)
+    assert not response["ok"]
+    assert client.local is None
+
+
+def test_privileged_helper_must_be_root_owned(tmp_path):
+    script = tmp_path / "mount_helper.py"
+    script.write_text("")
+    client = MountHelperClient(privileged=str(script))
+    with pytest.raises(OSError):
+        client.get_command()
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc")
+def test_system_backend_finds_and_stops_processes_in_process():
+    # PR_SET_NAME gives the child a name nothing else on the machine has
+    process = subprocess.Popen([sys.executable, '-c', 'import ctypes, time; '
+                                'ctypes.CDLL(None).prctl(15, b"smbhelpertest", 0, 0, 0); time.sleep(30)'])
+    try:
+        backend = SystemBackend(privileged=False)
+        deadline = time.monotonic() + 5
+        while not backend.pgrep("smbhelpertest") and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert backend.pgrep("smbhelpertest")
+        assert backend.pkill("smbhelpertest")
+        assert process.wait(timeout=5) != 0
+    finally:
+        process.kill()
@@ -0,0 +1,135 @@
+# File: tests/test_path_selector.py
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from src.path_selector import PathSelector, probe_route, route_cost
+
+
+def negotiate_response(size=200):
+    """NetBIOS-framed reply the size of a real SMB2 NEGOTIATE response"""
+    payload = b"\xfeSMB" + b"\x00" * (size - 4)
+    return struct.pack('>I', len(payload)) + payload
+
+
+class StubServer:
+    """TCP server that answers each connection's request after a delay
+
+    `delays` is used in turn per connection (the last one repeats); with
+    `reply=None` it accepts and closes without answering.
+    """
+
+    def __init__(self, delays=(0.0,), reply=negotiate_response()):
+        self.delays = list(delays)
+        self.reply = reply
+        self.connections = 0
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            delay = self.delays[min(self.connections, len(self.delays) - 1)]
+            self.connections += 1
+            threading.Thread(target=self.answer, args=(conn, delay), daemon=True).start()
+
+    def answer(self, conn, delay):
+        with conn:
+            conn.recv(4096)
+            time.sleep(delay)
+            if self.reply:
+                conn.sendall(self.reply)
+
+    def close(self):
+        self.sock.close()
+
+
+class FakeStore:
+    def __init__(self):
+        self.choices = {}
+
+    def get_route_choice(self, network, hostname, ttl):
+        return self.choices.get((network, hostname))
+
+    def set_route_choice(self, network, hostname, route):
+        self.choices[(network, hostname)] = route
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(**kwargs):
+        server = StubServer(**kwargs)
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.close()
+
+
+def closed_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_route_cost_unreachable_and_silent():
+    assert route_cost({"reachable": False}) == float("inf")
+    silent = {"reachable": True, "connect_ms": 1.0, "response_ms": None, "throughput": None}
+    assert 1000 < route_cost(silent) < float("inf")
+
+
+def test_probe_reads_whole_reply_and_uses_median(servers):
+    # One slow round out of three shouldn't decide the route
+    server = servers(delays=(0.0, 0.5, 0.0))
+    probe = probe_route("127.0.0.1", server.port)
+    assert probe["reachable"] and probe["rounds"] == 3
+    assert server.connections == 3
+    assert probe["response_ms"] < 250
+
+
+def test_probe_silent_listener(servers):
+    server = servers(reply=None)
+    probe = probe_route("127.0.0.1", server.port)
+    assert probe["reachable"] and probe["response_ms"] is None
+    assert route_cost(probe) > 1000
+
+
+def test_choose_prefers_lower_latency(servers):
+    direct = servers(delays=(0.3,))
+    tunnel = servers()
+    store = FakeStore()
+    selector = PathSelector(store, network_id=lambda: "net")
+    route, host, port = selector.choose("127.0.0.1", direct.port, tunnel.port, tunnel_host="127.0.0.1")
+    assert (route, port) == ("tunnel", tunnel.port)
+    assert store.choices[("net", "127.0.0.1")] == "tunnel"
+
+
+def test_choose_uses_cached_decision(servers):
+    tunnel = servers()
+    store = FakeStore()
+    store.choices[("net", "127.0.0.1")] = "direct"
+    selector = PathSelector(store, network_id=lambda: "net")
+    route, _, _ = selector.choose("127.0.0.1", closed_port(), tunnel.port, tunnel_host="127.0.0.1")
+    assert route == "direct"
+
+
+def test_choose_unreachable_falls_back_without_storing():
+    store = FakeStore()
+    selector = PathSelector(store, network_id=lambda: "net")
+    route, _, _ = selector.choose("127.0.0.1", closed_port(), closed_port(), tunnel_host="127.0.0.1")
+    assert route == "tunnel"
+    assert store.choices == {}
@@ -0,0 +1,21 @@
+# File: tests/test_profiler.py
+import cProfile
+import pstats
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from src import profiler
+
+
+def test_pool_threads_stop_profiling_after_call(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "output_path", lambda kind, extension: str(tmp_path / f"{kind}.{extension}"))
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        result, path = profiler.profile_call("pool", lambda: executor.submit(sum, [1, 2]).result())
+        assert result == 3
+        assert pstats.Stats(path).total_calls > 0
+        # The worker started during the call is still alive and must be back to normal
+        assert not isinstance(executor.submit(sys.getprofile).result(), cProfile.Profile)
+        assert executor.submit(sys.gettrace).result() is None
+    finally:
+        executor.shutdown()
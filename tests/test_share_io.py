@@ -0,0 +1,28 @@
+# File: tests/test_share_io.py
+from src.share_io import apply_diff, diff_shares, validate_shares
+
+CURRENT = [{"username": "alice", "share": "/Media", "mount_point": "/Volumes/Films", "auto_mount": False,
+            "readonly": True, "profile": "lan_bulk"}]
+
+
+def test_partial_row_keeps_existing_settings():
+    shares, _, errors = validate_shares([{"username": "alice", "share": "/Media", "readonly": "", "profile": ""}])
+    assert errors == []
+    diff = diff_shares(CURRENT, shares)
+    assert diff["changed"] == [] and len(diff["unchanged"]) == 1
+    assert apply_diff({"shares": CURRENT}, diff)["shares"] == CURRENT
+
+
+def test_given_field_overrides_only_that_field():
+    shares, _, _ = validate_shares([{"username": "alice", "share": "/Media", "readonly": "no"}])
+    diff = diff_shares(CURRENT, shares)
+    (old, new), = diff["changed"]
+    assert new == {**CURRENT[0], "readonly": False}
+    assert apply_diff({"shares": CURRENT}, diff)["shares"] == [new]
+
+
+def test_new_share_gets_defaults():
+    shares, _, _ = validate_shares([{"username": "alice", "share": "Backups"}])
+    added, = diff_shares(CURRENT, shares)["added"]
+    assert added == {"username": "alice", "share": "/Backups", "mount_point": "/Volumes/Backups",
+                     "auto_mount": True, "readonly": False, "profile": "default"}
@@ -0,0 +1,56 @@
+# File: tests/test_smb_tuning.py
+from src.mount_profiles import merge_options, mount_options
+from src.smb_tuning import CifsTuner, NsmbTuner
+
+NSMB = """# Office NAS settings
+[default]
+# keep signing for the audit
+signing_required=yes
+minauth=ntlmv2  # old NAS
+[nas.local:admin]
+port445=both
+"""
+
+
+class FakeConfigManager:
+    def __init__(self, config):
+        self.config = config
+
+    def load_config(self):
+        return dict(self.config)
+
+    def save_config(self, config):
+        self.config = dict(config)
+
+
+def test_nsmb_apply_keeps_comments(tmp_path):
+    path = tmp_path / "nsmb.conf"
+    path.write_text(NSMB)
+    tuner = NsmbTuner(str(path))
+    assert tuner.apply("fast_lan")[0]
+    text = path.read_text()
+    for line in ("# Office NAS settings", "# keep signing for the audit",
+                 "minauth=ntlmv2  # old NAS", "[nas.local:admin]", "port445=both"):
+        assert line in text
+    assert "signing_required=no" in text and "signing_required=yes" not in text
+    # Re-applying changes nothing and doesn't stack headers
+    assert tuner.apply("fast_lan") == (False, None)
+    assert text.count("# Generated by SMB Manager") == 1
+
+
+def test_cifs_backup_keeps_original_options():
+    config_manager = FakeConfigManager({"cifs_default_options": ["vers=3.0"]})
+    tuner = CifsTuner(config_manager)
+    tuner.apply("fast_lan")
+    tuner.apply("wan")
+    assert config_manager.config["cifs_default_options_backup"] == ["vers=3.0"]
+    assert tuner.restore() == (True, "")
+    assert config_manager.config["cifs_default_options"] == ["vers=3.0"]
+
+
+def test_merge_options_replaces_exclusive_options():
+    assert merge_options(["soft", "vers=3.0", "rw"], ["hard", "ro"]) == ["vers=3.0", "hard", "ro"]
+    options = mount_options({"profile": "wan_interactive", "readonly": True}, platform="linux",
+                            defaults=["rw", "hard"])
+    assert "soft" in options and "hard" not in options
+    assert "ro" in options and "rw" not in options
@@ -0,0 +1,70 @@
+# File: tests/test_state_store.py
+import json
+import sqlite3
+
+import pytest
+
+from src import state_store
+from src.state_store import StateStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return StateStore(str(tmp_path / "state.db"), str(tmp_path / "missing.json"))
+
+
+def share(id, name):
+    return {"id": id, "username": "alice", "share": name, "mount_point": f"/Volumes{name}"}
+
+
+def record(store, name, durations, outcome="success"):
+    for i, duration in enumerate(durations):
+        store.record_mount_attempt("nas", "445", "alice", name, outcome, duration, started_at=1000 + i)
+
+
+def test_rename_keeps_mount_history(store):
+    store.save_config({"shares": [share("a1", "/Media")]})
+    record(store, "/Media", [1.0, 2.0])
+    store.save_config({"shares": [share("a1", "/Films")]})
+    config = store.load_config()
+    assert [(s["id"], s["share"]) for s in config["shares"]] == [("a1", "/Films")]
+    assert store.share_stats()[("alice", "/Films")]["attempts"] == 2
+
+
+def test_swapping_names_keeps_each_history(store):
+    store.save_config({"shares": [share("a1", "/One"), share("b2", "/Two")]})
+    record(store, "/One", [1.0])
+    record(store, "/Two", [5.0, 6.0])
+    store.save_config({"shares": [share("a1", "/Two"), share("b2", "/One")]})
+    stats = store.share_stats()
+    assert stats[("alice", "/Two")]["attempts"] == 1
+    assert stats[("alice", "/One")]["attempts"] == 2
+
+
+def test_removed_share_drops_its_history(store):
+    store.save_config({"shares": [share("a1", "/Media")]})
+    record(store, "/Media", [1.0])
+    store.save_config({"shares": []})
+    assert store.share_stats() == {}
+
+
+def test_rows_from_before_uid_column_get_their_saved_id(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(state_store.SCHEMA)
+    conn.execute("INSERT INTO shares (position, username, share, extra) VALUES (0, 'alice', '/Media', ?)",
+                 (json.dumps({"id": "a1", "profile": "lan_bulk"}),))
+    conn.commit()
+    conn.close()
+    loaded, = StateStore(path, str(tmp_path / "missing.json")).load_config()["shares"]
+    assert loaded["id"] == "a1" and loaded["profile"] == "lan_bulk"
+
+
+def test_history_queries_without_window_functions(store, monkeypatch):
+    store.save_config({"shares": [share("a1", "/Media"), share("b2", "/Docs")]})
+    record(store, "/Media", [3.0, 1.0, 2.0, 4.0])
+    record(store, "/Docs", [9.0], outcome="failure")
+    expected = (store.mount_time_percentile(0.5), store.share_stats(window=3))
+    monkeypatch.setattr(state_store, "WINDOW_FUNCTIONS", False)
+    assert (store.mount_time_percentile(0.5), store.share_stats(window=3)) == expected
+    assert expected[0] == {("alice", "/Media"): 2.0}
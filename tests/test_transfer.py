@@ -0,0 +1,39 @@
+# File: tests/test_transfer.py
+import os
+
+from src import fs_utils
+from src.transfer import BulkCopier
+
+
+def make_tree(root):
+    for rel_path in ("a/one.txt", "locked/two.txt", "three.txt"):
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(rel_path)
+
+
+def test_unlistable_folder_is_an_error(tmp_path, monkeypatch):
+    source, destination = str(tmp_path / "src"), str(tmp_path / "dst")
+    make_tree(source)
+    scandir = os.scandir
+
+    def failing_scandir(path):
+        if path.endswith("locked"):
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+
+    monkeypatch.setattr(fs_utils.os, "scandir", failing_scandir)
+    summary = BulkCopier(source, destination).run()
+    assert summary["files_done"] == 2
+    assert len(summary["errors"]) == 1 and "locked" in summary["errors"][0]
+    assert not os.path.exists(os.path.join(destination, "locked"))
+
+
+def test_verified_copy(tmp_path):
+    source, destination = str(tmp_path / "src"), str(tmp_path / "dst")
+    make_tree(source)
+    summary = BulkCopier(source, destination, verify=True).run()
+    assert summary["errors"] == [] and summary["files_done"] == 3
+    with open(os.path.join(destination, "a", "one.txt")) as f:
+        assert f.read() == "a/one.txt"